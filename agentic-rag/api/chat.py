@@ -1,13 +1,21 @@
 from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncIterator, Optional, Tuple
+import json
 import uuid
 from datetime import datetime
 
 from api.models import ChatRequest, ChatResponse, ChatSession, ErrorResponse
-from graph.utils.conversational_detector import detect_conversational_query
+from graph.utils.conversational_detector import adetect_conversational_query
+from graph.utils.intent_classifier import is_small_talk
 from graph.utils.conversational_responses import generate_conversational_response
+from graph.consts import GENERATE, GRADE_DOCUMENTS, WEBSEARCH
+from graph.nodes.web_search import web_search_cache
 from graph.state import GraphState
-from graph.utils.source_extractor import format_sources_for_display
+from graph.utils.source_extractor import extract_sources_from_documents, format_sources_for_display
+from graph.utils.semantic_cache import answer_cache
+from embedding_cache import get_embeddings
+from metrics import traced_config
 
 router = APIRouter()
 
@@ -18,6 +26,63 @@ def get_rag_app():
     from main import rag_app
     return rag_app
 
+async def answer_without_graph(request: ChatRequest) -> Tuple[Optional[ChatResponse], Any]:
+    """
+    Answer a message from the semantic answer cache or as small talk
+
+    Shared by the plain and streaming endpoints so both follow the same
+    cache and conversational rules.
+
+    Returns:
+        (response, question_vector): the response is None when the RAG graph
+        has to run; the question embedding (None for plain small talk) is
+        passed on to cache_answer
+    """
+    # Serve near-identical questions from the semantic answer cache;
+    # plain small talk skips the embedding call entirely
+    question_vector = None
+    if not is_small_talk(request.question):
+        question_vector = await answer_cache.aembed(request.question)
+        cached = answer_cache.lookup(
+            request.question, request.subject, vector=question_vector
+        )
+        if cached:
+            return ChatResponse(
+                generation=cached["generation"],
+                sources=cached["sources"],
+                is_conversational=False,
+                subject=request.subject
+            ), question_vector
+
+    # Handle conversational queries directly
+    detection = await adetect_conversational_query(
+        request.question, request.subject, vector=question_vector
+    )
+    if detection["is_conversational"]:
+        result = generate_conversational_response(GraphState(question=request.question))
+        return ChatResponse(
+            generation=result["generation"],
+            sources=None,
+            is_conversational=True,
+            subject=request.subject
+        ), question_vector
+
+    return None, question_vector
+
+def cache_answer(request: ChatRequest, result: Dict[str, Any], question_vector) -> None:
+    """
+    Cache a RAG answer. Only answers that passed both checks are cached; a
+    best-effort answer returned when the budget ran out is served once
+    """
+    if result.get("generation_grade") == "useful" and not result.get("is_conversational", False):
+        answer_cache.store(
+            request.question,
+            request.subject,
+            result.get("generation", "No answer generated"),
+            result.get("sources", []),
+            vector=question_vector
+        )
+
 @router.post("/message", response_model=ChatResponse)
 async def send_message(request: ChatRequest, rag_app=Depends(get_rag_app)):
     """
@@ -32,20 +97,10 @@ async def send_message(request: ChatRequest, rag_app=Depends(get_rag_app)):
                 detail=f"Invalid subject. Must be one of: {valid_subjects}"
             )
 
-        # Detect if query is conversational
-        detection = detect_conversational_query(request.question, request.subject)
-        
-        # Handle conversational queries directly
-        if detection["is_conversational"]:
-            state = GraphState(question=request.question)
-            result = generate_conversational_response(state)
-            
-            return ChatResponse(
-                generation=result["generation"],
-                sources=None,
-                is_conversational=True,
-                subject=request.subject
-            )
+        # Cached answers and small talk never reach the graph
+        response, question_vector = await answer_without_graph(request)
+        if response:
+            return response
         
         # Prepare input for RAG system
         input_data = {
@@ -58,12 +113,13 @@ async def send_message(request: ChatRequest, rag_app=Depends(get_rag_app)):
             input_data["subject"] = request.subject
         
         # Invoke RAG system
-        result = rag_app.invoke(input=input_data)
+        result = await rag_app.ainvoke(input=input_data, config=traced_config("rag"))
         
         # Extract response data
         generation = result.get("generation", "No answer generated")
         sources = result.get("sources", [])
         is_conversational = result.get("is_conversational", False)
+        cache_answer(request, result, question_vector)
         
         return ChatResponse(
             generation=generation,
@@ -75,6 +131,92 @@ async def send_message(request: ChatRequest, rag_app=Depends(get_rag_app)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def stream_rag_events(request: ChatRequest, rag_app) -> AsyncIterator[str]:
+    """
+    Run the RAG graph and yield server-sent events as it progresses
+
+    Events:
+        node: a graph node finished ({"node": name})
+        token: a generation token ({"content": text, "attempt": n}); a new
+            attempt means the previous generation was rejected and retried
+        sources: sources of the documents after grading or web search; built
+            here from the node's update, graph state carries no sources
+        done: final ChatResponse payload with the sources of the returned
+            answer, sent after the answer checks
+        error: the request failed ({"detail": message})
+    """
+    try:
+        response, question_vector = await answer_without_graph(request)
+        if response:
+            yield sse_event("done", response.model_dump())
+            return
+
+        input_data = {
+            "question": request.question,
+            "loop_count": 0,
+            "is_conversational": False,
+        }
+        if request.subject:
+            input_data["subject"] = request.subject
+
+        final_state: Dict[str, Any] = {}
+        attempt = 1
+        async for mode, chunk in rag_app.astream(
+            input_data, config=traced_config("rag"), stream_mode=["updates", "messages"]
+        ):
+            if mode == "messages":
+                message, metadata = chunk
+                # Only the generate node's text tokens; grader calls carry tool-call chunks
+                if metadata.get("langgraph_node") == GENERATE and isinstance(message.content, str) and message.content:
+                    yield sse_event("token", {"content": message.content, "attempt": attempt})
+                continue
+
+            for node, update in chunk.items():
+                final_state.update(update or {})
+                yield sse_event("node", {"node": node})
+                if node in (GRADE_DOCUMENTS, WEBSEARCH):
+                    documents = (update or {}).get("documents") or []
+                    yield sse_event("sources", {"sources": extract_sources_from_documents(documents)})
+                elif node == GENERATE:
+                    attempt += 1
+
+        generation = final_state.get("generation", "No answer generated")
+        sources = final_state.get("sources", [])
+        cache_answer(request, final_state, question_vector)
+
+        yield sse_event("done", ChatResponse(
+            generation=generation,
+            sources=sources,
+            is_conversational=False,
+            subject=request.subject
+        ).model_dump())
+
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Error processing message: {str(e)}"})
+
+@router.post("/message/stream")
+async def stream_message(request: ChatRequest, rag_app=Depends(get_rag_app)):
+    """
+    Send a message to the RAG system and stream progress, tokens and sources
+    as server-sent events
+    """
+    valid_subjects = ["DataMining", "Network", "Distributed"]
+    if request.subject and request.subject not in valid_subjects:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid subject. Must be one of: {valid_subjects}"
+        )
+
+    return StreamingResponse(
+        stream_rag_events(request, rag_app),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/session", response_model=Dict[str, str])
 async def create_chat_session():
     """
@@ -169,4 +311,24 @@ async def get_available_subjects():
     return {
         "subjects": ["DataMining", "Network"],
         "description": "Available subject filters for RAG queries"
-    }
\ No newline at end of file
+    }
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get answer, query-embedding and web search cache hit/miss counters
+    """
+    return {
+        "answers": answer_cache.stats(),
+        "embeddings": get_embeddings().stats(),
+        "web_search": web_search_cache.stats()
+    }
+
+@router.delete("/cache")
+async def clear_cache():
+    """
+    Clear the semantic answer cache and the web search cache
+    """
+    answer_cache.clear()
+    web_search_cache.clear()
+    return {"message": "Answer and web search caches cleared"}
@@ -40,7 +40,7 @@ async def generate_flashcards(
             )
         
         # Generate flashcards using the flashcard system
-        result = flashcard_system.generate_flashcards(
+        result = await flashcard_system.agenerate_flashcards(
             topic=request.topic,
             subject=request.subject,
             num_cards=request.num_cards
@@ -39,7 +39,7 @@ async def generate_quiz(
             )
         
         # Generate quiz using the quiz system
-        result = quiz_system.generate_quiz(
+        result = await quiz_system.agenerate_quiz(
             topic=request.topic,
             subject=request.subject,
             num_questions=request.num_questions
@@ -1,16 +1,26 @@
 from dotenv import load_dotenv
 from langgraph.graph import END, StateGraph
 from typing import Any, Dict, List, TypedDict, Optional
+import asyncio
 import os
 import random
 
 # Langchain imports
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_pinecone import PineconeVectorStore
+from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableSequence
+from langchain_core.runnables import Runnable, RunnableLambda
 from pydantic import BaseModel, Field
-from pinecone import Pinecone
+
+from graph.utils.map_reduce import (
+    agenerate_merged,
+    generate_merged,
+    shard_count,
+    shard_documents,
+    split_count,
+)
+from metrics import traced_chain, traced_config
+from question_bank import QUESTION_BANK_ENABLED, get_question_bank
+from retriever import get_retriever
 
 load_dotenv()
 
@@ -19,6 +29,17 @@ AVAILABLE_SUBJECTS = ["DataMining", "Network", "Distributed"]
 RETRIEVE = "retrieve"
 GENERATE_QUIZ = "generate_quiz"
 
+# Generate larger quizzes as concurrent per-shard calls merged into one quiz
+QUIZ_MAP_REDUCE = os.getenv("QUIZ_MAP_REDUCE", "true").lower() == "true"
+# Questions asked of one shard call
+QUIZ_QUESTIONS_PER_SHARD = int(os.getenv("QUIZ_QUESTIONS_PER_SHARD", "5"))
+# Upper bound on concurrent shard calls per quiz
+QUIZ_MAX_SHARDS = int(os.getenv("QUIZ_MAX_SHARDS", "4"))
+# Retrieved chunks per shard, so shards do not share the same few chunks
+QUIZ_CHUNKS_PER_SHARD = int(os.getenv("QUIZ_CHUNKS_PER_SHARD", "3"))
+# Extra calls made when deduplication or short answers leave the quiz short
+QUIZ_TOP_UP_ROUNDS = int(os.getenv("QUIZ_TOP_UP_ROUNDS", "1"))
+
 # State Definition
 class QuizState(TypedDict):
     question: str  # This will be the topic/subject for quiz generation
@@ -28,24 +49,6 @@ class QuizState(TypedDict):
     quiz_config: Optional[dict]
     generation: str
 
-# Initialize components
-embedding = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(os.environ["INDEX_NAME"])
-
-# Retriever function
-def get_retriever(subject=None):
-    vectorstore = PineconeVectorStore(index=index, embedding=embedding)
-    
-    if subject:
-        retriever = vectorstore.as_retriever(
-            search_kwargs={"filter": {"subject": subject}}
-        )
-    else:
-        retriever = vectorstore.as_retriever()
-    
-    return retriever
-
 # Quiz models
 class QuizQuestion(BaseModel):
     question: str = Field(description="The quiz question")
@@ -103,104 +106,194 @@ Number of questions to generate: {num_questions}
 Please generate quiz questions based on this content.""")
 ])
 
-quiz_generator_chain: RunnableSequence = quiz_prompt | structured_llm_quiz
+quiz_top_up_prompt = ChatPromptTemplate.from_messages([
+    ("system", quiz_system_prompt),
+    ("human", """Topic: {topic}
+
+Documents:
+{documents}
+
+Questions already in the quiz (do not repeat or rephrase them):
+{existing_questions}
+
+Number of new questions to generate: {num_questions}
+
+Please generate quiz questions that cover different points of this content.""")
+])
+
+quiz_generator_chain: Runnable = traced_chain(quiz_prompt | structured_llm_quiz, "quiz_generator_chain")
+quiz_top_up_chain: Runnable = traced_chain(quiz_top_up_prompt | structured_llm_quiz, "quiz_top_up_chain")
+
+def requested_questions(state: QuizState) -> int:
+    return (state.get("quiz_config") or {}).get("num_questions", 5)
+
+def planned_shards(num_questions: int, num_documents: int = QUIZ_MAX_SHARDS) -> int:
+    if not QUIZ_MAP_REDUCE:
+        return 1
+    return shard_count(num_questions, QUIZ_QUESTIONS_PER_SHARD, QUIZ_MAX_SHARDS, num_documents)
 
 # Node functions
-def retrieve(state: QuizState) -> Dict[str, Any]:
-    print("---RETRIEVE FOR QUIZ---")
+def select_quiz_retriever(state: QuizState):
     topic = state["question"]  # Using question as topic
     subject = state.get("subject")
     
+    # Larger quizzes retrieve enough chunks to give every shard its own material
+    search_kwargs = {}
+    shards = planned_shards(requested_questions(state))
+    if shards > 1:
+        search_kwargs["k"] = max(4, shards * QUIZ_CHUNKS_PER_SHARD)
+    
     # Create a search query from the topic
     search_query = f"{topic} concepts definitions examples"
     if subject:
         search_query = f"{subject} {search_query}"
         print(f"---FILTERING BY SUBJECT: {subject}---")
-        retriever = get_retriever(subject=subject)
+        retriever = get_retriever(subject=subject, **search_kwargs)
     else:
         print("---NO SUBJECT FILTER---")
-        retriever = get_retriever()
+        retriever = get_retriever(**search_kwargs)
     
-    documents = retriever.invoke(search_query)
+    return retriever, search_query
+
+def build_retrieve_state(state: QuizState, documents) -> Dict[str, Any]:
     print(f"---RETRIEVED {len(documents)} DOCUMENTS FOR QUIZ GENERATION---")
     
     return {
         "documents": documents, 
+        "question": state["question"],
+        "subject": state.get("subject")
+    }
+
+def retrieve(state: QuizState) -> Dict[str, Any]:
+    print("---RETRIEVE FOR QUIZ---")
+    retriever, search_query = select_quiz_retriever(state)
+    documents = retriever.invoke(search_query)
+    return build_retrieve_state(state, documents)
+
+async def aretrieve(state: QuizState) -> Dict[str, Any]:
+    print("---RETRIEVE FOR QUIZ---")
+    retriever, search_query = select_quiz_retriever(state)
+    documents = await retriever.ainvoke(search_query)
+    return build_retrieve_state(state, documents)
+
+def build_quiz_inputs(state: QuizState) -> List[Dict[str, Any]]:
+    """
+    Inputs for the quiz generator, one per shard
+
+    A quiz that fits in one shard is a single call over all documents. A
+    larger one deals the documents round-robin into shards and splits the
+    question count across them, so the calls can run concurrently.
+    """
+    num_questions = requested_questions(state)
+    documents = state["documents"]
+    shards = planned_shards(num_questions, len(documents))
+    if shards > 1:
+        print(f"---SPLITTING {num_questions} QUESTIONS ACROSS {shards} SHARDS---")
+    
+    return [
+        {
+            "documents": "\n\n".join([doc.page_content for doc in shard]),
+            "topic": state["question"],
+            "num_questions": count
+        }
+        for shard, count in zip(shard_documents(documents, shards), split_count(num_questions, shards))
+    ]
+
+def build_top_up_inputs(state: QuizState, questions: List[QuizQuestion]) -> Dict[str, Any]:
+    existing = "\n".join(f"- {q.question}" for q in questions) or "(none)"
+    return {
+        "documents": "\n\n".join([doc.page_content for doc in state["documents"]]),
+        "topic": state["question"],
+        "existing_questions": existing,
+        "num_questions": requested_questions(state) - len(questions)
+    }
+
+def generate_questions_kwargs(state: QuizState) -> Dict[str, Any]:
+    """Arguments shared by generate_merged and agenerate_merged for a quiz"""
+    return {
+        "chain": quiz_generator_chain,
+        "inputs": build_quiz_inputs(state),
+        "items": lambda result: result.questions,
+        "text": lambda q: q.question,
+        "limit": requested_questions(state),
+        "label": "QUIZ QUESTIONS",
+        "top_up_chain": quiz_top_up_chain,
+        "top_up_inputs": lambda questions: build_top_up_inputs(state, questions),
+        # Top-ups belong to map-reduce generation; with it off a quiz is one call as before
+        "top_up_rounds": QUIZ_TOP_UP_ROUNDS if QUIZ_MAP_REDUCE else 0,
+    }
+
+def build_quiz_state(state: QuizState, questions: List[QuizQuestion]) -> Dict[str, Any]:
+    topic = state["question"]
+    print(f"---GENERATED {len(questions)} QUIZ QUESTIONS---")
+    
+    # Convert to serializable format
+    quiz_data = []
+    for q in questions:
+        quiz_data.append({
+            "question": q.question,
+            "options": q.options,
+            "correct_answer": q.correct_answer,
+            "explanation": q.explanation,
+            "difficulty": q.difficulty
+        })
+    
+    # Generate summary message
+    generation = f"Generated {len(quiz_data)} quiz questions on {topic}. Ready to start quiz!"
+    
+    return {
+        "quiz_data": quiz_data,
+        "generation": generation,
+        "documents": state["documents"],
         "question": topic,
-        "subject": subject
+        "subject": state.get("subject", "General"),
+        "quiz_config": state.get("quiz_config", {})
+    }
+
+def build_quiz_error_state(state: QuizState, generation: str) -> Dict[str, Any]:
+    return {
+        "quiz_data": [],
+        "generation": generation,
+        "question": state["question"],
+        "subject": state.get("subject", "General")
     }
 
 def generate_quiz(state: QuizState) -> Dict[str, Any]:
     print("---GENERATE QUIZ---")
     
-    documents = state["documents"]
-    topic = state["question"]
-    subject = state.get("subject", "General")
-    quiz_config = state.get("quiz_config", {})
+    if not state["documents"]:
+        print("---NO DOCUMENTS AVAILABLE FOR QUIZ GENERATION---")
+        return build_quiz_error_state(state, "No documents available to generate quiz questions.")
     
-    # Default quiz configuration
-    num_questions = quiz_config.get("num_questions", 5)
+    try:
+        questions = generate_merged(**generate_questions_kwargs(state))
+        return build_quiz_state(state, questions)
+        
+    except Exception as e:
+        print(f"---QUIZ GENERATION ERROR: {e}---")
+        return build_quiz_error_state(state, f"Error generating quiz: {str(e)}")
+
+async def agenerate_quiz(state: QuizState) -> Dict[str, Any]:
+    print("---GENERATE QUIZ---")
     
-    if not documents:
+    if not state["documents"]:
         print("---NO DOCUMENTS AVAILABLE FOR QUIZ GENERATION---")
-        return {
-            "quiz_data": [],
-            "generation": "No documents available to generate quiz questions.",
-            "question": topic,
-            "subject": subject
-        }
+        return build_quiz_error_state(state, "No documents available to generate quiz questions.")
     
     try:
-        # Combine document content
-        doc_content = "\n\n".join([doc.page_content for doc in documents])
-        
-        # Generate quiz questions
-        quiz_result = quiz_generator_chain.invoke({
-            "documents": doc_content,
-            "topic": topic,
-            "num_questions": num_questions
-        })
-        
-        print(f"---GENERATED {len(quiz_result.questions)} QUIZ QUESTIONS---")
-        
-        # Convert to serializable format
-        quiz_data = []
-        for q in quiz_result.questions:
-            quiz_data.append({
-                "question": q.question,
-                "options": q.options,
-                "correct_answer": q.correct_answer,
-                "explanation": q.explanation,
-                "difficulty": q.difficulty
-            })
-        
-        # Generate summary message
-        generation = f"Generated {len(quiz_data)} quiz questions on {topic}. Ready to start quiz!"
-        
-        return {
-            "quiz_data": quiz_data,
-            "generation": generation,
-            "documents": documents,
-            "question": topic,
-            "subject": subject,
-            "quiz_config": quiz_config
-        }
+        questions = await agenerate_merged(**generate_questions_kwargs(state))
+        return build_quiz_state(state, questions)
         
     except Exception as e:
         print(f"---QUIZ GENERATION ERROR: {e}---")
-        return {
-            "quiz_data": [],
-            "generation": f"Error generating quiz: {str(e)}",
-            "question": topic,
-            "subject": subject
-        }
+        return build_quiz_error_state(state, f"Error generating quiz: {str(e)}")
 
 # Build graph
 workflow = StateGraph(QuizState)
 
-# Add nodes
-workflow.add_node(RETRIEVE, retrieve)
-workflow.add_node(GENERATE_QUIZ, generate_quiz)
+# Add nodes (sync for the CLI, async for the API)
+workflow.add_node(RETRIEVE, RunnableLambda(retrieve, afunc=aretrieve))
+workflow.add_node(GENERATE_QUIZ, RunnableLambda(generate_quiz, afunc=agenerate_quiz))
 
 # Build simple flow: retrieve -> generate quiz
 workflow.set_entry_point(RETRIEVE)
@@ -218,36 +311,104 @@ class QuizSystem:
         self.quiz_score = 0
         self.quiz_total = 0
     
+    def build_quiz_input(self, topic: str, subject: str = None, num_questions: int = 5):
+        return {
+            "question": topic,  # Using question field as topic
+            "subject": subject,
+            "documents": [],
+            "quiz_data": [],
+            "quiz_config": {"num_questions": num_questions},
+            "generation": ""
+        }
+    
+    def build_quiz_result(self, response, topic: str):
+        quiz_data = response.get("quiz_data", [])
+        if quiz_data:
+            self.current_quiz = quiz_data
+            return {
+                "success": True,
+                "quiz_data": quiz_data,
+                "message": f"Generated {len(quiz_data)} questions on {topic}",
+                "subject": response.get("subject")
+            }
+        else:
+            return {
+                "success": False,
+                "message": response.get("generation", "Failed to generate quiz")
+            }
+    
+    def build_bank_result(self, quiz_data, topic: str, subject: str = None):
+        self.current_quiz = quiz_data
+        return {
+            "success": True,
+            "quiz_data": quiz_data,
+            "message": f"Served {len(quiz_data)} questions on {topic} from the question bank",
+            "subject": subject
+        }
+    
+    def run_quiz_graph(self, topic: str, subject: str = None, num_questions: int = 5, vector=None):
+        """Run the quiz graph and bank its questions under vector, leaving current_quiz alone"""
+        response = self.app.invoke(
+            self.build_quiz_input(topic, subject, num_questions), config=traced_config("quiz")
+        )
+        if response.get("quiz_data") and vector is not None:
+            get_question_bank().add(topic, subject, response["quiz_data"], vector=vector)
+        return response
+    
+    async def arun_quiz_graph(self, topic: str, subject: str = None, num_questions: int = 5, vector=None):
+        """Async run_quiz_graph"""
+        response = await self.app.ainvoke(
+            self.build_quiz_input(topic, subject, num_questions), config=traced_config("quiz")
+        )
+        if response.get("quiz_data") and vector is not None:
+            # Banking writes the bank file, so keep it off the event loop
+            await asyncio.to_thread(get_question_bank().add, topic, subject, response["quiz_data"], vector)
+        return response
+    
     def generate_quiz(self, topic: str, subject: str = None, num_questions: int = 5):
-        """Generate a quiz on a specific topic"""
+        """Generate a quiz on a specific topic, served from the question bank when it has enough"""
         try:
-            response = self.app.invoke({
-                "question": topic,  # Using question field as topic
-                "subject": subject,
-                "documents": [],
-                "quiz_data": [],
-                "quiz_config": {"num_questions": num_questions},
-                "generation": ""
-            })
+            vector = None
+            if QUESTION_BANK_ENABLED:
+                try:
+                    vector = get_question_bank().embed(topic)
+                    banked = get_question_bank().lookup(topic, subject, num_questions, vector=vector)
+                    if banked:
+                        return self.build_bank_result(banked, topic, subject)
+                except Exception as e:
+                    print(f"---QUESTION BANK LOOKUP FAILED: {e}---")
             
-            quiz_data = response.get("quiz_data", [])
-            if quiz_data:
-                self.current_quiz = quiz_data
-                return {
-                    "success": True,
-                    "quiz_data": quiz_data,
-                    "message": f"Generated {len(quiz_data)} questions on {topic}",
-                    "subject": response.get("subject")
-                }
-            else:
-                return {
-                    "success": False,
-                    "message": response.get("generation", "Failed to generate quiz")
-                }
+            response = self.run_quiz_graph(topic, subject, num_questions, vector)
+            return self.build_quiz_result(response, topic)
                 
         except Exception as e:
             return {"success": False, "message": f"Error generating quiz: {e}"}
     
+    async def agenerate_quiz(self, topic: str, subject: str = None, num_questions: int = 5):
+        """Generate a quiz on a specific topic without blocking the event loop"""
+        try:
+            vector = None
+            if QUESTION_BANK_ENABLED:
+                try:
+                    vector = await get_question_bank().aembed(topic)
+                    banked = get_question_bank().lookup(topic, subject, num_questions, vector=vector)
+                    if banked:
+                        return self.build_bank_result(banked, topic, subject)
+                except Exception as e:
+                    print(f"---QUESTION BANK LOOKUP FAILED: {e}---")
+            
+            response = await self.arun_quiz_graph(topic, subject, num_questions, vector)
+            return self.build_quiz_result(response, topic)
+                
+        except Exception as e:
+            return {"success": False, "message": f"Error generating quiz: {e}"}
+    
+    async def awarm_topic(self, topic: str, subject: str = None, num_questions: int = 5):
+        """Generate fresh questions straight into the question bank; the quiz being taken is not replaced"""
+        vector = await get_question_bank().aembed(topic)
+        response = await self.arun_quiz_graph(topic, subject, num_questions, vector)
+        return response.get("quiz_data", [])
+    
     def take_quiz(self):
         """Take the current quiz interactively"""
         if not self.current_quiz:
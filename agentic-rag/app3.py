@@ -5,12 +5,20 @@ import os
 import random
 
 # Langchain imports
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_pinecone import PineconeVectorStore
+from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableSequence
+from langchain_core.runnables import Runnable, RunnableLambda
 from pydantic import BaseModel, Field
-from pinecone import Pinecone
+
+from graph.utils.map_reduce import (
+    agenerate_merged,
+    generate_merged,
+    shard_count,
+    shard_documents,
+    split_count,
+)
+from metrics import traced_chain, traced_config
+from retriever import get_retriever
 
 load_dotenv()
 
@@ -19,6 +27,17 @@ AVAILABLE_SUBJECTS = ["DataMining", "Network", "Distributed"]
 RETRIEVE = "retrieve"
 GENERATE_FLASHCARDS = "generate_flashcards"
 
+# Generate larger decks as concurrent per-batch calls merged into one deck
+FLASHCARD_MAP_REDUCE = os.getenv("FLASHCARD_MAP_REDUCE", "true").lower() == "true"
+# Cards asked of one batch call
+FLASHCARD_CARDS_PER_BATCH = int(os.getenv("FLASHCARD_CARDS_PER_BATCH", "10"))
+# Upper bound on concurrent batch calls per deck
+FLASHCARD_MAX_BATCHES = int(os.getenv("FLASHCARD_MAX_BATCHES", "5"))
+# Retrieved chunks per batch, so batches work from different material
+FLASHCARD_CHUNKS_PER_BATCH = int(os.getenv("FLASHCARD_CHUNKS_PER_BATCH", "3"))
+# Extra calls made when duplicate fronts or short answers leave the deck short
+FLASHCARD_TOP_UP_ROUNDS = int(os.getenv("FLASHCARD_TOP_UP_ROUNDS", "1"))
+
 # State Definition
 class FlashcardState(TypedDict):
     question: str  # This will be the topic/subject for flashcard generation
@@ -28,24 +47,6 @@ class FlashcardState(TypedDict):
     flashcard_config: Optional[dict]
     generation: str
 
-# Initialize components
-embedding = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(os.environ["INDEX_NAME"])
-
-# Retriever function
-def get_retriever(subject=None):
-    vectorstore = PineconeVectorStore(index=index, embedding=embedding)
-    
-    if subject:
-        retriever = vectorstore.as_retriever(
-            search_kwargs={"filter": {"subject": subject}}
-        )
-    else:
-        retriever = vectorstore.as_retriever()
-    
-    return retriever
-
 # Flashcard models
 class Flashcard(BaseModel):
     front: str = Field(description="Question or prompt on the front of the card")
@@ -107,105 +108,201 @@ Number of flashcards to generate: {num_cards}
 Please generate flashcards based on this content.""")
 ])
 
-flashcard_generator_chain: RunnableSequence = flashcard_prompt | structured_llm_flashcard
+flashcard_top_up_prompt = ChatPromptTemplate.from_messages([
+    ("system", flashcard_system_prompt),
+    ("human", """Topic: {topic}
+Subject: {subject}
+
+Documents:
+{documents}
+
+Fronts of cards already in the deck (do not repeat or rephrase them):
+{existing_fronts}
+
+Number of new flashcards to generate: {num_cards}
+
+Please generate flashcards that cover different points of this content.""")
+])
+
+flashcard_generator_chain: Runnable = traced_chain(
+    flashcard_prompt | structured_llm_flashcard, "flashcard_generator_chain"
+)
+flashcard_top_up_chain: Runnable = traced_chain(
+    flashcard_top_up_prompt | structured_llm_flashcard, "flashcard_top_up_chain"
+)
+
+def requested_cards(state: FlashcardState) -> int:
+    return (state.get("flashcard_config") or {}).get("num_cards", 10)
+
+def planned_batches(num_cards: int, num_documents: int = FLASHCARD_MAX_BATCHES) -> int:
+    if not FLASHCARD_MAP_REDUCE:
+        return 1
+    return shard_count(num_cards, FLASHCARD_CARDS_PER_BATCH, FLASHCARD_MAX_BATCHES, num_documents)
 
 # Node functions
-def retrieve(state: FlashcardState) -> Dict[str, Any]:
-    print("---RETRIEVE FOR FLASHCARDS---")
+def select_flashcard_retriever(state: FlashcardState):
     topic = state["question"]  # Using question as topic
     subject = state.get("subject")
     
+    # Larger decks retrieve enough chunks to give every batch its own material
+    search_kwargs = {}
+    batches = planned_batches(requested_cards(state))
+    if batches > 1:
+        search_kwargs["k"] = max(4, batches * FLASHCARD_CHUNKS_PER_BATCH)
+    
     # Create a search query from the topic
     search_query = f"{topic} concepts definitions examples key terms"
     if subject:
         search_query = f"{subject} {search_query}"
         print(f"---FILTERING BY SUBJECT: {subject}---")
-        retriever = get_retriever(subject=subject)
+        retriever = get_retriever(subject=subject, **search_kwargs)
     else:
         print("---NO SUBJECT FILTER---")
-        retriever = get_retriever()
+        retriever = get_retriever(**search_kwargs)
     
-    documents = retriever.invoke(search_query)
+    return retriever, search_query
+
+def build_retrieve_state(state: FlashcardState, documents) -> Dict[str, Any]:
     print(f"---RETRIEVED {len(documents)} DOCUMENTS FOR FLASHCARD GENERATION---")
     
     return {
         "documents": documents, 
+        "question": state["question"],
+        "subject": state.get("subject")
+    }
+
+def retrieve(state: FlashcardState) -> Dict[str, Any]:
+    print("---RETRIEVE FOR FLASHCARDS---")
+    retriever, search_query = select_flashcard_retriever(state)
+    documents = retriever.invoke(search_query)
+    return build_retrieve_state(state, documents)
+
+async def aretrieve(state: FlashcardState) -> Dict[str, Any]:
+    print("---RETRIEVE FOR FLASHCARDS---")
+    retriever, search_query = select_flashcard_retriever(state)
+    documents = await retriever.ainvoke(search_query)
+    return build_retrieve_state(state, documents)
+
+def build_flashcard_inputs(state: FlashcardState) -> List[Dict[str, Any]]:
+    """
+    Inputs for the flashcard generator, one per batch
+
+    A deck that fits in one batch is a single call over all documents. A
+    larger one deals the documents round-robin into batches and splits the
+    card count across them, so every call works from its own chunks and
+    the calls can run concurrently.
+    """
+    num_cards = requested_cards(state)
+    documents = state["documents"]
+    batches = planned_batches(num_cards, len(documents))
+    if batches > 1:
+        print(f"---SPLITTING {num_cards} FLASHCARDS ACROSS {batches} BATCHES---")
+    
+    return [
+        {
+            "documents": "\n\n".join([doc.page_content for doc in batch]),
+            "topic": state["question"],
+            "subject": state.get("subject") or "General",
+            "num_cards": count
+        }
+        for batch, count in zip(shard_documents(documents, batches), split_count(num_cards, batches))
+    ]
+
+def build_top_up_inputs(state: FlashcardState, cards: List[Flashcard]) -> Dict[str, Any]:
+    return {
+        "documents": "\n\n".join([doc.page_content for doc in state["documents"]]),
+        "topic": state["question"],
+        "subject": state.get("subject") or "General",
+        "existing_fronts": "\n".join(f"- {card.front}" for card in cards) or "(none)",
+        "num_cards": requested_cards(state) - len(cards)
+    }
+
+def generate_cards_kwargs(state: FlashcardState) -> Dict[str, Any]:
+    """Arguments shared by generate_merged and agenerate_merged for a deck"""
+    return {
+        "chain": flashcard_generator_chain,
+        "inputs": build_flashcard_inputs(state),
+        "items": lambda result: result.flashcards,
+        "text": lambda card: card.front,
+        "limit": requested_cards(state),
+        "label": "FLASHCARDS",
+        "top_up_chain": flashcard_top_up_chain,
+        "top_up_inputs": lambda cards: build_top_up_inputs(state, cards),
+        # Top-ups belong to map-reduce generation; with it off a deck is one call as before
+        "top_up_rounds": FLASHCARD_TOP_UP_ROUNDS if FLASHCARD_MAP_REDUCE else 0,
+    }
+
+def build_flashcard_state(state: FlashcardState, cards: List[Flashcard]) -> Dict[str, Any]:
+    topic = state["question"]
+    print(f"---GENERATED {len(cards)} FLASHCARDS---")
+    
+    # Convert to serializable format
+    flashcard_data = []
+    for card in cards:
+        flashcard_data.append({
+            "front": card.front,
+            "back": card.back,
+            "category": card.category,
+            "difficulty": card.difficulty,
+            "tags": card.tags
+        })
+    
+    # Generate summary message
+    generation = f"Generated {len(flashcard_data)} flashcards on {topic}. Cards cover various difficulty levels and subtopics. Ready for study session!"
+    
+    return {
+        "flashcard_data": flashcard_data,
+        "generation": generation,
+        "documents": state["documents"],
         "question": topic,
-        "subject": subject
+        "subject": state.get("subject", "General"),
+        "flashcard_config": state.get("flashcard_config", {})
+    }
+
+def build_flashcard_error_state(state: FlashcardState, generation: str) -> Dict[str, Any]:
+    return {
+        "flashcard_data": [],
+        "generation": generation,
+        "question": state["question"],
+        "subject": state.get("subject", "General")
     }
 
 def generate_flashcards(state: FlashcardState) -> Dict[str, Any]:
     print("---GENERATE FLASHCARDS---")
     
-    documents = state["documents"]
-    topic = state["question"]
-    subject = state.get("subject", "General")
-    flashcard_config = state.get("flashcard_config", {})
+    if not state["documents"]:
+        print("---NO DOCUMENTS AVAILABLE FOR FLASHCARD GENERATION---")
+        return build_flashcard_error_state(state, "No documents available to generate flashcards.")
     
-    # Default flashcard configuration
-    num_cards = flashcard_config.get("num_cards", 10)
+    try:
+        cards = generate_merged(**generate_cards_kwargs(state))
+        return build_flashcard_state(state, cards)
+        
+    except Exception as e:
+        print(f"---FLASHCARD GENERATION ERROR: {e}---")
+        return build_flashcard_error_state(state, f"Error generating flashcards: {str(e)}")
+
+async def agenerate_flashcards(state: FlashcardState) -> Dict[str, Any]:
+    print("---GENERATE FLASHCARDS---")
     
-    if not documents:
+    if not state["documents"]:
         print("---NO DOCUMENTS AVAILABLE FOR FLASHCARD GENERATION---")
-        return {
-            "flashcard_data": [],
-            "generation": "No documents available to generate flashcards.",
-            "question": topic,
-            "subject": subject
-        }
+        return build_flashcard_error_state(state, "No documents available to generate flashcards.")
     
     try:
-        # Combine document content
-        doc_content = "\n\n".join([doc.page_content for doc in documents])
-        
-        # Generate flashcards
-        flashcard_result = flashcard_generator_chain.invoke({
-            "documents": doc_content,
-            "topic": topic,
-            "subject": subject,
-            "num_cards": num_cards
-        })
-        
-        print(f"---GENERATED {len(flashcard_result.flashcards)} FLASHCARDS---")
-        
-        # Convert to serializable format
-        flashcard_data = []
-        for card in flashcard_result.flashcards:
-            flashcard_data.append({
-                "front": card.front,
-                "back": card.back,
-                "category": card.category,
-                "difficulty": card.difficulty,
-                "tags": card.tags
-            })
-        
-        # Generate summary message
-        generation = f"Generated {len(flashcard_data)} flashcards on {topic}. Cards cover various difficulty levels and subtopics. Ready for study session!"
-        
-        return {
-            "flashcard_data": flashcard_data,
-            "generation": generation,
-            "documents": documents,
-            "question": topic,
-            "subject": subject,
-            "flashcard_config": flashcard_config
-        }
+        cards = await agenerate_merged(**generate_cards_kwargs(state))
+        return build_flashcard_state(state, cards)
         
     except Exception as e:
         print(f"---FLASHCARD GENERATION ERROR: {e}---")
-        return {
-            "flashcard_data": [],
-            "generation": f"Error generating flashcards: {str(e)}",
-            "question": topic,
-            "subject": subject
-        }
+        return build_flashcard_error_state(state, f"Error generating flashcards: {str(e)}")
 
 # Build graph
 workflow = StateGraph(FlashcardState)
 
-# Add nodes
-workflow.add_node(RETRIEVE, retrieve)
-workflow.add_node(GENERATE_FLASHCARDS, generate_flashcards)
+# Add nodes (sync for the CLI, async for the API)
+workflow.add_node(RETRIEVE, RunnableLambda(retrieve, afunc=aretrieve))
+workflow.add_node(GENERATE_FLASHCARDS, RunnableLambda(generate_flashcards, afunc=agenerate_flashcards))
 
 # Build simple flow: retrieve -> generate flashcards
 workflow.set_entry_point(RETRIEVE)
@@ -221,32 +318,50 @@ class FlashcardSystem:
         self.app = app3
         self.current_flashcards = None
     
+    def build_flashcard_input(self, topic: str, subject: str = None, num_cards: int = 10):
+        return {
+            "question": topic,  # Using question field as topic
+            "subject": subject,
+            "documents": [],
+            "flashcard_data": [],
+            "flashcard_config": {"num_cards": num_cards},
+            "generation": ""
+        }
+    
+    def build_flashcard_result(self, response, topic: str):
+        flashcard_data = response.get("flashcard_data", [])
+        if flashcard_data:
+            self.current_flashcards = flashcard_data
+            return {
+                "success": True,
+                "flashcard_data": flashcard_data,
+                "message": f"Generated {len(flashcard_data)} flashcards on {topic}",
+                "subject": response.get("subject")
+            }
+        else:
+            return {
+                "success": False,
+                "message": response.get("generation", "Failed to generate flashcards")
+            }
+    
     def generate_flashcards(self, topic: str, subject: str = None, num_cards: int = 10):
         """Generate flashcards on a specific topic"""
         try:
-            response = self.app.invoke({
-                "question": topic,  # Using question field as topic
-                "subject": subject,
-                "documents": [],
-                "flashcard_data": [],
-                "flashcard_config": {"num_cards": num_cards},
-                "generation": ""
-            })
-            
-            flashcard_data = response.get("flashcard_data", [])
-            if flashcard_data:
-                self.current_flashcards = flashcard_data
-                return {
-                    "success": True,
-                    "flashcard_data": flashcard_data,
-                    "message": f"Generated {len(flashcard_data)} flashcards on {topic}",
-                    "subject": response.get("subject")
-                }
-            else:
-                return {
-                    "success": False,
-                    "message": response.get("generation", "Failed to generate flashcards")
-                }
+            response = self.app.invoke(
+                self.build_flashcard_input(topic, subject, num_cards), config=traced_config("flashcard")
+            )
+            return self.build_flashcard_result(response, topic)
+                
+        except Exception as e:
+            return {"success": False, "message": f"Error generating flashcards: {e}"}
+    
+    async def agenerate_flashcards(self, topic: str, subject: str = None, num_cards: int = 10):
+        """Generate flashcards on a specific topic without blocking the event loop"""
+        try:
+            response = await self.app.ainvoke(
+                self.build_flashcard_input(topic, subject, num_cards), config=traced_config("flashcard")
+            )
+            return self.build_flashcard_result(response, topic)
                 
         except Exception as e:
             return {"success": False, "message": f"Error generating flashcards: {e}"}
@@ -0,0 +1,291 @@
+"""
+Deterministic stand-ins for OpenAI, Pinecone and Tavily.
+
+install_fakes() must run before any graph or app module is imported: it
+swaps the classes those modules instantiate at import time and seeds the
+retriever pool with an in-memory index.
+"""
+import asyncio
+import hashlib
+import os
+import random
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_core.vectorstores import InMemoryVectorStore
+from pydantic import ConfigDict, Field
+
+# Latencies in seconds; read at call time so a run can change them
+FAKE_SETTINGS: Dict[str, float] = {
+    "llm_latency": 0.05,
+    "embedding_latency": 0.01,
+    "vector_latency": 0.005,
+    "search_latency": 0.1,
+    # Share of documents the fake retrieval grader marks relevant
+    "relevance_ratio": 1.0,
+}
+
+SUBJECT_TOPICS = {
+    "DataMining": ["classification", "clustering", "association rules", "apriori", "decision trees"],
+    "Network": ["OSI model", "TCP", "routing", "OSPF", "subnetting"],
+    "Distributed": ["RPC", "clock synchronization", "replication", "leader election", "two-phase commit"],
+}
+
+def digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def requested_count(text: str, default: int = 3) -> int:
+    match = re.search(r"Number of (?:new )?(?:questions|flashcards) to generate: (\d+)", text)
+    return int(match.group(1)) if match else default
+
+
+def fake_value(name: str, schema: Dict[str, Any], text: str, count: int, index: int = 0) -> Any:
+    """Build a deterministic value matching a JSON schema"""
+    key = f"{digest(text)[:8]}-{index}"
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        return fake_value(name, schema["anyOf"][0], text, count, index)
+
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            prop: fake_value(prop, prop_schema, text, count, index)
+            for prop, prop_schema in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = schema.get("items", {})
+        if items.get("type") == "object":
+            length = count
+        elif name == "options":
+            length = 4
+        else:
+            length = 2
+        return [fake_value(name, items, text, count, i if items.get("type") == "object" else index)
+                for i in range(length)]
+    if kind == "boolean":
+        return True
+    if kind == "integer":
+        return count
+    if kind == "number":
+        return 1.0
+    if name == "correct_answer":
+        return "A"
+    if name == "difficulty":
+        return ["easy", "medium", "hard"][index % 3]
+    return f"Fake {name} {key}"
+
+
+def fake_tool_arguments(tool: Dict[str, Any], text: str) -> Dict[str, Any]:
+    function = tool["function"]
+    name = function["name"]
+
+    if name == "GradeDocuments":
+        relevant = int(digest(text)[:8], 16) % 100 < FAKE_SETTINGS["relevance_ratio"] * 100
+        return {"binary_score": "yes" if relevant else "no"}
+    if name == "RouteQuery":
+        return {"datasource": "vectorstore"}
+    if name == "QueryType":
+        return {"is_conversational": False, "is_question": True}
+
+    return fake_value(name, function.get("parameters", {}), text, requested_count(text))
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that sleeps for FAKE_SETTINGS["llm_latency"] and answers
+    deterministically. Tool-bound calls (with_structured_output) get a tool
+    call whose arguments are built from the tool's JSON schema.
+    """
+
+    model_name: str = Field(default="fake-chat", alias="model")
+    temperature: float = 0.0
+    model_config = ConfigDict(populate_by_name=True, extra="ignore")
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _respond(self, messages, tools: Optional[List[dict]]) -> ChatResult:
+        text = "\n".join(str(message.content) for message in messages)
+        if tools:
+            tool = tools[0]
+            message = AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": tool["function"]["name"],
+                    "args": fake_tool_arguments(tool, text),
+                    "id": f"call_{digest(text)[:12]}",
+                }],
+            )
+        else:
+            message = AIMessage(content=f"Fake answer {digest(text)[:16]}. " + "lorem ipsum " * 20)
+
+        prompt_tokens = len(text) // 4
+        completion_tokens = 60
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(FAKE_SETTINGS["llm_latency"])
+        return self._respond(messages, kwargs.get("tools"))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(FAKE_SETTINGS["llm_latency"])
+        return self._respond(messages, kwargs.get("tools"))
+
+
+class FakeEmbeddings(Embeddings):
+    """Unit vectors seeded from the text hash; equal texts embed equally"""
+
+    def __init__(self, size: int = 256, **kwargs):
+        self.size = size
+        self.model = "fake-embedding"
+
+    def _vector(self, text: str) -> List[float]:
+        rng = random.Random(digest(text))
+        vector = [rng.gauss(0, 1) for _ in range(self.size)]
+        norm = sum(v * v for v in vector) ** 0.5
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(FAKE_SETTINGS["embedding_latency"])
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(FAKE_SETTINGS["embedding_latency"])
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(FAKE_SETTINGS["embedding_latency"])
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(FAKE_SETTINGS["embedding_latency"])
+        return self._vector(text)
+
+
+def metadata_filter(
+    filter: Optional[Dict[str, Any]], namespace: Optional[str] = None
+) -> Optional[Callable[[Document], bool]]:
+    """Translate a Pinecone-style equality filter (and subject namespace) into a document predicate"""
+    if callable(filter):
+        return filter
+    filter = {**(filter or {}), **({"subject": namespace} if namespace else {})}
+    if not filter:
+        return None
+    return lambda doc: all(doc.metadata.get(key) == value for key, value in filter.items())
+
+
+class FakeVectorStore(InMemoryVectorStore):
+    """In-memory index accepting Pinecone-style metadata filters and subject namespaces"""
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter=None, namespace: Optional[str] = None, **kwargs
+    ) -> List[Document]:
+        time.sleep(FAKE_SETTINGS["vector_latency"])
+        return super().similarity_search(query, k=k, filter=metadata_filter(filter, namespace), **kwargs)
+
+    async def asimilarity_search(
+        self, query: str, k: int = 4, filter=None, namespace: Optional[str] = None, **kwargs
+    ) -> List[Document]:
+        await asyncio.sleep(FAKE_SETTINGS["vector_latency"])
+        return await super().asimilarity_search(query, k=k, filter=metadata_filter(filter, namespace), **kwargs)
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter=None, namespace: Optional[str] = None
+    ) -> List[Tuple[Document, float]]:
+        time.sleep(FAKE_SETTINGS["vector_latency"])
+        results = self._similarity_search_with_score_by_vector(
+            embedding, k=k, filter=metadata_filter(filter, namespace)
+        )
+        return [(doc, score) for doc, score, _ in results]
+
+
+class FakeIndex:
+    def describe_index_stats(self) -> Dict[str, Any]:
+        return {"namespaces": {subject: {} for subject in SUBJECT_TOPICS}, "total_vector_count": 0}
+
+
+class FakeSearchTool:
+    """Stand-in for TavilySearch returning max_results deterministic hits"""
+
+    def __init__(self, max_results: int = 3, **kwargs):
+        self.max_results = max_results
+
+    def _results(self, query: str) -> Dict[str, Any]:
+        key = digest(query)[:10]
+        return {
+            "results": [
+                {
+                    "url": f"https://example.com/{key}/{i}",
+                    "title": f"Result {i + 1} for {query}",
+                    "content": f"Web content {key}-{i} about {query}. " + "lorem ipsum " * 30,
+                }
+                for i in range(self.max_results)
+            ]
+        }
+
+    def invoke(self, input: Dict[str, Any], config=None, **kwargs) -> Dict[str, Any]:
+        time.sleep(FAKE_SETTINGS["search_latency"])
+        return self._results(input["query"])
+
+    async def ainvoke(self, input: Dict[str, Any], config=None, **kwargs) -> Dict[str, Any]:
+        await asyncio.sleep(FAKE_SETTINGS["search_latency"])
+        return self._results(input["query"])
+
+
+def build_corpus(chunks_per_subject: int = 100) -> List[Document]:
+    docs = []
+    for subject, topics in SUBJECT_TOPICS.items():
+        for i in range(chunks_per_subject):
+            topic = topics[i % len(topics)]
+            docs.append(Document(
+                page_content=f"{topic} ({subject}) section {i}: " + f"{topic} is explained here. " * 40,
+                metadata={"subject": subject, "page": i, "source": f"{subject}.pdf"},
+            ))
+    return docs
+
+
+def install_fakes(chunks_per_subject: int = 100) -> None:
+    """Swap OpenAI, Tavily and Pinecone for the fakes above"""
+    for var in ["OPENAI_API_KEY", "PINECONE_API_KEY", "INDEX_NAME", "TAVILY_API_KEY"]:
+        os.environ.setdefault(var, "fake")
+    # Keep benchmark quizzes out of the real question bank file
+    os.environ["QUESTION_BANK_PATH"] = ""
+
+    import langchain_openai
+    import langchain_tavily
+
+    langchain_openai.ChatOpenAI = FakeChatModel
+    langchain_openai.OpenAIEmbeddings = FakeEmbeddings
+    langchain_tavily.TavilySearch = FakeSearchTool
+
+    from bm25_index import BM25Index
+    from retriever import retriever_pool
+
+    corpus = build_corpus(chunks_per_subject)
+    retriever_pool.invalidate(reset_clients=True)
+    vectorstore = FakeVectorStore(embedding=retriever_pool.embedding)
+    vectorstore.add_documents(corpus)
+    bm25_index = BM25Index()
+    bm25_index.add_documents(corpus)
+    retriever_pool._index = FakeIndex()
+    retriever_pool._vectorstore = vectorstore
+    retriever_pool._bm25_index = bm25_index
+    retriever_pool._bm25_loaded = True
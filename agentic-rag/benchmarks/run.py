@@ -0,0 +1,238 @@
+"""
+Offline throughput benchmark for the RAG, quiz and flashcard pipelines
+
+Every external service is replaced by the deterministic fakes in
+benchmarks/fakes.py, so runs cost no API credits and are repeatable.
+
+Usage (from the agentic-rag directory):
+    python -m benchmarks.run --target all --requests 200 --concurrency 16
+    python -m benchmarks.run --target chat_api --json results.json
+    python -m benchmarks.run --baseline results.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from benchmarks.fakes import FAKE_SETTINGS, SUBJECT_TOPICS, install_fakes
+
+TARGETS = ["chat_graph", "quiz_graph", "flashcard_graph", "chat_api", "quiz_api", "flashcard_api"]
+SUBJECTS = list(SUBJECT_TOPICS)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def build_workload(requests: int, unique: int) -> List[Dict[str, str]]:
+    """Questions cycle through `unique` variants so cache behaviour is controllable"""
+    workload = []
+    for i in range(requests):
+        variant = i % max(unique, 1)
+        subject = SUBJECTS[variant % len(SUBJECTS)]
+        topic = SUBJECT_TOPICS[subject][variant % len(SUBJECT_TOPICS[subject])]
+        workload.append({
+            "question": f"Explain {topic} in detail, variant {variant}",
+            "topic": f"{topic} {variant}",
+            "subject": subject,
+        })
+    return workload
+
+
+async def run_target(
+    call: Callable[[Dict[str, str]], Awaitable[Any]],
+    workload: List[Dict[str, str]],
+    concurrency: int,
+) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(item: Dict[str, str]) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await call(item)
+            except Exception as e:
+                errors += 1
+                print(f"Benchmark request failed: {e}", file=sys.__stderr__)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(item) for item in workload))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(workload),
+        "errors": errors,
+        "seconds": round(elapsed, 4),
+        "rps": round(len(workload) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def build_calls() -> Dict[str, Callable[[Dict[str, str]], Awaitable[Any]]]:
+    # Imported here so install_fakes() has already patched the clients
+    import httpx
+    from fastapi import FastAPI
+
+    from api import chat, flashcard, quiz
+    from app2 import QuizSystem
+    from app3 import FlashcardSystem
+    from graph.graph import app as rag_app
+    from metrics import traced_config
+
+    quiz_system = QuizSystem()
+    flashcard_system = FlashcardSystem()
+
+    api = FastAPI()
+    api.include_router(chat.router, prefix="/api/chat")
+    api.include_router(quiz.router, prefix="/api/quiz")
+    api.include_router(flashcard.router, prefix="/api/flashcard")
+    api.dependency_overrides[chat.get_rag_app] = lambda: rag_app
+    api.dependency_overrides[quiz.get_quiz_system] = lambda: quiz_system
+    api.dependency_overrides[flashcard.get_flashcard_system] = lambda: flashcard_system
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://benchmark")
+
+    async def post(path: str, payload: Dict[str, Any]) -> None:
+        response = await client.post(path, json=payload)
+        response.raise_for_status()
+
+    return {
+        "chat_graph": lambda item: rag_app.ainvoke(
+            {"question": item["question"], "subject": item["subject"]},
+            config=traced_config("rag"),
+        ),
+        "quiz_graph": lambda item: quiz_system.agenerate_quiz(item["topic"], item["subject"], 5),
+        "flashcard_graph": lambda item: flashcard_system.agenerate_flashcards(item["topic"], item["subject"], 10),
+        "chat_api": lambda item: post(
+            "/api/chat/message", {"question": item["question"], "subject": item["subject"]}
+        ),
+        "quiz_api": lambda item: post(
+            "/api/quiz/generate", {"topic": item["topic"], "subject": item["subject"], "num_questions": 5}
+        ),
+        "flashcard_api": lambda item: post(
+            "/api/flashcard/generate", {"topic": item["topic"], "subject": item["subject"], "num_cards": 10}
+        ),
+    }
+
+
+def clear_caches() -> None:
+    from embedding_cache import get_embeddings
+    from graph.nodes.web_search import web_search_cache
+    from graph.utils.semantic_cache import answer_cache
+    from question_bank import get_question_bank
+
+    answer_cache.clear()
+    get_question_bank().clear()
+    web_search_cache.clear()
+    get_embeddings().clear()
+
+
+def find_regressions(results: Dict[str, Dict], baseline: Dict[str, Dict], max_regression: float) -> List[str]:
+    regressions = []
+    for target, result in results.items():
+        base = baseline.get(target)
+        if not base:
+            continue
+        if result["rps"] < base["rps"] * (1 - max_regression):
+            regressions.append(f"{target}: rps {result['rps']} < baseline {base['rps']}")
+        if result["p90_ms"] > base["p90_ms"] * (1 + max_regression):
+            regressions.append(f"{target}: p90 {result['p90_ms']}ms > baseline {base['p90_ms']}ms")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict]) -> None:
+    header = f"{'target':<16}{'reqs':>6}{'errs':>6}{'rps':>10}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}"
+    print(header)
+    print("-" * len(header))
+    for target, r in results.items():
+        print(
+            f"{target:<16}{r['requests']:>6}{r['errors']:>6}{r['rps']:>10}"
+            f"{r['mean_ms']:>10}{r['p50_ms']:>10}{r['p90_ms']:>10}{r['p99_ms']:>10}"
+        )
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict]:
+    calls = build_calls()
+    targets = TARGETS if args.target == "all" else [args.target]
+    workload = build_workload(args.requests, args.unique_questions)
+
+    results = {}
+    for target in targets:
+        clear_caches()
+        # The pipelines log with print(); keep the report readable
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            results[target] = await run_target(calls[target], workload, args.concurrency)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark with fake OpenAI, Pinecone and Tavily")
+    parser.add_argument("--target", choices=TARGETS + ["all"], default="all")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--unique-questions", type=int, default=50,
+                        help="Distinct questions in the workload; lower values exercise the caches")
+    parser.add_argument("--llm-latency", type=float, default=FAKE_SETTINGS["llm_latency"])
+    parser.add_argument("--embedding-latency", type=float, default=FAKE_SETTINGS["embedding_latency"])
+    parser.add_argument("--vector-latency", type=float, default=FAKE_SETTINGS["vector_latency"])
+    parser.add_argument("--search-latency", type=float, default=FAKE_SETTINGS["search_latency"])
+    parser.add_argument("--relevance-ratio", type=float, default=FAKE_SETTINGS["relevance_ratio"],
+                        help="Share of retrieved documents the fake grader marks relevant")
+    parser.add_argument("--relevance-backend", choices=["llm", "cosine", "cross_encoder"],
+                        help="Override RELEVANCE_BACKEND for grade_documents")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Results file from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed fractional drop in rps or rise in p90 against the baseline")
+    parser.add_argument("--verbose", action="store_true", help="Keep pipeline logging")
+    args = parser.parse_args()
+
+    FAKE_SETTINGS.update({
+        "llm_latency": args.llm_latency,
+        "embedding_latency": args.embedding_latency,
+        "vector_latency": args.vector_latency,
+        "search_latency": args.search_latency,
+        "relevance_ratio": args.relevance_ratio,
+    })
+    if args.relevance_backend:
+        os.environ["RELEVANCE_BACKEND"] = args.relevance_backend
+    install_fakes()
+
+    results = asyncio.run(run(args))
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.max_regression)
+        if regressions:
+            print("\nPerformance regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
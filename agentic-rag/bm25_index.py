@@ -0,0 +1,115 @@
+import json
+import math
+import os
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+from text_utils import tokenize
+
+# JSON file written by ingestion.py and read by the retriever pool
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "bm25_index.json")
+
+
+class BM25Index:
+    """
+    Local inverted index over the ingested chunks, scored with Okapi BM25
+
+    Built at ingestion time from the same chunks that go to Pinecone, so
+    exact terms such as "Apriori" or "OSPF" match even when the dense
+    embedding misses them. Postings keep the chunk id and term frequency;
+    subject metadata is kept per chunk so searches can be filtered.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents: List[Dict[str, Any]] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.avg_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add_documents(self, documents: List[Document]) -> None:
+        for doc in documents:
+            doc_id = len(self.documents)
+            terms = Counter(tokenize(doc.page_content))
+            for term, tf in terms.items():
+                self.postings[term].append((doc_id, tf))
+            self.documents.append({"page_content": doc.page_content, "metadata": doc.metadata or {}})
+            self.lengths.append(sum(terms.values()))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def search(self, query: str, k: int = 4, subject: Optional[str] = None) -> List[Document]:
+        """
+        Top-k chunks for a query
+
+        Args:
+            query: Free-text query
+            k: Number of chunks to return
+            subject: Only consider chunks with this subject metadata
+
+        Returns:
+            Matching chunks, best first; chunks sharing no term are never returned
+        """
+        n = len(self.documents)
+        if not n:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                if subject and self.documents[doc_id]["metadata"].get("subject") != subject:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / self.avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda item: -item[1])[:k]
+        return [
+            Document(
+                page_content=self.documents[doc_id]["page_content"],
+                metadata=dict(self.documents[doc_id]["metadata"]),
+            )
+            for doc_id, _ in best
+        ]
+
+    def save(self, path: str = BM25_INDEX_PATH) -> None:
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "documents": self.documents,
+            "lengths": self.lengths,
+            "postings": self.postings,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = BM25_INDEX_PATH) -> "BM25Index":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.documents = data["documents"]
+        index.lengths = data["lengths"]
+        index.postings = defaultdict(
+            list, {term: [tuple(p) for p in postings] for term, postings in data["postings"].items()}
+        )
+        index.avg_length = sum(index.lengths) / len(index.lengths) if index.lengths else 0.0
+        return index
+
+
+def build_bm25_index(documents: List[Document], path: str = BM25_INDEX_PATH) -> BM25Index:
+    index = BM25Index()
+    index.add_documents(documents)
+    index.save(path)
+    print(f"---BM25 INDEX: {len(index)} CHUNKS, {len(index.postings)} TERMS -> {path}---")
+    return index
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+load_dotenv()
+
+# Embeddings kept in the in-memory LRU tier (float32, ~6 KB each at 1536 dimensions)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+# SQLite file for the on-disk tier; empty keeps the cache in memory only
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with an in-memory LRU tier and an optional SQLite tier
+
+    Entries are keyed by model name and whitespace-normalized text, so a
+    repeated query (e.g. the fixed quiz query template) costs no network
+    round trip. Normalization only applies to the key; the text sent to the
+    model is unchanged, so vectors match an index built without the cache.
+    Vectors are held as float32 arrays and returned as lists, rounded to
+    float32 on a miss too so a text embeds the same either way. The SQLite
+    tier survives restarts and is shared by every process pointed at the
+    same file.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        max_entries: int = EMBEDDING_CACHE_SIZE,
+        path: Optional[str] = EMBEDDING_CACHE_PATH,
+    ):
+        self.underlying = underlying
+        self.model = getattr(underlying, "model", type(underlying).__name__)
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+            )
+            self._db.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                return vector.tolist()
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        vector = array("f", row[0])
+        self._remember(key, vector)
+        return vector.tolist()
+
+    def _remember(self, key: str, vector: array) -> None:
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _put_many(self, items: Dict[str, List[float]]) -> Dict[str, List[float]]:
+        """Store computed vectors and return them as float32-rounded lists, as a hit would"""
+        packed = {key: array("f", vector) for key, vector in items.items()}
+        for key, vector in packed.items():
+            self._remember(key, vector)
+        if self._db is not None and packed:
+            with self._lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in packed.items()],
+                )
+                self._db.commit()
+        return {key: vector.tolist() for key, vector in packed.items()}
+
+    def _lookup(self, texts: List[str]):
+        keys = [self._key(text) for text in texts]
+        vectors = [self._get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return texts, keys, vectors, missing
+
+    def _fill(self, keys: List[str], vectors: List, missing: List[int], computed) -> List[List[float]]:
+        stored = self._put_many({keys[i]: vector for i, vector in zip(missing, computed)})
+        for i in missing:
+            vectors[i] = stored[keys[i]]
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts, keys, vectors, missing = self._lookup(texts)
+        if missing:
+            computed = self.underlying.embed_documents([texts[i] for i in missing])
+            self._fill(keys, vectors, missing, computed)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        texts, keys, vectors, missing = self._lookup([text])
+        if missing:
+            self._fill(keys, vectors, missing, [self.underlying.embed_query(texts[0])])
+        return vectors[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts, keys, vectors, missing = self._lookup(texts)
+        if missing:
+            computed = await self.underlying.aembed_documents([texts[i] for i in missing])
+            self._fill(keys, vectors, missing, computed)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        texts, keys, vectors, missing = self._lookup([text])
+        if missing:
+            self._fill(keys, vectors, missing, [await self.underlying.aembed_query(texts[0])])
+        return vectors[0]
+
+    def clear(self) -> None:
+        """Drop the in-memory tier; the SQLite tier is kept"""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._memory)}
+
+
+_embeddings: Optional[CachedEmbeddings] = None
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings() -> CachedEmbeddings:
+    """Process-wide cached OpenAI embeddings used by every call site"""
+    global _embeddings
+    with _embeddings_lock:
+        if _embeddings is None:
+            _embeddings = CachedEmbeddings(
+                OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
+            )
+        return _embeddings
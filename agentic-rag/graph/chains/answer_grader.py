@@ -1,8 +1,10 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableSequence
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 
+from metrics import traced_chain
+
 
 class GradeAnswer(BaseModel):
 
@@ -23,4 +25,4 @@ answer_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-answer_grader: RunnableSequence = answer_prompt | structured_llm_grader
\ No newline at end of file
+answer_grader: Runnable = traced_chain(answer_prompt | structured_llm_grader, "answer_grader")
\ No newline at end of file
@@ -1,8 +1,10 @@
-from langchain import hub
 from langchain_core.output_parsers import StrOutputParser
 from langchain_openai import ChatOpenAI
 
+from metrics import traced_chain
+from prompt_registry import load_prompt
+
 llm = ChatOpenAI(temperature=0, model="gpt-4o-mini")
-prompt = hub.pull("rlm/rag-prompt")
+prompt = load_prompt("rlm/rag-prompt")
 
-generation_chain = prompt | llm | StrOutputParser()
\ No newline at end of file
+generation_chain = traced_chain(prompt | llm | StrOutputParser(), "generation_chain")
\ No newline at end of file
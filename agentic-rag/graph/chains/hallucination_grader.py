@@ -1,8 +1,10 @@
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableSequence
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 
+from metrics import traced_chain
+
 llm = ChatOpenAI(temperature=0, model = "gpt-4o-mini")
 
 
@@ -25,4 +27,6 @@ hallucination_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-hallucination_grader: RunnableSequence = hallucination_prompt | structured_llm_grader
\ No newline at end of file
+hallucination_grader: Runnable = traced_chain(
+    hallucination_prompt | structured_llm_grader, "hallucination_grader"
+)
\ No newline at end of file
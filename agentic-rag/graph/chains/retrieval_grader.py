@@ -1,8 +1,17 @@
+import os
+
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 
-llm = ChatOpenAI(temperature=0, model="gpt-4o-mini")
+from metrics import traced_chain
+
+# Seconds a single document may take to grade before it counts as not relevant
+GRADER_TIMEOUT_SECONDS = float(os.getenv("GRADER_TIMEOUT_SECONDS", "10"))
+
+# The client-side timeout ends a hung call, so it never keeps a grader worker busy;
+# a retry would run past the timeout, and a failed grade only means "not relevant"
+llm = ChatOpenAI(temperature=0, model="gpt-4o-mini", timeout=GRADER_TIMEOUT_SECONDS, max_retries=0)
 
 
 class GradeDocuments(BaseModel):
@@ -24,4 +33,4 @@ grade_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-retrieval_grader = grade_prompt | structured_llm_grader
\ No newline at end of file
+retrieval_grader = traced_chain(grade_prompt | structured_llm_grader, "retrieval_grader")
\ No newline at end of file
@@ -4,6 +4,8 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 
+from metrics import traced_chain
+
 
 class RouteQuery(BaseModel):
     """Route a user query to the most relevant datasource."""
@@ -33,4 +35,4 @@ route_prompt = ChatPromptTemplate.from_messages(
     ]
 )
 
-question_router = route_prompt | structured_llm_router
\ No newline at end of file
+question_router = traced_chain(route_prompt | structured_llm_router, "question_router")
\ No newline at end of file
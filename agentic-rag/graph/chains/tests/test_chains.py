@@ -3,7 +3,9 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from graph.chains.retrieval_grader import retrieval_grader, GradeDocuments
-from ingestion import retriever
+from retriever import get_retriever
+
+retriever = get_retriever()
 
 def test_retrival_grader_answer_yes() -> None:
     question = "agent memory"
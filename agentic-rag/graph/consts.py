@@ -1,4 +1,7 @@
 RETRIEVE = "retrieve"
 GRADE_DOCUMENTS = "grade_documents"
 GENERATE = "generate"
-WEBSEARCH = "websearch"
\ No newline at end of file
+WEBSEARCH = "websearch"
+ROUTE_QUESTION = "route_question"
+GRADE_GENERATION = "grade_generation"
+FINALIZE = "finalize"
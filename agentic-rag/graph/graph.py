@@ -1,20 +1,52 @@
 from dotenv import load_dotenv
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import END, StateGraph
 
-from graph.chains.answer_grader import answer_grader
-from graph.chains.hallucination_grader import hallucination_grader
-from graph.chains.router import RouteQuery, question_router
-from graph.consts import GENERATE, GRADE_DOCUMENTS, RETRIEVE, WEBSEARCH
-from graph.nodes import generate, grade_documents, retrieve, web_search
+from graph.consts import (
+    FINALIZE,
+    GENERATE,
+    GRADE_DOCUMENTS,
+    GRADE_GENERATION,
+    RETRIEVE,
+    ROUTE_QUESTION,
+    WEBSEARCH,
+)
+from graph.nodes import (
+    agenerate,
+    agrade_documents,
+    agrade_generation,
+    aretrieve,
+    aroute_question,
+    aweb_search,
+    finalize,
+    generate,
+    grade_documents,
+    grade_generation,
+    retrieve,
+    route_question,
+    web_search,
+)
 from graph.state import GraphState
+from graph.utils.budget import budget_exhausted
 
 load_dotenv()
 
 
+def decide_route(state: GraphState) -> str:
+    if state["datasource"] == WEBSEARCH:
+        print("---ROUTE QUESTION TO WEB SEARCH---")
+        return WEBSEARCH
+    print("---ROUTE QUESTION TO RAG---")
+    return RETRIEVE
+
+
 def decide_to_generate(state):
     print("---ASSESS GRADED DOCUMENTS---")
 
     if state["web_search"]:
+        if exhausted := budget_exhausted(state):
+            print(f"---DECISION: BUDGET EXHAUSTED ({exhausted}), GENERATE WITHOUT WEB SEARCH---")
+            return GENERATE
         print(
             "---DECISION: NOT ALL DOCUMENTS ARE RELEVANT TO QUESTION, INCLUDE WEB SEARCH---"
         )
@@ -24,58 +56,36 @@ def decide_to_generate(state):
         return GENERATE
 
 
-def grade_generation_grounded_in_documents_and_question(state: GraphState) -> str:
-    print("---CHECK HALLUCINATIONS---")
-    question = state["question"]
-    documents = state["documents"]
-    generation = state["generation"]
-
-    score = hallucination_grader.invoke(
-        {"documents": documents, "generation": generation}
-    )
-
-    if hallucination_grade := score.binary_score:
-        print("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
-        print("---GRADE GENERATION vs QUESTION---")
-        score = answer_grader.invoke({"question": question, "generation": generation})
-        if answer_grade := score.binary_score:
-            print("---DECISION: GENERATION ADDRESSES QUESTION---")
-            return "useful"
-        else:
-            print("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
-            return "not useful"
-    else:
-        print("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS, RE-TRY---")
-        return "not supported"
-
-
-def route_question(state: GraphState) -> str:
-    print("---ROUTE QUESTION---")
-    question = state["question"]
-    subject = state.get("subject", "")
-    
-    source: RouteQuery = question_router.invoke({
-        "question": question, 
-        "subject": subject
-    })
-    
-    if source.datasource == WEBSEARCH:
-        print("---ROUTE QUESTION TO WEB SEARCH---")
-        return WEBSEARCH
-    elif source.datasource == "vectorstore":
-        print("---ROUTE QUESTION TO RAG---")
-        return RETRIEVE
+def decide_after_generation_grade(state: GraphState) -> str:
+    grade = state["generation_grade"]
+    if grade == "useful":
+        return "useful"
+
+    if exhausted := budget_exhausted(state):
+        print(f"---DECISION: BUDGET EXHAUSTED ({exhausted})---")
+        return "budget exhausted"
 
+    if grade == "not supported":
+        print("---DECISION: RE-TRY GENERATION---")
+    return grade
 
+
+# Every node has a sync and an async implementation so the compiled graph
+# serves both app.invoke (CLI, Streamlit) and app.ainvoke (FastAPI)
 workflow = StateGraph(GraphState)
 
-workflow.add_node(RETRIEVE, retrieve)
-workflow.add_node(GRADE_DOCUMENTS, grade_documents)
-workflow.add_node(GENERATE, generate)
-workflow.add_node(WEBSEARCH, web_search)
+workflow.add_node(ROUTE_QUESTION, RunnableLambda(route_question, afunc=aroute_question))
+workflow.add_node(RETRIEVE, RunnableLambda(retrieve, afunc=aretrieve))
+workflow.add_node(GRADE_DOCUMENTS, RunnableLambda(grade_documents, afunc=agrade_documents))
+workflow.add_node(GENERATE, RunnableLambda(generate, afunc=agenerate))
+workflow.add_node(GRADE_GENERATION, RunnableLambda(grade_generation, afunc=agrade_generation))
+workflow.add_node(WEBSEARCH, RunnableLambda(web_search, afunc=aweb_search))
+workflow.add_node(FINALIZE, finalize)
 
-workflow.set_conditional_entry_point(
-    route_question,
+workflow.set_entry_point(ROUTE_QUESTION)
+workflow.add_conditional_edges(
+    ROUTE_QUESTION,
+    decide_route,
     {
         WEBSEARCH: WEBSEARCH,
         RETRIEVE: RETRIEVE,
@@ -92,17 +102,20 @@ workflow.add_conditional_edges(
     },
 )
 
+workflow.add_edge(GENERATE, GRADE_GENERATION)
 workflow.add_conditional_edges(
-    GENERATE,
-    grade_generation_grounded_in_documents_and_question,
+    GRADE_GENERATION,
+    decide_after_generation_grade,
     {
         "not supported": GENERATE,
-        "useful": END,
+        "useful": FINALIZE,
         "not useful": WEBSEARCH,
+        "budget exhausted": FINALIZE,
     },
 )
 workflow.add_edge(WEBSEARCH, GENERATE)
+workflow.add_edge(FINALIZE, END)
 
 app = workflow.compile()
 
-# app.get_graph().draw_mermaid_png(output_file_path="graph.png")
\ No newline at end of file
+# app.get_graph().draw_mermaid_png(output_file_path="graph.png")
@@ -1,6 +1,23 @@
-from graph.nodes.generate import generate
-from graph.nodes.grade_documents import grade_documents
-from graph.nodes.retrieve import retrieve
-from graph.nodes.web_search import web_search
+from graph.nodes.finalize import finalize
+from graph.nodes.generate import agenerate, generate
+from graph.nodes.grade_documents import agrade_documents, grade_documents
+from graph.nodes.grade_generation import agrade_generation, grade_generation
+from graph.nodes.retrieve import aretrieve, retrieve
+from graph.nodes.route_question import aroute_question, route_question
+from graph.nodes.web_search import aweb_search, web_search
 
-__all__ = ["generate", "grade_documents", "retrieve", "web_search"]
\ No newline at end of file
+__all__ = [
+    "finalize",
+    "generate",
+    "grade_documents",
+    "grade_generation",
+    "retrieve",
+    "route_question",
+    "web_search",
+    "agenerate",
+    "agrade_documents",
+    "agrade_generation",
+    "aretrieve",
+    "aroute_question",
+    "aweb_search",
+]
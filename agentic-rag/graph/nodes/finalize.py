@@ -0,0 +1,38 @@
+from typing import Any, Dict
+
+from graph.state import GraphState
+from graph.utils.source_extractor import extract_sources_from_documents
+
+
+def finalize(state: GraphState) -> Dict[str, Any]:
+    """
+    Ends every RAG run: picks the best graded generation and builds its sources
+
+    Nodes only pass documents along; sources are extracted here, once, from
+    the documents that produced the returned answer. When the budget ran out
+    that is the best answer so far rather than the last one, and its grade
+    tells callers not to cache it unless it is "useful".
+
+    Args:
+        state (dict): The current graph state
+
+    Returns:
+        state (dict): generation, generation_grade and sources of the best
+            graded generation
+    """
+    if state.get("best_generation"):
+        if state.get("best_grade") != "useful":
+            print("---RETURNING BEST ANSWER SO FAR---")
+        generation = state["best_generation"]
+        grade = state.get("best_grade")
+        documents = state.get("best_documents") or []
+    else:
+        generation = state.get("generation")
+        grade = state.get("generation_grade")
+        documents = state.get("context") or state.get("documents") or []
+
+    return {
+        "generation": generation,
+        "generation_grade": grade,
+        "sources": extract_sources_from_documents(documents),
+    }
@@ -1,25 +1,41 @@
-from typing import Any, Dict
+from typing import Any, Dict, List
+
+from langchain.schema import Document
 
 from graph.chains.generation import generation_chain
 from graph.state import GraphState
+from graph.utils.context_packer import pack_context
 
 
-def generate(state: GraphState) -> Dict[str, Any]:
-    print("---GENERATE---")
-    question = state["question"]
-    documents = state["documents"]
-    subject = state.get("subject")
-    sources = state.get("sources", [])
-    loop_count = state.get("loop_count", 0)
-
-    generation = generation_chain.invoke({"context": documents, "question": question})
-    
+def build_generate_state(
+    state: GraphState, generation: str, context: List[Document]
+) -> Dict[str, Any]:
     return {
-        "documents": documents, 
-        "question": question, 
-        "subject": subject,
+        "documents": state["documents"],
+        "context": context,
+        "question": state["question"],
+        "subject": state.get("subject"),
         "generation": generation,
-        "sources": sources,
-        "loop_count": loop_count,
+        "loop_count": state.get("loop_count", 0),
+        "generation_count": state.get("generation_count", 0) + 1,
+        "llm_calls": state.get("llm_calls", 0) + 1,
         "is_conversational": False
-    }
\ No newline at end of file
+    }
+
+
+def generate(state: GraphState) -> Dict[str, Any]:
+    print("---GENERATE---")
+    context = pack_context(state["question"], state["documents"])
+    generation = generation_chain.invoke(
+        {"context": context, "question": state["question"]}
+    )
+    return build_generate_state(state, generation, context)
+
+
+async def agenerate(state: GraphState) -> Dict[str, Any]:
+    print("---GENERATE---")
+    context = pack_context(state["question"], state["documents"])
+    generation = await generation_chain.ainvoke(
+        {"context": context, "question": state["question"]}
+    )
+    return build_generate_state(state, generation, context)
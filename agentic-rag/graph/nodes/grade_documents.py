@@ -1,52 +1,172 @@
-from typing import Any, Dict
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List
 
-from graph.chains.retrieval_grader import retrieval_grader
+from graph.chains.retrieval_grader import GRADER_TIMEOUT_SECONDS, retrieval_grader
 from graph.state import GraphState
-from graph.utils.source_extractor import extract_sources_from_documents
+from graph.utils.relevance import get_relevance_scorer
 
+# Upper bound on grader calls in flight at once (1 grades sequentially)
+GRADER_MAX_CONCURRENCY = int(os.getenv("GRADER_MAX_CONCURRENCY", "4"))
 
-def grade_documents(state: GraphState) -> Dict[str, Any]:
+grader_executor = ThreadPoolExecutor(
+    max_workers=max(GRADER_MAX_CONCURRENCY, 1),
+    thread_name_prefix="retrieval-grader",
+)
+
+
+def grade_document(question: str, document_text: str) -> bool:
     """
-    Determines whether the retrieved documents are relevant to the question.
-    If any document is not relevant, we will set a flag to run web search.
+    Grade a single document against the question
 
     Args:
-        state (dict): The current graph state
+        question: User question
+        document_text: Page content of the retrieved document
 
     Returns:
-        state (dict): Filtered out irrelevant documents and updated web_search state
+        True if the grader judged the document relevant
     """
+    score = retrieval_grader.invoke(
+        {"question": question, "document": document_text}
+    )
+    return score.binary_score.lower() == "yes"
 
-    print("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
-    question = state["question"]
-    documents = state["documents"]
-    subject = state.get("subject")
-    loop_count = state.get("loop_count", 0)
 
+async def agrade_document(question: str, document_text: str) -> bool:
+    score = await retrieval_grader.ainvoke(
+        {"question": question, "document": document_text}
+    )
+    return score.binary_score.lower() == "yes"
+
+
+async def agrade_documents_concurrently(question: str, documents: List) -> List[bool]:
+    """
+    Async counterpart of grade_documents_concurrently
+
+    A semaphore bounds the calls in flight and each call is cancelled after
+    GRADER_TIMEOUT_SECONDS.
+    """
+    semaphore = asyncio.Semaphore(max(GRADER_MAX_CONCURRENCY, 1))
+
+    async def grade(document_text: str) -> bool:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(
+                    agrade_document(question, document_text),
+                    timeout=GRADER_TIMEOUT_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                print("---GRADE: TIMED OUT, TREATING DOCUMENT AS NOT RELEVANT---")
+            except Exception as e:
+                print(f"---GRADE ERROR: {e}---")
+            return False
+
+    return list(await asyncio.gather(*(grade(d.page_content) for d in documents)))
+
+
+def grade_documents_concurrently(question: str, documents: List) -> List[bool]:
+    """
+    Fan all documents out to the retrieval grader at once
+
+    At most GRADER_MAX_CONCURRENCY calls run at the same time. The grader's
+    client ends every call after GRADER_TIMEOUT_SECONDS, so a hung call
+    frees its worker instead of blocking other requests' grading; waiting
+    on each result is bounded the same way. A document that times out or
+    errors is graded as not relevant.
+
+    Args:
+        question: User question
+        documents: Retrieved documents
+
+    Returns:
+        Relevance grades in the same order as documents
+    """
+    futures = [
+        grader_executor.submit(grade_document, question, d.page_content)
+        for d in documents
+    ]
+
+    grades = []
+    for future in futures:
+        try:
+            grades.append(future.result(timeout=GRADER_TIMEOUT_SECONDS))
+        except FutureTimeoutError:
+            print("---GRADE: TIMED OUT, TREATING DOCUMENT AS NOT RELEVANT---")
+            grades.append(False)
+        except Exception as e:
+            print(f"---GRADE ERROR: {e}---")
+            grades.append(False)
+
+    return grades
+
+
+def grades_from_scores(scores: List[float], threshold: float) -> List[bool]:
+    for score in scores:
+        print(f"---RELEVANCE SCORE: {score:.3f}---")
+    return [score >= threshold for score in scores]
+
+
+def build_grade_state(state: GraphState, grades: List[bool], llm_calls: int) -> Dict[str, Any]:
     filtered_docs = []
     web_search = False
-    
-    for d in documents:
-        score = retrieval_grader.invoke(
-            {"question": question, "document": d.page_content}
-        )
-        grade = score.binary_score
-        if grade.lower() == "yes":
+
+    for d, is_relevant in zip(state["documents"], grades):
+        if is_relevant:
             print("---GRADE: DOCUMENT RELEVANT---")
             filtered_docs.append(d)
         else:
             print("---GRADE: DOCUMENT NOT RELEVANT---")
             web_search = True
-            continue
-    
-    # Update sources to match filtered documents
-    filtered_sources = extract_sources_from_documents(filtered_docs)
-    
+
     return {
-        "documents": filtered_docs, 
-        "question": question, 
-        "subject": subject,
+        "documents": filtered_docs,
+        "question": state["question"],
+        "subject": state.get("subject"),
         "web_search": web_search,
-        "sources": filtered_sources,
-        "loop_count": loop_count
+        "loop_count": state.get("loop_count", 0),
+        "llm_calls": state.get("llm_calls", 0) + llm_calls
     }
+
+
+def grade_documents(state: GraphState) -> Dict[str, Any]:
+    """
+    Determines whether the retrieved documents are relevant to the question.
+    If any document is not relevant, we will set a flag to run web search.
+    RELEVANCE_BACKEND picks the per-document LLM grader or a local scorer
+    that grades every document in one batch.
+
+    Args:
+        state (dict): The current graph state
+
+    Returns:
+        state (dict): Filtered out irrelevant documents and updated web_search state
+    """
+
+    print("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
+    scorer = get_relevance_scorer()
+    if scorer is not None:
+        try:
+            scores = scorer.score(state["question"], state["documents"])
+            return build_grade_state(state, grades_from_scores(scores, scorer.threshold), 0)
+        except Exception as e:
+            print(f"---LOCAL RELEVANCE SCORING FAILED ({e}), USING LLM GRADER---")
+
+    grades = grade_documents_concurrently(state["question"], state["documents"])
+    return build_grade_state(state, grades, len(grades))
+
+
+async def agrade_documents(state: GraphState) -> Dict[str, Any]:
+    """Async counterpart of grade_documents"""
+    print("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
+    scorer = get_relevance_scorer()
+    if scorer is not None:
+        try:
+            scores = await scorer.ascore(state["question"], state["documents"])
+            return build_grade_state(state, grades_from_scores(scores, scorer.threshold), 0)
+        except Exception as e:
+            print(f"---LOCAL RELEVANCE SCORING FAILED ({e}), USING LLM GRADER---")
+
+    grades = await agrade_documents_concurrently(state["question"], state["documents"])
+    return build_grade_state(state, grades, len(grades))
@@ -0,0 +1,89 @@
+from typing import Any, Dict
+
+from graph.chains.answer_grader import answer_grader
+from graph.chains.hallucination_grader import hallucination_grader
+from graph.state import GraphState
+from graph.utils.budget import budget_exhausted
+
+# Higher is better; used to keep the best answer seen so far
+GRADE_RANKS = {"not supported": 0, "not useful": 1, "useful": 2}
+
+
+def build_grade_generation_state(state: GraphState, grade: str, llm_calls: int) -> Dict[str, Any]:
+    update = {
+        "generation_grade": grade,
+        "llm_calls": state.get("llm_calls", 0) + llm_calls,
+    }
+
+    rank = GRADE_RANKS.get(grade, -1)
+    if rank >= state.get("best_rank", -1):
+        update["best_generation"] = state["generation"]
+        # Sources of the answer come from the packed context it was generated from
+        update["best_documents"] = state.get("context") or state["documents"]
+        update["best_grade"] = grade
+        update["best_rank"] = rank
+
+    return update
+
+
+def grade_generation(state: GraphState) -> Dict[str, Any]:
+    """
+    Checks the generation for hallucinations and whether it answers the question.
+    Skips both checks when the request budget is already spent.
+
+    Args:
+        state (dict): The current graph state
+
+    Returns:
+        state (dict): generation_grade, updated llm_calls and best answer so far
+    """
+    if budget_exhausted(state):
+        print("---BUDGET EXHAUSTED, SKIPPING GENERATION CHECKS---")
+        return build_grade_generation_state(state, "unchecked", 0)
+
+    print("---CHECK HALLUCINATIONS---")
+    score = hallucination_grader.invoke(
+        {"documents": state.get("context", state["documents"]), "generation": state["generation"]}
+    )
+    if not score.binary_score:
+        print("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS---")
+        return build_grade_generation_state(state, "not supported", 1)
+
+    print("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
+    print("---GRADE GENERATION vs QUESTION---")
+    score = answer_grader.invoke(
+        {"question": state["question"], "generation": state["generation"]}
+    )
+    if score.binary_score:
+        print("---DECISION: GENERATION ADDRESSES QUESTION---")
+        return build_grade_generation_state(state, "useful", 2)
+
+    print("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
+    return build_grade_generation_state(state, "not useful", 2)
+
+
+async def agrade_generation(state: GraphState) -> Dict[str, Any]:
+    """Async counterpart of grade_generation"""
+    if budget_exhausted(state):
+        print("---BUDGET EXHAUSTED, SKIPPING GENERATION CHECKS---")
+        return build_grade_generation_state(state, "unchecked", 0)
+
+    print("---CHECK HALLUCINATIONS---")
+    score = await hallucination_grader.ainvoke(
+        {"documents": state.get("context", state["documents"]), "generation": state["generation"]}
+    )
+    if not score.binary_score:
+        print("---DECISION: GENERATION IS NOT GROUNDED IN DOCUMENTS---")
+        return build_grade_generation_state(state, "not supported", 1)
+
+    print("---DECISION: GENERATION IS GROUNDED IN DOCUMENTS---")
+    print("---GRADE GENERATION vs QUESTION---")
+    score = await answer_grader.ainvoke(
+        {"question": state["question"], "generation": state["generation"]}
+    )
+    if score.binary_score:
+        print("---DECISION: GENERATION ADDRESSES QUESTION---")
+        return build_grade_generation_state(state, "useful", 2)
+
+    print("---DECISION: GENERATION DOES NOT ADDRESS QUESTION---")
+    return build_grade_generation_state(state, "not useful", 2)
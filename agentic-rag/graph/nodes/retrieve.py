@@ -1,34 +1,38 @@
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from graph.state import GraphState
-from ingestion import get_retriever
-from graph.utils.source_extractor import extract_sources_from_documents
+from retriever import get_retriever
 
 
-def retrieve(state: GraphState) -> Dict[str, Any]:
-    print("---RETRIEVE---")
-    question = state["question"]
-    subject = state.get("subject")
-    loop_count = state.get("loop_count", 0)
-    
+def select_retriever(subject):
     if subject:
         print(f"---FILTERING BY SUBJECT: {subject}---")
-        retriever = get_retriever(subject=subject)
-    else:
-        print("---NO SUBJECT FILTER---")
-        retriever = get_retriever()
-    
-    documents = retriever.invoke(question)
+        return get_retriever(subject=subject)
+    print("---NO SUBJECT FILTER---")
+    return get_retriever()
+
+
+def build_retrieve_state(state: GraphState, documents: List) -> Dict[str, Any]:
     print(f"---RETRIEVED {len(documents)} DOCUMENTS---")
-    
-    # Extract source information
-    sources = extract_sources_from_documents(documents)
-    
+
     return {
-        "documents": documents, 
-        "question": question, 
-        "subject": subject,
-        "sources": sources,
-        "loop_count": loop_count,
+        "documents": documents,
+        "question": state["question"],
+        "subject": state.get("subject"),
+        "loop_count": state.get("loop_count", 0),
         "is_conversational": False
-    }
\ No newline at end of file
+    }
+
+
+def retrieve(state: GraphState) -> Dict[str, Any]:
+    print("---RETRIEVE---")
+    retriever = select_retriever(state.get("subject"))
+    documents = retriever.invoke(state["question"])
+    return build_retrieve_state(state, documents)
+
+
+async def aretrieve(state: GraphState) -> Dict[str, Any]:
+    print("---RETRIEVE---")
+    retriever = select_retriever(state.get("subject"))
+    documents = await retriever.ainvoke(state["question"])
+    return build_retrieve_state(state, documents)
@@ -0,0 +1,31 @@
+import time
+from typing import Any, Dict
+
+from graph.chains.router import RouteQuery, question_router
+from graph.state import GraphState
+
+
+def build_route_state(state: GraphState, source: RouteQuery) -> Dict[str, Any]:
+    return {
+        "datasource": source.datasource,
+        "llm_calls": state.get("llm_calls", 0) + 1,
+        "started_at": state.get("started_at") or time.time(),
+    }
+
+
+def route_question(state: GraphState) -> Dict[str, Any]:
+    print("---ROUTE QUESTION---")
+    source: RouteQuery = question_router.invoke({
+        "question": state["question"],
+        "subject": state.get("subject", "")
+    })
+    return build_route_state(state, source)
+
+
+async def aroute_question(state: GraphState) -> Dict[str, Any]:
+    print("---ROUTE QUESTION---")
+    source: RouteQuery = await question_router.ainvoke({
+        "question": state["question"],
+        "subject": state.get("subject", "")
+    })
+    return build_route_state(state, source)
@@ -1,36 +1,68 @@
-from typing import Any, Dict
+import os
+import re
+from typing import Any, Dict, List
 
 from dotenv import load_dotenv
 from langchain.schema import Document
 from langchain_tavily import TavilySearch
 
 from graph.state import GraphState
-from graph.utils.source_extractor import extract_sources_from_documents
+from graph.utils.context_packer import merge_documents
+from graph.utils.ttl_cache import TTLCache
 
 load_dotenv()
 web_search_tool = TavilySearch(max_results=3)
 
+# Tavily results shared across requests and loop attempts
+web_search_cache = TTLCache(
+    ttl_seconds=float(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS", "3600")),
+    max_entries=int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "1000")),
+)
 
-def web_search(state: GraphState) -> Dict[str, Any]:
-    print("---WEB SEARCH---")
+
+def normalize_search_query(search_query: str) -> str:
+    return re.sub(r"\s+", " ", search_query).strip().lower()
+
+
+def search(search_query: str) -> List[dict]:
+    key = normalize_search_query(search_query)
+    results = web_search_cache.get(key)
+    if results is None:
+        results = web_search_tool.invoke({"query": search_query})["results"]
+        web_search_cache.set(key, results)
+    else:
+        print("---WEB SEARCH CACHE HIT---")
+    return results
+
+
+async def asearch(search_query: str) -> List[dict]:
+    key = normalize_search_query(search_query)
+    results = web_search_cache.get(key)
+    if results is None:
+        results = (await web_search_tool.ainvoke({"query": search_query}))["results"]
+        web_search_cache.set(key, results)
+    else:
+        print("---WEB SEARCH CACHE HIT---")
+    return results
+
+
+def build_search_query(state: GraphState) -> str:
     question = state["question"]
     subject = state.get("subject")
-    documents = state.get("documents", [])
-    sources = state.get("sources", [])
-    loop_count = state.get("loop_count", 0)
-    
-    # Increment loop counter
-    loop_count += 1
-    print(f"---WEB SEARCH ATTEMPT {loop_count}---")
-    
+
     # Enhance search query with subject context if available
     search_query = question
     if subject:
         search_query = f"{question} {subject}"
         print(f"---ENHANCED SEARCH QUERY: {search_query}---")
-    
-    tavily_results = web_search_tool.invoke({"query": search_query})["results"]
-    
+    return search_query
+
+
+def build_web_search_state(
+    state: GraphState, tavily_results: List[dict], search_query: str, loop_count: int
+) -> Dict[str, Any]:
+    documents = state.get("documents", [])
+
     # Create web search documents with proper metadata
     web_docs = []
     for i, result in enumerate(tavily_results):
@@ -45,18 +77,36 @@ def web_search(state: GraphState) -> Dict[str, Any]:
             }
         )
         web_docs.append(web_doc)
-    
-    # Combine with existing documents
-    all_documents = documents + web_docs
-    
-    # Update sources to include web search results
-    updated_sources = extract_sources_from_documents(all_documents)
-    
+
+    # Combine with existing documents, dropping repeated hits from earlier loops
+    all_documents = merge_documents(state["question"], documents, web_docs)
+
     return {
-        "documents": all_documents, 
-        "question": question, 
-        "subject": subject,
-        "sources": updated_sources,
+        "documents": all_documents,
+        "question": state["question"],
+        "subject": state.get("subject"),
         "loop_count": loop_count,
         "is_conversational": False
-    }
\ No newline at end of file
+    }
+
+
+def web_search(state: GraphState) -> Dict[str, Any]:
+    print("---WEB SEARCH---")
+    # Increment loop counter
+    loop_count = state.get("loop_count", 0) + 1
+    print(f"---WEB SEARCH ATTEMPT {loop_count}---")
+
+    search_query = build_search_query(state)
+    tavily_results = search(search_query)
+    return build_web_search_state(state, tavily_results, search_query, loop_count)
+
+
+async def aweb_search(state: GraphState) -> Dict[str, Any]:
+    print("---WEB SEARCH---")
+    # Increment loop counter
+    loop_count = state.get("loop_count", 0) + 1
+    print(f"---WEB SEARCH ATTEMPT {loop_count}---")
+
+    search_query = build_search_query(state)
+    tavily_results = await asearch(search_query)
+    return build_web_search_state(state, tavily_results, search_query, loop_count)
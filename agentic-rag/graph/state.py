@@ -11,9 +11,20 @@ class GraphState(TypedDict):
         generation: LLM generation
         web_search: whether to add search
         documents: list of documents
-        sources: source information from document metadata
+        context: token-budgeted documents the last generation was given
+        sources: source information from document metadata, set once by finalize
         loop_count: counter to prevent infinite loops
         is_conversational: flag for simple conversational queries
+        datasource: datasource picked by the question router
+        generation_grade: outcome of the last hallucination/answer check
+        generation_count: number of generations produced so far
+        llm_calls: number of LLM calls made so far
+        started_at: wall-clock start of the run (epoch seconds)
+        budget: per-request overrides for max_loops, max_llm_calls, max_seconds
+        best_generation: best graded generation so far
+        best_documents: packed context best_generation was generated from
+        best_rank: grade rank of best_generation
+        best_grade: generation_grade of best_generation
     """
 
     question: str
@@ -21,6 +32,17 @@ class GraphState(TypedDict):
     generation: str
     web_search: bool
     documents: List[str]
+    context: Optional[List[str]]
     sources: Optional[List[dict]] 
     loop_count: int  # Added loop counter
-    is_conversational: bool  # Added conversational flag
\ No newline at end of file
+    is_conversational: bool  # Added conversational flag
+    datasource: Optional[str]
+    generation_grade: Optional[str]
+    generation_count: int
+    llm_calls: int
+    started_at: float
+    budget: Optional[dict]
+    best_generation: Optional[str]
+    best_documents: Optional[List[str]]
+    best_rank: int
+    best_grade: Optional[str]
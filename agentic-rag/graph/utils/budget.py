@@ -0,0 +1,49 @@
+import os
+import time
+from typing import Dict, Optional
+
+from graph.state import GraphState
+
+# Web-search loops plus regenerations allowed per request
+GRAPH_MAX_LOOPS = int(os.getenv("GRAPH_MAX_LOOPS", "3"))
+# LLM calls (router, graders, generator) allowed per request
+GRAPH_MAX_LLM_CALLS = int(os.getenv("GRAPH_MAX_LLM_CALLS", "20"))
+# Wall-clock seconds allowed per request
+GRAPH_MAX_SECONDS = float(os.getenv("GRAPH_MAX_SECONDS", "60"))
+
+DEFAULT_BUDGET = {
+    "max_loops": GRAPH_MAX_LOOPS,
+    "max_llm_calls": GRAPH_MAX_LLM_CALLS,
+    "max_seconds": GRAPH_MAX_SECONDS,
+}
+
+
+def get_budget(state: GraphState) -> Dict[str, float]:
+    return {**DEFAULT_BUDGET, **(state.get("budget") or {})}
+
+
+def loops_used(state: GraphState) -> int:
+    """Web-search attempts plus generations beyond the first"""
+    return state.get("loop_count", 0) + max(state.get("generation_count", 0) - 1, 0)
+
+
+def budget_exhausted(state: GraphState) -> Optional[str]:
+    """
+    Check the per-request budget
+
+    Args:
+        state: The current graph state
+
+    Returns:
+        The name of the exhausted limit, or None while within budget
+    """
+    budget = get_budget(state)
+
+    if loops_used(state) >= budget["max_loops"]:
+        return "loops"
+    if state.get("llm_calls", 0) >= budget["max_llm_calls"]:
+        return "llm_calls"
+    started_at = state.get("started_at")
+    if started_at and time.time() - started_at >= budget["max_seconds"]:
+        return "time"
+    return None
@@ -0,0 +1,164 @@
+import hashlib
+import math
+import os
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import tiktoken
+from langchain.schema import Document
+
+from text_utils import tokenize
+
+# Encoding used by the ingestion splitter, so chunk sizes and budgets agree
+TIKTOKEN_ENCODING = "gpt2"
+# Characters per token assumed when the tiktoken encoding cannot be loaded
+APPROX_CHARS_PER_TOKEN = 4
+# Context tokens handed to the generation prompt
+GENERATION_CONTEXT_TOKENS = int(os.getenv("GENERATION_CONTEXT_TOKENS", "3000"))
+# Documents kept in graph state across web-search loops
+MAX_ACCUMULATED_DOCUMENTS = int(os.getenv("MAX_ACCUMULATED_DOCUMENTS", "12"))
+
+
+@lru_cache(maxsize=1)
+def get_encoder() -> Optional[tiktoken.Encoding]:
+    """
+    The tiktoken encoding, or None when it cannot be loaded
+
+    tiktoken downloads encoding files on first use; without network access
+    token counts fall back to a characters-per-token estimate instead of
+    failing every request.
+    """
+    try:
+        return tiktoken.get_encoding(TIKTOKEN_ENCODING)
+    except Exception as e:
+        print(f"---TIKTOKEN ENCODING UNAVAILABLE ({e}), ESTIMATING TOKEN COUNTS---")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoder = get_encoder()
+    if encoder is None:
+        return math.ceil(len(text) / APPROX_CHARS_PER_TOKEN)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoder = get_encoder()
+    if encoder is None:
+        return text[:max_tokens * APPROX_CHARS_PER_TOKEN]
+    return encoder.decode(encoder.encode(text, disallowed_special=())[:max_tokens])
+
+
+def content_key(doc: Document) -> str:
+    normalized = re.sub(r"\s+", " ", doc.page_content).strip().lower()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def document_key(doc: Document) -> str:
+    """URL for web results, normalized content hash for everything else"""
+    source = (doc.metadata or {}).get("source", "")
+    if isinstance(source, str) and source.startswith(("http://", "https://")):
+        return source
+    return content_key(doc)
+
+
+def dedupe_documents(documents: List[Document]) -> List[Document]:
+    """Drop documents whose URL or whitespace-normalized text was already seen, keeping the first"""
+    seen = set()
+    unique = []
+    for doc in documents:
+        key = document_key(doc)
+        if key not in seen:
+            seen.add(key)
+            unique.append(doc)
+    return unique
+
+
+def relevance_score(question_terms: set, doc: Document) -> float:
+    """Share of question terms that occur in the chunk"""
+    if not question_terms:
+        return 0.0
+    return len(question_terms & set(tokenize(doc.page_content))) / len(question_terms)
+
+
+def rank_documents(question: str, documents: List[Document]) -> List[Document]:
+    """
+    Order chunks by question-term overlap. Ties keep their incoming order, which
+    is the retriever's similarity order followed by web results oldest first.
+    """
+    question_terms = set(tokenize(question))
+    scored: List[Tuple[float, int, Document]] = [
+        (relevance_score(question_terms, doc), i, doc) for i, doc in enumerate(documents)
+    ]
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [doc for _, _, doc in scored]
+
+
+def merge_documents(
+    question: str,
+    documents: List[Document],
+    new_documents: List[Document],
+    max_documents: int = MAX_ACCUMULATED_DOCUMENTS,
+) -> List[Document]:
+    """
+    Add new documents to the accumulated ones without duplicates or unbounded growth
+
+    When the merged list exceeds max_documents, the highest-ranked documents
+    are kept in their original order, so graded vector-store chunks still
+    come before web results.
+
+    Args:
+        question: The user question used for ranking
+        documents: Documents already in graph state
+        new_documents: Documents from the latest retrieval or web search
+        max_documents: Cap on the documents kept
+
+    Returns:
+        The merged, deduplicated and bounded document list
+    """
+    merged = dedupe_documents(documents + new_documents)
+    if len(merged) <= max_documents:
+        return merged
+
+    keep = {id(doc) for doc in rank_documents(question, merged)[:max_documents]}
+    print(f"---KEEPING {max_documents}/{len(merged)} ACCUMULATED DOCUMENTS---")
+    return [doc for doc in merged if id(doc) in keep]
+
+
+def pack_context(
+    question: str, documents: List[Document], max_tokens: int = GENERATION_CONTEXT_TOKENS
+) -> List[Document]:
+    """
+    Dedupe, rank and pack documents into a token budget for the generation prompt
+
+    Chunks that do not fit are skipped so a smaller, lower-ranked chunk can
+    still use the remaining space. If not even the best chunk fits, it is
+    truncated to the budget so generation always has some context.
+
+    Args:
+        question: The user question used for ranking
+        documents: Retrieved and web-search documents
+        max_tokens: Token budget for the packed context
+
+    Returns:
+        The packed documents, most relevant first
+    """
+    ranked = rank_documents(question, dedupe_documents(documents))
+
+    packed = []
+    used = 0
+    for doc in ranked:
+        tokens = count_tokens(doc.page_content)
+        if used + tokens <= max_tokens:
+            packed.append(doc)
+            used += tokens
+
+    if not packed and ranked:
+        top = ranked[0]
+        text = truncate_tokens(top.page_content, max_tokens)
+        packed.append(Document(page_content=text, metadata=top.metadata))
+        used = max_tokens
+
+    print(f"---PACKED {len(packed)}/{len(documents)} DOCUMENTS INTO {used} TOKENS---")
+    return packed
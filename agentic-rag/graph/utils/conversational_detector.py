@@ -1,8 +1,14 @@
-from typing import Dict
+from typing import Dict, Optional
+
+import numpy as np
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 
+from embedding_cache import get_embeddings
+from graph.utils.intent_classifier import IntentClassifier
+from metrics import traced_chain
+
 
 class QueryType(BaseModel):
     """Classify query type"""
@@ -46,21 +52,63 @@ query_classifier_prompt = ChatPromptTemplate.from_messages([
     ("human", "Query: {query}")
 ])
 
-query_classifier = query_classifier_prompt | structured_llm
+query_classifier = traced_chain(query_classifier_prompt | structured_llm, "query_classifier")
+
+
+# Same shared embeddings as the answer cache, so its query vector can be reused
+intent_classifier = IntentClassifier(get_embeddings())
 
 
-def detect_conversational_query(query: str, subject: str) -> Dict[str, bool]:
+async def awarm_up() -> None:
+    """Embed the intent examples at startup instead of on the first request"""
+    try:
+        await intent_classifier.aprepare()
+    except Exception as e:
+        print(f"---INTENT CLASSIFIER WARM-UP FAILED: {e}---")
+
+
+def detect_conversational_query(
+    query: str, subject: str, vector: Optional[np.ndarray] = None
+) -> Dict[str, bool]:
     """
     Detect if a query is conversational or informational
+
+    Clear cases are decided locally by intent_classifier; the LLM classifier
+    only runs when the local classifier is unsure.
     
     Args:
         query: User input query
+        subject: Subject the student is asking about
+        vector: Normalized query embedding from answer_cache, if available
         
     Returns:
         Dict with is_conversational and is_question flags
     """
+    if vector is not None:
+        intent_classifier.prepare()
+    local = intent_classifier.classify(query, subject, vector)
+    if local is not None:
+        return local
+
     result = query_classifier.invoke({"query": query, "subject": subject})
     return {
         "is_conversational": result.is_conversational,
         "is_question": result.is_question
-    }
\ No newline at end of file
+    }
+
+
+async def adetect_conversational_query(
+    query: str, subject: str, vector: Optional[np.ndarray] = None
+) -> Dict[str, bool]:
+    """Async counterpart of detect_conversational_query"""
+    if vector is not None:
+        await intent_classifier.aprepare()
+    local = intent_classifier.classify(query, subject, vector)
+    if local is not None:
+        return local
+
+    result = await query_classifier.ainvoke({"query": query, "subject": subject})
+    return {
+        "is_conversational": result.is_conversational,
+        "is_question": result.is_question
+    }
@@ -0,0 +1,182 @@
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Nearest example must be at least this similar to the query to be trusted
+INTENT_MIN_SIMILARITY = float(os.getenv("INTENT_MIN_SIMILARITY", "0.85"))
+# Required lead of the winning label over the other before skipping the LLM
+INTENT_MARGIN = float(os.getenv("INTENT_MARGIN", "0.04"))
+
+# Short social messages answered without any embedding or LLM call
+SMALL_TALK_PATTERN = re.compile(
+    r"^(hi|hii+|hello|hey|hey there|hi there|hello there|yo|hiya|greetings|"
+    r"good (morning|afternoon|evening|night)|"
+    r"thanks?( a lot| so much| you| you so much| you very much)?|thank you|thx|ty|"
+    r"ok|okay|cool|great|nice|awesome|got it|"
+    r"bye|goodbye|see you|see ya|"
+    r"how are you( doing)?( today)?|how's it going|hows it going|what's up|whats up|sup)"
+    r"( (bot|buddy|friend))?$"
+)
+
+CONVERSATIONAL_EXAMPLES = [
+    "hello",
+    "hi, how are you?",
+    "good morning!",
+    "thanks for the help",
+    "thank you so much",
+    "what is the weather today?",
+    "tell me a joke",
+    "how old are you?",
+    "who are you?",
+    "what's your name?",
+    "what should I eat for dinner?",
+    "who won the football match yesterday?",
+    "recommend me a movie",
+    "tell me about cats",
+    "bye, see you later",
+]
+
+SUBJECT_EXAMPLES: Dict[str, List[str]] = {
+    "DataMining": [
+        "what is classification in data mining?",
+        "explain the apriori algorithm",
+        "difference between clustering and classification",
+        "how does k-means clustering work?",
+        "what is support and confidence in association rules?",
+        "explain decision tree induction",
+        "what is data preprocessing?",
+        "what is an OLAP cube in a data warehouse?",
+    ],
+    "Network": [
+        "what is the OSI model?",
+        "explain the TCP three-way handshake",
+        "difference between TCP and UDP",
+        "how does OSPF routing work?",
+        "what is subnetting?",
+        "explain symmetric and asymmetric encryption",
+        "what is a firewall?",
+        "how does the distance vector routing algorithm work?",
+    ],
+    "Distributed": [
+        "what is a distributed system?",
+        "explain remote procedure call",
+        "what is clock synchronization in distributed systems?",
+        "explain the two-phase commit protocol",
+        "what is replication and consistency?",
+        "how does leader election work?",
+        "explain mutual exclusion in distributed systems",
+        "what is fault tolerance?",
+    ],
+}
+
+CONVERSATIONAL = {"is_conversational": True, "is_question": False}
+QUESTION = {"is_conversational": False, "is_question": True}
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s']", " ", query.lower())).strip()
+
+
+def is_small_talk(query: str) -> bool:
+    return bool(SMALL_TALK_PATTERN.match(normalize_query(query)))
+
+
+class IntentClassifier:
+    """
+    Local conversational/question classifier
+
+    Clear small talk is caught by a pattern match. Otherwise the query
+    embedding is compared to labelled examples: conversational ones and the
+    question examples of the requested subject. classify() returns None when
+    neither side wins clearly, leaving the decision to the LLM classifier.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        conversational_examples: List[str] = CONVERSATIONAL_EXAMPLES,
+        subject_examples: Dict[str, List[str]] = SUBJECT_EXAMPLES,
+        min_similarity: float = INTENT_MIN_SIMILARITY,
+        margin: float = INTENT_MARGIN,
+    ):
+        self.embeddings = embeddings
+        self.conversational_examples = conversational_examples
+        self.subject_examples = subject_examples
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self._vectors: Optional[Dict[str, np.ndarray]] = None
+        self._lock = threading.Lock()
+
+    def _example_texts(self):
+        labels = ["conversational"] * len(self.conversational_examples)
+        texts = list(self.conversational_examples)
+        for subject, examples in self.subject_examples.items():
+            labels.extend([subject] * len(examples))
+            texts.extend(examples)
+        return labels, texts
+
+    def _set_vectors(self, labels: List[str], raw_vectors) -> None:
+        matrix = np.asarray(raw_vectors, dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        label_array = np.asarray(labels)
+        with self._lock:
+            self._vectors = {
+                label: matrix[label_array == label] for label in dict.fromkeys(labels)
+            }
+
+    def prepare(self) -> None:
+        """Embed the labelled examples once"""
+        if self._vectors is None:
+            labels, texts = self._example_texts()
+            self._set_vectors(labels, self.embeddings.embed_documents(texts))
+
+    async def aprepare(self) -> None:
+        if self._vectors is None:
+            labels, texts = self._example_texts()
+            self._set_vectors(labels, await self.embeddings.aembed_documents(texts))
+
+    def classify(
+        self, query: str, subject: Optional[str] = None, vector: Optional[np.ndarray] = None
+    ) -> Optional[Dict[str, bool]]:
+        """
+        Classify a query without calling the LLM
+
+        Args:
+            query: User input query
+            subject: Subject the student is asking about
+            vector: Normalized query embedding; without it only the pattern
+                match runs
+
+        Returns:
+            Dict with is_conversational and is_question flags, or None when unsure
+        """
+        if is_small_talk(query):
+            return dict(CONVERSATIONAL)
+
+        if vector is None or self._vectors is None:
+            return None
+
+        if subject in self._vectors:
+            question_vectors = self._vectors[subject]
+        else:
+            question_vectors = np.concatenate(
+                [v for label, v in self._vectors.items() if label != "conversational"]
+            )
+
+        conversational_similarity = float(np.max(self._vectors["conversational"] @ vector))
+        question_similarity = float(np.max(question_vectors @ vector))
+
+        if (
+            conversational_similarity >= self.min_similarity
+            and conversational_similarity - question_similarity >= self.margin
+        ):
+            return dict(CONVERSATIONAL)
+        if (
+            question_similarity >= self.min_similarity
+            and question_similarity - conversational_similarity >= self.margin
+        ):
+            return dict(QUESTION)
+        return None
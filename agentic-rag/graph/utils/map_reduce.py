@@ -0,0 +1,178 @@
+import math
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from text_utils import tokenize
+
+T = TypeVar("T")
+
+# Term-set overlap (Jaccard) at which two generated items count as the same one
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.7"))
+
+
+def split_count(total: int, parts: int) -> List[int]:
+    """Split total into parts counts that differ by at most one, larger first"""
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def shard_count(total: int, per_shard: int, max_shards: int, num_documents: int) -> int:
+    """Shards needed for total items at per_shard each, bounded by the shard cap and the documents"""
+    wanted = math.ceil(total / max(per_shard, 1))
+    return max(1, min(wanted, max_shards, num_documents))
+
+
+def shard_documents(documents: Sequence[T], shards: int) -> List[List[T]]:
+    """
+    Deal documents round-robin into shards
+
+    Retrievers return the best match first, so dealing instead of slicing
+    gives every shard a share of the most relevant chunks.
+    """
+    return [list(documents[i::shards]) for i in range(shards)]
+
+
+def text_similarity(a: str, b: str) -> float:
+    terms_a, terms_b = set(tokenize(a)), set(tokenize(b))
+    if not terms_a or not terms_b:
+        return float(a.strip().lower() == b.strip().lower())
+    return len(terms_a & terms_b) / len(terms_a | terms_b)
+
+
+def dedupe_by_text(
+    items: List[T], text: Callable[[T], str], threshold: float = NEAR_DUPLICATE_THRESHOLD
+) -> List[T]:
+    """
+    Drop items whose text is a near duplicate of an earlier item's
+
+    Args:
+        items: Generated items in merge order
+        text: Extracts the text to compare, e.g. the question or card front
+        threshold: Similarity at or above which an item is dropped
+
+    Returns:
+        The first item of every group of near duplicates, in order
+    """
+    kept: List[T] = []
+    kept_texts: List[str] = []
+    for item in items:
+        item_text = text(item)
+        if any(text_similarity(item_text, other) >= threshold for other in kept_texts):
+            continue
+        kept.append(item)
+        kept_texts.append(item_text)
+    return kept
+
+
+def merge_results(
+    results: List[Any],
+    items: Callable[[Any], List[T]],
+    text: Callable[[T], str],
+    limit: int,
+    label: str,
+    kept: Optional[List[T]] = None,
+) -> List[T]:
+    """
+    Reduce map results into one list
+
+    Failed calls are skipped, near duplicates are dropped and the list is
+    capped at limit. Raises the first error if no call produced anything
+    and nothing was kept from earlier rounds.
+
+    Args:
+        results: Chain outputs from batch(..., return_exceptions=True)
+        items: Extracts the generated items from one output
+        text: Extracts the text near duplicates are compared on
+        limit: Items wanted
+        label: Name of the items in log lines, e.g. "QUIZ QUESTIONS"
+        kept: Items kept from earlier rounds, which take precedence
+
+    Returns:
+        At most limit unique items, earlier ones first
+    """
+    merged = list(kept or [])
+    errors = [result for result in results if isinstance(result, Exception)]
+    for error in errors:
+        print(f"---{label} CALL FAILED: {error}---")
+    if errors and len(errors) == len(results) and not merged:
+        raise errors[0]
+
+    for result in results:
+        if not isinstance(result, Exception):
+            merged.extend(items(result))
+    unique = dedupe_by_text(merged, text)
+    if len(unique) < len(merged):
+        print(f"---DROPPED {len(merged) - len(unique)} DUPLICATE {label}---")
+    return unique[:limit]
+
+
+def _needs_top_up(kept: List[T], limit: int, rounds: int, top_up_rounds: int, label: str) -> bool:
+    missing = limit - len(kept)
+    if missing <= 0 or rounds >= top_up_rounds:
+        return False
+    print(f"---TOPPING UP {missing} {label}---")
+    return True
+
+
+def generate_merged(
+    chain,
+    inputs: List[Dict[str, Any]],
+    items: Callable[[Any], List[T]],
+    text: Callable[[T], str],
+    limit: int,
+    label: str,
+    top_up_chain=None,
+    top_up_inputs: Optional[Callable[[List[T]], Dict[str, Any]]] = None,
+    top_up_rounds: int = 0,
+) -> List[T]:
+    """
+    Map inputs over chain concurrently, merge the results and top up any shortfall
+
+    Args:
+        chain: Runnable producing one output per input
+        inputs: One input per shard
+        items: Extracts the generated items from one output
+        text: Extracts the text near duplicates are compared on
+        limit: Items wanted
+        label: Name of the items in log lines
+        top_up_chain: Runnable asked for the missing items
+        top_up_inputs: Builds its input from the items kept so far
+        top_up_rounds: Top-up calls allowed; 0 disables them
+
+    Returns:
+        At most limit unique items
+    """
+    # Map: shards run concurrently on the runnable's thread pool
+    results = chain.batch(inputs, return_exceptions=True)
+    kept = merge_results(results, items, text, limit, label)
+
+    # Reduce shortfall with calls that see the items kept so far
+    rounds = 0
+    while top_up_chain is not None and _needs_top_up(kept, limit, rounds, top_up_rounds, label):
+        rounds += 1
+        results = top_up_chain.batch([top_up_inputs(kept)], return_exceptions=True)
+        kept = merge_results(results, items, text, limit, label, kept)
+    return kept
+
+
+async def agenerate_merged(
+    chain,
+    inputs: List[Dict[str, Any]],
+    items: Callable[[Any], List[T]],
+    text: Callable[[T], str],
+    limit: int,
+    label: str,
+    top_up_chain=None,
+    top_up_inputs: Optional[Callable[[List[T]], Dict[str, Any]]] = None,
+    top_up_rounds: int = 0,
+) -> List[T]:
+    """Async generate_merged; shards run concurrently on the event loop"""
+    results = await chain.abatch(inputs, return_exceptions=True)
+    kept = merge_results(results, items, text, limit, label)
+
+    rounds = 0
+    while top_up_chain is not None and _needs_top_up(kept, limit, rounds, top_up_rounds, label):
+        rounds += 1
+        results = await top_up_chain.abatch([top_up_inputs(kept)], return_exceptions=True)
+        kept = merge_results(results, items, text, limit, label, kept)
+    return kept
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain.schema import Document
+
+from embedding_cache import get_embeddings
+
+load_dotenv()
+
+# Relevance backend for grade_documents: "llm", "cosine" or "cross_encoder"
+RELEVANCE_BACKEND = os.getenv("RELEVANCE_BACKEND", "llm").lower()
+# Minimum question/chunk cosine similarity for the cosine backend; unset uses
+# the calibrated value for the embedding model below
+RELEVANCE_COSINE_THRESHOLD = os.getenv("RELEVANCE_COSINE_THRESHOLD")
+# sentence-transformers cross-encoder used by the cross_encoder backend
+RELEVANCE_CROSS_ENCODER_MODEL = os.getenv(
+    "RELEVANCE_CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+)
+# Minimum cross-encoder score; raw logits are mapped to 0-1 with a sigmoid here
+RELEVANCE_CROSS_ENCODER_THRESHOLD = float(os.getenv("RELEVANCE_CROSS_ENCODER_THRESHOLD", "0.3"))
+
+# Cosine similarity scales differ per model: ada-002 puts even unrelated text
+# above ~0.7, the text-embedding-3 models spread scores much lower
+COSINE_THRESHOLDS = {
+    "text-embedding-ada-002": 0.8,
+    "text-embedding-3-small": 0.3,
+    "text-embedding-3-large": 0.3,
+}
+
+
+def cosine_threshold(model: str) -> float:
+    if RELEVANCE_COSINE_THRESHOLD:
+        return float(RELEVANCE_COSINE_THRESHOLD)
+    return COSINE_THRESHOLDS.get(model, COSINE_THRESHOLDS["text-embedding-ada-002"])
+
+
+class CosineScorer:
+    """
+    Scores chunks by cosine similarity between question and chunk embeddings
+
+    Uses the shared embedding cache, so a chunk retrieved again by a later
+    request costs nothing and all chunks of a request go out in one batch.
+    """
+
+    def __init__(self, embeddings, threshold: Optional[float] = None):
+        self.embeddings = embeddings
+        model = getattr(embeddings, "model", "")
+        self.threshold = cosine_threshold(model) if threshold is None else threshold
+
+    def _similarities(self, question_vector, document_vectors) -> List[float]:
+        question = np.asarray(question_vector, dtype=np.float32)
+        documents = np.asarray(document_vectors, dtype=np.float32)
+        norms = np.linalg.norm(documents, axis=1) * np.linalg.norm(question)
+        norms[norms == 0] = 1.0
+        return (documents @ question / norms).tolist()
+
+    def score(self, question: str, documents: List[Document]) -> List[float]:
+        if not documents:
+            return []
+        question_vector = self.embeddings.embed_query(question)
+        document_vectors = self.embeddings.embed_documents([d.page_content for d in documents])
+        return self._similarities(question_vector, document_vectors)
+
+    async def ascore(self, question: str, documents: List[Document]) -> List[float]:
+        if not documents:
+            return []
+        question_vector, document_vectors = await asyncio.gather(
+            self.embeddings.aembed_query(question),
+            self.embeddings.aembed_documents([d.page_content for d in documents]),
+        )
+        return self._similarities(question_vector, document_vectors)
+
+
+class CrossEncoderScorer:
+    """
+    Scores (question, chunk) pairs with a small local cross-encoder in one batch
+
+    Requires the optional sentence-transformers package. The model is loaded
+    on first use and shared by all requests. ms-marco cross-encoders output
+    unbounded logits; they are requested without an activation and passed
+    through a sigmoid here, so scores are 0-1 whatever the library version
+    would apply by default.
+    """
+
+    def __init__(
+        self,
+        model_name: str = RELEVANCE_CROSS_ENCODER_MODEL,
+        threshold: float = RELEVANCE_CROSS_ENCODER_THRESHOLD,
+    ):
+        import torch
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu", default_activation_function=torch.nn.Identity())
+        self.threshold = threshold
+        # CrossEncoder.predict is not safe to call from several threads at once
+        self._lock = threading.Lock()
+
+    def score(self, question: str, documents: List[Document]) -> List[float]:
+        if not documents:
+            return []
+        pairs = [(question, d.page_content) for d in documents]
+        with self._lock:
+            logits = np.asarray(self.model.predict(pairs, show_progress_bar=False), dtype=np.float32)
+        return (1.0 / (1.0 + np.exp(-logits))).tolist()
+
+    async def ascore(self, question: str, documents: List[Document]) -> List[float]:
+        # CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(self.score, question, documents)
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_relevance_scorer() -> Optional[object]:
+    """
+    Local scorer for the configured RELEVANCE_BACKEND, or None for "llm"
+
+    Falls back to the cosine scorer when the cross-encoder cannot be loaded.
+    """
+    global _scorer
+    if RELEVANCE_BACKEND not in ("cosine", "cross_encoder"):
+        return None
+
+    with _scorer_lock:
+        if _scorer is None:
+            if RELEVANCE_BACKEND == "cross_encoder":
+                try:
+                    _scorer = CrossEncoderScorer()
+                except Exception as e:
+                    print(f"---CROSS-ENCODER UNAVAILABLE ({e}), USING COSINE SCORER---")
+            if _scorer is None:
+                _scorer = CosineScorer(get_embeddings())
+        return _scorer
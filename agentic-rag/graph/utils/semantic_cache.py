@@ -0,0 +1,160 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from embedding_cache import get_embeddings
+
+load_dotenv()
+
+# Minimum cosine similarity for two questions to share an answer
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+# Seconds a cached answer stays valid
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+# Cached answers kept per subject before the least recently used is evicted
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "500"))
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by (subject, question embedding)
+
+    A lookup returns the stored answer of the most similar cached question
+    for the same subject when the cosine similarity reaches the threshold.
+    Entries expire after ttl_seconds and each subject keeps at most
+    max_entries answers in least-recently-used order.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._buckets: Dict[str, OrderedDict] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def aembed(self, question: str) -> np.ndarray:
+        vector = np.asarray(await self.embeddings.aembed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(
+        self, question: str, subject: Optional[str] = None, vector: Optional[np.ndarray] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a similar question
+
+        Args:
+            question: User question
+            subject: Subject filter the question was asked under
+            vector: Precomputed normalized embedding of the question
+
+        Returns:
+            Dict with generation, sources and similarity, or None on a miss
+        """
+        if vector is None:
+            vector = self.embed(question)
+
+        with self._lock:
+            bucket = self._buckets.get(subject or "")
+            if bucket:
+                self._expire(bucket)
+            if not bucket:
+                self.misses += 1
+                return None
+
+            entry_id, similarity = self._best_match(bucket, vector)
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            bucket.move_to_end(entry_id)
+            entry = bucket[entry_id]
+            self.hits += 1
+
+        return {
+            "generation": entry["generation"],
+            "sources": entry["sources"],
+            "similarity": similarity,
+        }
+
+    def store(
+        self,
+        question: str,
+        subject: Optional[str],
+        generation: str,
+        sources: Optional[List[dict]],
+        vector: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Cache the answer produced for a question
+
+        An entry for a near-identical question (at or above the threshold)
+        is replaced, so repeated questions do not crowd other answers out.
+        """
+        if vector is None:
+            vector = self.embed(question)
+
+        with self._lock:
+            bucket = self._buckets.setdefault(subject or "", OrderedDict())
+            entry_id, similarity = self._best_match(bucket, vector)
+            if similarity < self.threshold:
+                entry_id = self._next_id
+                self._next_id += 1
+            bucket[entry_id] = {
+                "vector": vector,
+                "generation": generation,
+                "sources": sources,
+                "expires_at": time.monotonic() + self.ttl_seconds,
+            }
+            bucket.move_to_end(entry_id)
+            while len(bucket) > self.max_entries:
+                bucket.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": sum(len(bucket) for bucket in self._buckets.values()),
+            }
+
+    def _best_match(self, bucket: OrderedDict, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        """(entry id, cosine similarity) of the most similar cached question"""
+        if not bucket:
+            return None, -1.0
+        entry_ids = list(bucket.keys())
+        similarities = np.stack([bucket[entry_id]["vector"] for entry_id in entry_ids]) @ vector
+        best = int(np.argmax(similarities))
+        return entry_ids[best], float(similarities[best])
+
+    def _expire(self, bucket: OrderedDict) -> None:
+        now = time.monotonic()
+        expired = [k for k, entry in bucket.items() if entry["expires_at"] <= now]
+        for entry_id in expired:
+            del bucket[entry_id]
+
+
+answer_cache = SemanticCache(get_embeddings())
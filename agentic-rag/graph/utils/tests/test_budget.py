@@ -0,0 +1,26 @@
+import time
+
+from graph.utils.budget import DEFAULT_BUDGET, budget_exhausted, get_budget, loops_used
+
+
+def test_get_budget_applies_overrides() -> None:
+    budget = get_budget({"budget": {"max_loops": 1}})
+    assert budget["max_loops"] == 1
+    assert budget["max_llm_calls"] == DEFAULT_BUDGET["max_llm_calls"]
+
+
+def test_loops_used_counts_regenerations_only() -> None:
+    assert loops_used({}) == 0
+    assert loops_used({"loop_count": 1, "generation_count": 1}) == 1
+    assert loops_used({"loop_count": 1, "generation_count": 3}) == 3
+
+
+def test_budget_within_limits() -> None:
+    assert budget_exhausted({"started_at": time.time(), "llm_calls": 1}) is None
+
+
+def test_budget_exhausted_names_the_limit() -> None:
+    budget = {"max_loops": 2, "max_llm_calls": 5, "max_seconds": 10}
+    assert budget_exhausted({"budget": budget, "loop_count": 2}) == "loops"
+    assert budget_exhausted({"budget": budget, "llm_calls": 5}) == "llm_calls"
+    assert budget_exhausted({"budget": budget, "started_at": time.time() - 11}) == "time"
@@ -0,0 +1,35 @@
+from langchain.schema import Document
+
+from graph.utils.context_packer import count_tokens, pack_context
+
+
+def test_pack_context_dedupes_and_ranks() -> None:
+    documents = [
+        Document(page_content="Pizza dough needs flour and yeast."),
+        Document(page_content="TCP  uses a three-way handshake."),
+        Document(page_content="tcp uses a three-way handshake."),
+    ]
+    packed = pack_context("How does the TCP handshake work?", documents, max_tokens=1000)
+    assert [doc.page_content for doc in packed] == [
+        "TCP  uses a three-way handshake.",
+        "Pizza dough needs flour and yeast.",
+    ]
+
+
+def test_pack_context_skips_chunks_over_budget() -> None:
+    long_doc = Document(page_content="tcp handshake " * 200)
+    short_doc = Document(page_content="tcp handshake in brief")
+    packed = pack_context("tcp handshake", [long_doc, short_doc], max_tokens=50)
+    assert packed == [short_doc]
+
+
+def test_pack_context_truncates_when_nothing_fits() -> None:
+    doc = Document(page_content="tcp handshake " * 200, metadata={"source": "net.pdf"})
+    packed = pack_context("tcp handshake", [doc], max_tokens=20)
+    assert len(packed) == 1
+    assert count_tokens(packed[0].page_content) <= 20
+    assert packed[0].metadata == {"source": "net.pdf"}
+
+
+def test_pack_context_empty() -> None:
+    assert pack_context("anything", []) == []
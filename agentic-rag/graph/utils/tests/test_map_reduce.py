@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from graph.utils.map_reduce import (
+    agenerate_merged,
+    dedupe_by_text,
+    generate_merged,
+    shard_count,
+    shard_documents,
+    split_count,
+)
+
+
+class FakeChain:
+    """Returns queued outputs in order, one per input"""
+
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+        self.inputs = []
+
+    def batch(self, inputs, return_exceptions=False):
+        self.inputs.extend(inputs)
+        return [self.outputs.pop(0) for _ in inputs]
+
+    async def abatch(self, inputs, return_exceptions=False):
+        return self.batch(inputs, return_exceptions)
+
+
+def output(*questions):
+    return SimpleNamespace(questions=list(questions))
+
+
+def merged_kwargs(**overrides):
+    kwargs = {
+        "items": lambda result: result.questions,
+        "text": lambda q: q,
+        "limit": 3,
+        "label": "QUESTIONS",
+        "top_up_inputs": lambda kept: {"existing": list(kept)},
+    }
+    return {**kwargs, **overrides}
+
+
+def test_split_count_spreads_remainder() -> None:
+    assert split_count(10, 3) == [4, 3, 3]
+    assert sum(split_count(7, 4)) == 7
+
+
+def test_shard_count_is_bounded() -> None:
+    assert shard_count(20, 5, max_shards=4, num_documents=10) == 4
+    assert shard_count(20, 5, max_shards=8, num_documents=2) == 2
+    assert shard_count(3, 5, max_shards=4, num_documents=10) == 1
+
+
+def test_shard_documents_deals_round_robin() -> None:
+    assert shard_documents([1, 2, 3, 4, 5], 2) == [[1, 3, 5], [2, 4]]
+
+
+def test_dedupe_by_text_keeps_first_of_near_duplicates() -> None:
+    items = ["What is TCP congestion control?", "what is tcp congestion control", "Define a routing table"]
+    assert dedupe_by_text(items, lambda item: item) == [items[0], items[2]]
+
+
+def test_generate_merged_skips_failed_calls_and_caps() -> None:
+    chain = FakeChain([output("define tcp", "define udp"), RuntimeError("boom"), output("define ip", "define arp")])
+    kept = generate_merged(chain, [{}, {}, {}], **merged_kwargs())
+    assert kept == ["define tcp", "define udp", "define ip"]
+
+
+def test_generate_merged_raises_when_every_call_fails() -> None:
+    chain = FakeChain([RuntimeError("first"), RuntimeError("second")])
+    with pytest.raises(RuntimeError, match="first"):
+        generate_merged(chain, [{}, {}], **merged_kwargs())
+
+
+def test_generate_merged_tops_up_without_duplicates() -> None:
+    chain = FakeChain([output("define tcp", "define tcp")])
+    top_up_chain = FakeChain([output("define tcp", "define udp", "define ip")])
+    kept = generate_merged(
+        chain, [{}], **merged_kwargs(top_up_chain=top_up_chain, top_up_rounds=1)
+    )
+    assert kept == ["define tcp", "define udp", "define ip"]
+    assert top_up_chain.inputs == [{"existing": ["define tcp"]}]
+
+
+def test_generate_merged_without_top_up_rounds_returns_short() -> None:
+    top_up_chain = FakeChain([])
+    kept = generate_merged(
+        FakeChain([output("define tcp")]), [{}], **merged_kwargs(top_up_chain=top_up_chain, top_up_rounds=0)
+    )
+    assert kept == ["define tcp"]
+    assert top_up_chain.inputs == []
+
+
+def test_agenerate_merged_matches_sync() -> None:
+    chain = FakeChain([output("define tcp"), output("define udp")])
+    top_up_chain = FakeChain([output("define ip")])
+    kept = asyncio.run(
+        agenerate_merged(chain, [{}, {}], **merged_kwargs(top_up_chain=top_up_chain, top_up_rounds=2))
+    )
+    assert kept == ["define tcp", "define udp", "define ip"]
@@ -1,72 +1,337 @@
-from dotenv import load_dotenv
+"""
+Offline ingestion command: load the course PDFs, split them and upload the
+chunks to Pinecone.
+
+    python ingestion.py            # show what changed and update the BM25 index
+    python ingestion.py --upload   # also embed and upsert new chunks, delete stale ones
+    python ingestion.py --upload --reset   # wipe the index and ingest everything
+
+Ingestion is incremental: ingestion_manifest.json records each PDF's hash and
+the ids of its chunks in Pinecone. Unchanged PDFs are not even parsed, and a
+changed PDF only costs embeddings for the chunks whose text changed.
+
+PDFs are parsed and split in page ranges across a process pool (--workers,
+--pages-per-task). Chunks are handed to the upload stage as each range
+finishes instead of after the whole library has been parsed. Uploads run
+in concurrent batches with retries (see upload_pipeline.py); uploaded chunk
+ids are checkpointed so an interrupted run picks up where it stopped.
+
+With VECTOR_LAYOUT=namespace every subject is upserted into its own Pinecone
+namespace instead of being tagged and filtered. Switching layouts moves every
+vector, so run with --upload --reset after changing it.
+
+Nothing is loaded at import time. The API and graphs get their retrievers
+from retriever.py.
+"""
+import argparse
 import os
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone
-from langchain_community.document_loaders import TextLoader
-from langchain_community.document_loaders import PyPDFLoader
+from pypdf import PdfReader
+
+from bm25_index import BM25_INDEX_PATH, BM25Index
+from graph.utils.context_packer import TIKTOKEN_ENCODING
+from ingestion_manifest import IngestionManifest, assign_chunk_ids, hash_file
+from retriever import VECTOR_LAYOUT, retriever_pool, subject_namespace
+from upload_pipeline import UPLOAD_MAX_IN_FLIGHT, UPLOAD_REQUESTS_PER_MINUTE, UploadPipeline
 
 load_dotenv()
 
-embedding=OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(os.environ["INDEX_NAME"])
-
-splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=700, chunk_overlap=0)
-
-data_docs = PyPDFLoader(r"C:\Users\admin\Downloads\7th sem\7. Data Mining\Data Mining short  book.pdf").load()
-split_data_docs = splitter.split_documents(data_docs)
-
-# Add metadata
-for doc in split_data_docs:
-    doc.metadata = doc.metadata or {}
-    doc.metadata["subject"] = "DataMining"
-    
-network_docs = PyPDFLoader(r"C:\Users\admin\Downloads\7th sem\2. Computer Network and Security\Computer_Network_Dinesh_Ghemosu.pdf").load()
-split_network_docs = splitter.split_documents(network_docs)
-
-# Add metadata
-for doc in split_network_docs:
-    doc.metadata = doc.metadata or {}
-    doc.metadata["subject"] = "Network"
-    
-all_docs = split_data_docs + split_network_docs
-
-# def batch_upload(docs, batch_size=50):
-#     for i in range(0, len(docs), batch_size):
-#         batch = docs[i:i + batch_size]
-#         try:
-#             PineconeVectorStore.from_documents(
-#                 documents=batch,
-#                 embedding=embedding,
-#                 index_name=os.environ["INDEX_NAME"]
-#             )
-#             print(f"✅ Uploaded batch {i//batch_size + 1}")
-#         except Exception as e:
-#             print(f"❌ Failed on batch {i//batch_size + 1}: {e}")
-
-# batch_upload(all_docs, batch_size=50)
-
-# Create retriever function that supports subject filtering
-def get_retriever(subject=None):
-    vectorstore = PineconeVectorStore(
-        index=index,
-        embedding=embedding,
+INGESTION_MANIFEST_PATH = os.getenv("INGESTION_MANIFEST_PATH", "ingestion_manifest.json")
+# Chunk ids uploaded by an unfinished run; removed once a run completes
+INGESTION_CHECKPOINT_PATH = os.getenv("INGESTION_CHECKPOINT_PATH", "ingestion_checkpoint.json")
+# Parser processes; defaults to one per CPU
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", str(os.cpu_count() or 1)))
+# PDF pages parsed and split by one pool task
+INGESTION_PAGES_PER_TASK = int(os.getenv("INGESTION_PAGES_PER_TASK", "25"))
+
+# Source PDF for each subject
+SUBJECT_SOURCES: Dict[str, str] = {
+    "DataMining": r"C:\Users\admin\Downloads\7th sem\7. Data Mining\Data Mining short  book.pdf",
+    "Network": r"C:\Users\admin\Downloads\7th sem\2. Computer Network and Security\Computer_Network_Dinesh_Ghemosu.pdf",
+}
+
+
+@lru_cache(maxsize=1)
+def get_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name=TIKTOKEN_ENCODING, chunk_size=700, chunk_overlap=0
     )
-    
-    if subject:
-        # Create retriever with metadata filter
-        retriever = vectorstore.as_retriever(
-            search_kwargs={"filter": {"subject": subject}}
+
+
+def count_pages(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def parse_page_range(path: str, subject: str, start: int, end: int) -> List[Document]:
+    """
+    Extract and split pages [start, end) of one PDF; runs in a pool worker
+
+    Args:
+        path: Path to the PDF file
+        subject: Subject metadata value for the chunks
+        start: First page (0-based)
+        end: Page after the last one
+
+    Returns:
+        Chunks tagged with source, page and subject, in page order
+    """
+    reader = PdfReader(path)
+    pages = [
+        Document(
+            page_content=reader.pages[i].extract_text() or "",
+            metadata={"source": path, "page": i, "subject": subject},
+        )
+        for i in range(start, end)
+    ]
+    return get_splitter().split_documents(pages)
+
+
+def iter_chunks(
+    sources: Dict[str, str],
+    workers: int = INGESTION_WORKERS,
+    pages_per_task: int = INGESTION_PAGES_PER_TASK,
+) -> Iterator[Tuple[str, List[Document], bool]]:
+    """
+    Parse PDFs in page ranges across a process pool and yield chunks as they finish
+
+    At most two tasks per worker are in flight, so parsed chunks never pile
+    up far ahead of the consumer.
+
+    Yields:
+        (subject, chunks of one page range, whether that subject is finished)
+    """
+    workers = max(workers, 1)
+    tasks = []
+    remaining: Dict[str, int] = {}
+    for subject, path in sources.items():
+        pages = count_pages(path)
+        ranges = [(start, min(start + pages_per_task, pages)) for start in range(0, pages, pages_per_task)]
+        remaining[subject] = len(ranges)
+        print(f"---{subject}: {pages} PAGES IN {len(ranges)} TASKS---")
+        if not ranges:
+            yield subject, [], True
+        tasks.extend((path, subject, start, end) for start, end in ranges)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        queue = iter(tasks)
+        while True:
+            while len(pending) < workers * 2:
+                task = next(queue, None)
+                if task is None:
+                    break
+                pending[pool.submit(parse_page_range, *task)] = task[1]
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                subject = pending.pop(future)
+                remaining[subject] -= 1
+                yield subject, future.result(), remaining[subject] == 0
+
+
+def namespace_of(doc: Document) -> Optional[str]:
+    return subject_namespace(doc.metadata["subject"])
+
+
+def delete_vectors(ids: List[str], subject: str, batch_size: int = 1000) -> None:
+    vectorstore = retriever_pool.vectorstore
+    namespace = subject_namespace(subject)
+    kwargs = {"namespace": namespace} if namespace else {}
+    for i in range(0, len(ids), batch_size):
+        vectorstore.delete(ids=ids[i:i + batch_size], **kwargs)
+    if ids:
+        print(f"---DELETED {len(ids)} STALE VECTORS---")
+
+
+def load_bm25_documents(path: str) -> List[Document]:
+    if not os.path.exists(path):
+        return []
+    return [
+        Document(page_content=doc["page_content"], metadata=doc["metadata"])
+        for doc in BM25Index.load(path).documents
+    ]
+
+
+def ingest(
+    sources: Dict[str, str],
+    manifest: IngestionManifest,
+    upload: bool = False,
+    batch_size: int = 50,
+    bm25_path: str = BM25_INDEX_PATH,
+    workers: int = INGESTION_WORKERS,
+    pages_per_task: int = INGESTION_PAGES_PER_TASK,
+    pipeline: Optional[UploadPipeline] = None,
+) -> None:
+    """
+    Bring Pinecone and the BM25 index in line with the source PDFs
+
+    Args:
+        sources: Subject -> PDF path
+        manifest: What earlier runs uploaded
+        upload: Embed, upsert and delete in Pinecone; otherwise only report
+        batch_size: Chunks per upsert call
+        bm25_path: BM25 index file to update
+        workers: Parser processes
+        pages_per_task: Pages per parser task
+        pipeline: Upload pipeline, defaults to one checkpointing to
+            INGESTION_CHECKPOINT_PATH
+    """
+    # Without an index file every PDF is parsed so the BM25 index can be rebuilt
+    rebuild_bm25 = not os.path.exists(bm25_path)
+
+    hashes: Dict[str, str] = {}
+    for subject, path in sources.items():
+        source_hash = hash_file(path)
+        if manifest.is_current(subject, source_hash) and not rebuild_bm25:
+            print(f"---{subject}: UNCHANGED---")
+            continue
+        hashes[subject] = source_hash
+
+    removed = [key for key in manifest.keys() if key not in sources]
+    if not hashes and not removed:
+        return
+
+    # BM25 entries of untouched subjects are kept; the rest are re-added as parsed
+    bm25_index = BM25Index()
+    bm25_index.add_documents([
+        doc for doc in load_bm25_documents(bm25_path)
+        if doc.metadata.get("subject") not in hashes and doc.metadata.get("subject") not in removed
+    ])
+
+    if upload and pipeline is None:
+        pipeline = UploadPipeline(
+            retriever_pool.vectorstore,
+            batch_size=batch_size,
+            checkpoint_path=INGESTION_CHECKPOINT_PATH,
+            namespace_of=namespace_of,
+        )
+
+    seen: Dict[str, Set[str]] = defaultdict(set)
+    known = {subject: manifest.chunk_ids(subject) for subject in hashes}
+    new_ids: Dict[str, Set[str]] = defaultdict(set)
+
+    parse_sources = {subject: sources[subject] for subject in hashes}
+    for subject, chunks, finished in iter_chunks(parse_sources, workers, pages_per_task):
+        chunks = assign_chunk_ids(subject, chunks, seen[subject])
+        bm25_index.add_documents(chunks)
+        new_docs = [doc for doc in chunks if doc.metadata["chunk_id"] not in known[subject]]
+        new_ids[subject].update(doc.metadata["chunk_id"] for doc in new_docs)
+
+        if upload:
+            # Full batches start uploading while the pool keeps parsing
+            pipeline.submit(new_docs)
+
+        if not finished:
+            continue
+
+        stale_ids = sorted(known[subject] - seen[subject])
+        print(
+            f"---{subject}: {len(seen[subject])} CHUNKS, "
+            f"{len(new_ids[subject])} NEW, {len(stale_ids)} STALE---"
+        )
+        if upload:
+            pipeline.flush()
+            uploaded = new_ids[subject] & pipeline.uploaded
+            delete_vectors(stale_ids, subject)
+            complete = uploaded == new_ids[subject]
+            stored = (known[subject] - set(stale_ids)) | uploaded
+            manifest.record(subject, hashes[subject] if complete else None, stored)
+            manifest.save()
+
+    for subject in removed:
+        print(f"---{subject}: REMOVED---")
+        if upload:
+            delete_vectors(sorted(manifest.chunk_ids(subject)), subject)
+            manifest.forget(subject)
+            manifest.save()
+
+    bm25_index.save(bm25_path)
+    print(f"---BM25 INDEX: {len(bm25_index)} CHUNKS -> {bm25_path}---")
+
+    if upload:
+        pipeline.close()
+        if pipeline.failed:
+            print(f"❌ {len(pipeline.failed)} chunks failed to upload; rerun to retry them")
+        else:
+            pipeline.clear_checkpoint()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest course PDFs into Pinecone")
+    parser.add_argument("--upload", action="store_true", help="Embed and upsert the chunks")
+    parser.add_argument("--reset", action="store_true",
+                        help="With --upload, delete every vector and ingest from scratch")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--max-in-flight", type=int, default=UPLOAD_MAX_IN_FLIGHT,
+                        help="Batches uploading at once")
+    parser.add_argument("--requests-per-minute", type=float, default=UPLOAD_REQUESTS_PER_MINUTE,
+                        help="Embedding request limit (0 for none)")
+    parser.add_argument("--workers", type=int, default=INGESTION_WORKERS, help="Parser processes")
+    parser.add_argument("--pages-per-task", type=int, default=INGESTION_PAGES_PER_TASK)
+    parser.add_argument("--bm25-path", default=BM25_INDEX_PATH, help="Where to write the BM25 index")
+    parser.add_argument("--manifest", default=INGESTION_MANIFEST_PATH)
+    args = parser.parse_args()
+
+    manifest = IngestionManifest(args.manifest)
+    if args.reset and args.upload:
+        # Subject namespaces are wiped too, whichever layout wrote them
+        for namespace in retriever_pool.namespaces:
+            retriever_pool.vectorstore.delete(delete_all=True, namespace=namespace)
+        try:
+            retriever_pool.vectorstore.delete(delete_all=True)
+        except Exception as e:
+            # Pinecone rejects deleting from an empty default namespace
+            print(f"---DEFAULT NAMESPACE NOT CLEARED: {e}---")
+        retriever_pool.invalidate()
+        manifest.clear()
+        manifest.save()
+        if os.path.exists(INGESTION_CHECKPOINT_PATH):
+            os.remove(INGESTION_CHECKPOINT_PATH)
+        if os.path.exists(args.bm25_path):
+            os.remove(args.bm25_path)
+        print("---INDEX RESET---")
+    elif args.upload and not manifest.exists:
+        stats = retriever_pool.index.describe_index_stats()
+        if stats["total_vector_count"] if isinstance(stats, dict) else stats.total_vector_count:
+            # Vectors from before incremental ingestion have random ids;
+            # upserting under chunk ids would store every chunk twice
+            print("❌ Index has vectors but there is no ingestion manifest; rerun with --upload --reset")
+            return
+
+    pipeline = None
+    if args.upload:
+        pipeline = UploadPipeline(
+            retriever_pool.vectorstore,
+            batch_size=args.batch_size,
+            max_in_flight=args.max_in_flight,
+            requests_per_minute=args.requests_per_minute,
+            checkpoint_path=INGESTION_CHECKPOINT_PATH,
+            namespace_of=namespace_of,
         )
-    else:
-        # Create retriever without filter
-        retriever = vectorstore.as_retriever()
-    
-    return retriever
-
-# Default retriever (for backward compatibility)
-retriever = get_retriever()
+
+    ingest(
+        SUBJECT_SOURCES,
+        manifest,
+        upload=args.upload,
+        batch_size=args.batch_size,
+        bm25_path=args.bm25_path,
+        workers=args.workers,
+        pages_per_task=args.pages_per_task,
+        pipeline=pipeline,
+    )
+    if args.upload:
+        # New subjects become new namespaces; re-read them on next use
+        retriever_pool.invalidate()
+
+
+if __name__ == "__main__":
+    main()
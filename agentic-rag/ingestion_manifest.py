@@ -0,0 +1,96 @@
+"""
+Manifest of what has been ingested, for incremental re-ingestion
+
+For every subject PDF the manifest keeps a content hash and the ids of the
+chunks that reached Pinecone. Chunk ids are derived from the subject and
+the chunk text, so an unchanged chunk always maps to the same vector id and
+only new or edited chunks need embedding.
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from langchain.schema import Document
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source_key: str, text: str) -> str:
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha256(f"{source_key}\0{normalized}".encode("utf-8")).hexdigest()[:32]
+
+
+def assign_chunk_ids(
+    source_key: str, docs: List[Document], seen: Optional[Set[str]] = None
+) -> List[Document]:
+    """
+    Tag chunks with deterministic ids (metadata["chunk_id"])
+
+    Chunks with identical text in the same source share an id, so only the
+    first of them is kept. Pass the same `seen` set when a source arrives in
+    several batches.
+    """
+    seen = set() if seen is None else seen
+    unique = []
+    for doc in docs:
+        doc_id = chunk_id(source_key, doc.page_content)
+        if doc_id in seen:
+            continue
+        seen.add(doc_id)
+        doc.metadata["chunk_id"] = doc_id
+        unique.append(doc)
+    return unique
+
+
+class IngestionManifest:
+    """
+    JSON file mapping source key -> {"hash": ..., "chunks": [ids]}
+
+    A source whose upload did not finish is recorded with hash None so the
+    next run loads it again and uploads whatever is still missing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.sources: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.sources = json.load(f).get("sources", {})
+
+    @property
+    def exists(self) -> bool:
+        """Whether a manifest file was written by an earlier run"""
+        return os.path.exists(self.path)
+
+    def keys(self) -> List[str]:
+        return list(self.sources)
+
+    def is_current(self, key: str, source_hash: str) -> bool:
+        entry = self.sources.get(key)
+        return bool(entry) and entry.get("hash") == source_hash
+
+    def chunk_ids(self, key: str) -> Set[str]:
+        return set(self.sources.get(key, {}).get("chunks", []))
+
+    def record(self, key: str, source_hash: Optional[str], chunk_ids: Iterable[str]) -> None:
+        self.sources[key] = {"hash": source_hash, "chunks": sorted(chunk_ids)}
+
+    def forget(self, key: str) -> None:
+        self.sources.pop(key, None)
+
+    def clear(self) -> None:
+        self.sources = {}
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"sources": self.sources}, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -1,7 +1,9 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 from typing import Dict, Any
+import asyncio
 import os
 from dotenv import load_dotenv
 
@@ -12,6 +14,12 @@ from graph.graph import app as rag_app
 from app2 import QuizSystem
 from app3 import FlashcardSystem
 from proctoring import ProctoringSystem
+from retriever import retriever_pool
+from graph.utils.conversational_detector import awarm_up as warm_up_intent_classifier
+from metrics import render_metrics
+from question_bank import (
+    QUESTION_BANK_ENABLED, QUESTION_BANK_WARM_INTERVAL_SECONDS, get_question_bank, keep_warm
+)
 
 # Import API routers
 from api.chat import router as chat_router
@@ -32,12 +40,19 @@ async def lifespan(app: FastAPI):
     # Startup
     global quiz_system, flashcard_system
     print("Initializing systems...")
+    warm_task = None
     
     try:
         quiz_system = QuizSystem()
         flashcard_system = FlashcardSystem()
         proctoring_system = ProctoringSystem()
         set_proctoring_system(proctoring_system)
+        retriever_pool.warm_up()
+        await warm_up_intent_classifier()
+        if QUESTION_BANK_ENABLED and QUESTION_BANK_WARM_INTERVAL_SECONDS > 0:
+            warm_task = asyncio.create_task(
+                keep_warm(get_question_bank(), quiz_system.awarm_topic, QUESTION_BANK_WARM_INTERVAL_SECONDS)
+            )
         # rag_app = rag_graph  # Store the graph
         print("Systems initialized successfully")
     except Exception as e:
@@ -48,6 +63,8 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("Shutting down...")
+    if warm_task:
+        warm_task.cancel()
     if proctoring_system and proctoring_system.video_feed_active:
         print("  Stopping proctoring system...")
         proctoring_system.stop_proctoring()
@@ -99,13 +116,19 @@ app.include_router(proctoring_router, prefix="/api/proctoring", tags=["Proctorin
 async def root():
     return {"message": "Educational RAG API is running"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-graph, per-node, per-chain and per-LLM timings and token usage (Prometheus format)"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
         "rag_system": "initialized",
         "quiz_system": "initialized" if quiz_system else "not initialized",
-        "flashcard_system": "initialized" if flashcard_system else "not initialized"
+        "flashcard_system": "initialized" if flashcard_system else "not initialized",
+        "question_bank": get_question_bank().stats()
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,264 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Chain run names recorded by the chain histogram (see traced_chain)
+TRACED_CHAINS = set()
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, description: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                yield f"{self.name}{format_labels(self.label_names, key)} {value}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.setdefault(
+                key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    labels = format_labels(self.label_names, key, f'le="{bound}"')
+                    yield f"{self.name}_bucket{labels} {count}"
+                labels = format_labels(self.label_names, key, 'le="+Inf"')
+                yield f"{self.name}_bucket{labels} {series['count']}"
+                labels = format_labels(self.label_names, key)
+                yield f"{self.name}_sum{labels} {series['sum']}"
+                yield f"{self.name}_count{labels} {series['count']}"
+
+
+graph_duration = Histogram(
+    "rag_graph_duration_seconds", "Wall time of a whole graph run", ["graph"]
+)
+node_duration = Histogram(
+    "rag_node_duration_seconds", "Wall time of a graph node", ["graph", "node"]
+)
+node_errors = Counter(
+    "rag_node_errors_total", "Graph node runs that raised", ["graph", "node"]
+)
+chain_duration = Histogram(
+    "rag_chain_duration_seconds", "Wall time of a chain invocation", ["graph", "node", "chain"]
+)
+retriever_duration = Histogram(
+    "rag_retriever_duration_seconds", "Wall time of a retriever call", ["graph", "node"]
+)
+llm_duration = Histogram(
+    "rag_llm_duration_seconds", "Wall time of an LLM call", ["graph", "node", "model"]
+)
+llm_calls = Counter(
+    "rag_llm_calls_total", "LLM calls made", ["graph", "node", "model"]
+)
+llm_tokens = Counter(
+    "rag_llm_tokens_total", "LLM tokens used", ["graph", "node", "model", "type"]
+)
+
+ALL_METRICS = [
+    graph_duration,
+    node_duration,
+    node_errors,
+    chain_duration,
+    retriever_duration,
+    llm_duration,
+    llm_calls,
+    llm_tokens,
+]
+
+
+def render_metrics() -> str:
+    """Render every metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def token_usage(response: LLMResult) -> Tuple[int, int]:
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+    # Streaming responses report usage on the message instead
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                return metadata.get("input_tokens", 0), metadata.get("output_tokens", 0)
+    return 0, 0
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records graph, node, chain, retriever and LLM timings plus token usage
+
+    Pass it in the run config (see traced_config) so every nested run of a
+    graph reports here. Runs are labelled with the graph name from the run
+    metadata and the LangGraph node they ran in.
+    """
+
+    def __init__(self):
+        self._runs: Dict[UUID, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, kind: str, metadata: Optional[dict], **fields) -> None:
+        metadata = metadata or {}
+        with self._lock:
+            self._runs[run_id] = {
+                "kind": kind,
+                "start": time.perf_counter(),
+                "graph": metadata.get("graph", ""),
+                "node": metadata.get("langgraph_node", ""),
+                **fields,
+            }
+
+    def _finish(self, run_id: UUID) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        return run, time.perf_counter() - run["start"]
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "")
+        metadata = metadata or {}
+        with self._lock:
+            parent = self._runs.get(parent_run_id) if parent_run_id else None
+
+        if parent_run_id is None:
+            self._start(run_id, "graph", metadata)
+        elif parent and parent["kind"] == "graph" and name == metadata.get("langgraph_node"):
+            self._start(run_id, "node", metadata)
+        elif name in TRACED_CHAINS:
+            self._start(run_id, "chain", metadata, chain=name)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._record_chain(run_id, failed=False)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._record_chain(run_id, failed=True)
+
+    def _record_chain(self, run_id: UUID, failed: bool) -> None:
+        finished = self._finish(run_id)
+        if finished is None:
+            return
+        run, elapsed = finished
+        if run["kind"] == "graph":
+            graph_duration.observe(elapsed, graph=run["graph"])
+        elif run["kind"] == "node":
+            node_duration.observe(elapsed, graph=run["graph"], node=run["node"])
+            if failed:
+                node_errors.inc(graph=run["graph"], node=run["node"])
+        elif run["kind"] == "chain":
+            chain_duration.observe(elapsed, graph=run["graph"], node=run["node"], chain=run["chain"])
+
+    def on_retriever_start(self, serialized, query, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "retriever", metadata)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._record_retriever(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._record_retriever(run_id)
+
+    def _record_retriever(self, run_id: UUID) -> None:
+        finished = self._finish(run_id)
+        if finished is not None:
+            run, elapsed = finished
+            retriever_duration.observe(elapsed, graph=run["graph"], node=run["node"])
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start_llm(run_id, serialized, metadata)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start_llm(run_id, serialized, metadata)
+
+    def _start_llm(self, run_id: UUID, serialized, metadata: Optional[dict]) -> None:
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or (serialized or {}).get("kwargs", {}).get("model_name", "")
+        self._start(run_id, "llm", metadata, model=model)
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        finished = self._finish(run_id)
+        if finished is None:
+            return
+        run, elapsed = finished
+        labels = {"graph": run["graph"], "node": run["node"], "model": run["model"]}
+        llm_duration.observe(elapsed, **labels)
+        llm_calls.inc(**labels)
+        prompt_tokens, completion_tokens = token_usage(response)
+        llm_tokens.inc(prompt_tokens, type="prompt", **labels)
+        llm_tokens.inc(completion_tokens, type="completion", **labels)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        finished = self._finish(run_id)
+        if finished is not None:
+            run, _ = finished
+            llm_calls.inc(graph=run["graph"], node=run["node"], model=run["model"])
+
+
+metrics_handler = MetricsCallbackHandler()
+
+
+def traced_chain(chain, name: str):
+    """Name a chain so its invocations show up in rag_chain_duration_seconds"""
+    TRACED_CHAINS.add(name)
+    return chain.with_config(run_name=name)
+
+
+def traced_config(graph: str) -> Dict[str, Any]:
+    """Run config that reports a graph run to the metrics handler"""
+    return {"callbacks": [metrics_handler], "metadata": {"graph": graph}}
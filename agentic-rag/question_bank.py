@@ -0,0 +1,350 @@
+"""
+Persistent bank of generated quiz questions
+
+Every question the quiz graph generates is stored with its subject,
+difficulty and the embedding of the topic it was generated for. A quiz
+request whose topic is close enough to banked topics of the same subject is
+served from their fresh questions without retrieval or generation; the graph
+only runs on a miss or when too few fresh questions are banked.
+
+keep_warm() runs in the API process and tops up the most requested topics
+in the background, so popular quizzes keep hitting the bank.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from embedding_cache import get_embeddings
+from graph.utils.map_reduce import dedupe_by_text
+
+load_dotenv()
+
+# Serve quizzes from the bank before generating
+QUESTION_BANK_ENABLED = os.getenv("QUESTION_BANK_ENABLED", "true").lower() == "true"
+# JSON file the bank is kept in; empty keeps it in memory only
+QUESTION_BANK_PATH = os.getenv("QUESTION_BANK_PATH", "question_bank.json")
+# Minimum cosine similarity between a requested and a banked topic
+QUESTION_BANK_THRESHOLD = float(os.getenv("QUESTION_BANK_THRESHOLD", "0.9"))
+# Seconds a banked question may be served after it was generated
+QUESTION_BANK_MAX_AGE_SECONDS = float(os.getenv("QUESTION_BANK_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+# Fresh banked questions needed per requested question; more means more varied repeat quizzes
+QUESTION_BANK_MIN_COVERAGE = float(os.getenv("QUESTION_BANK_MIN_COVERAGE", "1.0"))
+# Questions kept per topic; the oldest are dropped first
+QUESTION_BANK_MAX_PER_TOPIC = int(os.getenv("QUESTION_BANK_MAX_PER_TOPIC", "100"))
+# Topics whose request counts are tracked; the least requested are forgotten first
+QUESTION_BANK_MAX_TRACKED_TOPICS = int(os.getenv("QUESTION_BANK_MAX_TRACKED_TOPICS", "1000"))
+# Seconds between background warm-up passes (0 disables them)
+QUESTION_BANK_WARM_INTERVAL_SECONDS = float(os.getenv("QUESTION_BANK_WARM_INTERVAL_SECONDS", "900"))
+# Most requested topics kept warm
+QUESTION_BANK_WARM_TOPICS = int(os.getenv("QUESTION_BANK_WARM_TOPICS", "5"))
+# Fresh questions a warm topic should have banked
+QUESTION_BANK_WARM_QUESTIONS = int(os.getenv("QUESTION_BANK_WARM_QUESTIONS", "20"))
+
+# Fields of a served question, matching api.models.QuizQuestion
+QUESTION_FIELDS = ["question", "options", "correct_answer", "explanation", "difficulty"]
+
+
+def topic_key(topic: str, subject: Optional[str]) -> str:
+    return f"{subject or ''}\0{' '.join(topic.lower().split())}"
+
+
+class QuestionBank:
+    """
+    Quiz questions grouped by (subject, topic), matched by topic embedding
+
+    Args:
+        embeddings: Embeddings used for topics
+        path: JSON file to load from and save to, or None for memory only
+        threshold: Minimum cosine similarity for a banked topic to match
+        max_age_seconds: Age after which a question is no longer served
+        min_coverage: Fresh questions needed per requested question
+        max_per_topic: Questions kept per topic
+        max_tracked_topics: Topics whose request counts are kept for warm-up
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        path: Optional[str] = QUESTION_BANK_PATH or None,
+        threshold: float = QUESTION_BANK_THRESHOLD,
+        max_age_seconds: float = QUESTION_BANK_MAX_AGE_SECONDS,
+        min_coverage: float = QUESTION_BANK_MIN_COVERAGE,
+        max_per_topic: int = QUESTION_BANK_MAX_PER_TOPIC,
+        max_tracked_topics: int = QUESTION_BANK_MAX_TRACKED_TOPICS,
+    ):
+        self.embeddings = embeddings
+        self.path = path
+        self.threshold = threshold
+        self.max_age_seconds = max_age_seconds
+        self.min_coverage = min_coverage
+        self.max_per_topic = max_per_topic
+        self.max_tracked_topics = max_tracked_topics
+        self._topics: Dict[str, Dict[str, Any]] = {}
+        # Request counts and (topic, subject) names by topic key, also for topics not banked yet
+        self._requests: Counter = Counter()
+        self._requested: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if path and os.path.exists(path):
+            try:
+                self.load()
+            except Exception as e:
+                print(f"---QUESTION BANK LOAD FAILED, STARTING EMPTY: {e}---")
+                self.clear()
+
+    def embed(self, topic: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(topic), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def aembed(self, topic: str) -> np.ndarray:
+        vector = np.asarray(await self.embeddings.aembed_query(topic), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(
+        self, topic: str, subject: Optional[str], num_questions: int, vector: Optional[np.ndarray] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Draw a quiz from the bank
+
+        Args:
+            topic: Requested quiz topic
+            subject: Requested subject, or None
+            num_questions: Questions wanted
+            vector: Precomputed normalized embedding of the topic
+
+        Returns:
+            num_questions questions in random order, or None when the matching
+            topics hold fewer fresh questions than the coverage rule requires
+        """
+        if vector is None:
+            vector = self.embed(topic)
+
+        with self._lock:
+            matches = self._matches(subject, vector)
+            # Requests count towards the closest banked topic so paraphrases share popularity
+            if matches:
+                entry = self._topics[matches[0][1]]
+                self._count_request(entry["topic"], entry["subject"])
+            else:
+                self._count_request(topic, subject)
+
+            pool = self._fresh_pool(matches)
+            if len(pool) < max(num_questions, math.ceil(num_questions * self.min_coverage)):
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        print(f"---QUESTION BANK HIT: {len(pool)} FRESH QUESTIONS FOR {topic}---")
+        return [{field: q[field] for field in QUESTION_FIELDS} for q in random.sample(pool, num_questions)]
+
+    def coverage(self, topic: str, subject: Optional[str], vector: Optional[np.ndarray] = None) -> int:
+        """Fresh questions that would be drawn from for this topic"""
+        if vector is None:
+            vector = self.embed(topic)
+        with self._lock:
+            return len(self._fresh_pool(self._matches(subject, vector)))
+
+    def add(
+        self,
+        topic: str,
+        subject: Optional[str],
+        questions: List[Dict[str, Any]],
+        vector: Optional[np.ndarray] = None,
+    ) -> int:
+        """
+        Bank generated questions under their topic
+
+        Questions that nearly repeat one already banked for the topic are
+        skipped. Returns the number of questions added.
+        """
+        if vector is None:
+            vector = self.embed(topic)
+
+        now = time.time()
+        with self._lock:
+            self._drop_stale(now)
+            key = topic_key(topic, subject)
+            entry = self._topics.get(key) or self._new_topic(topic, subject, vector)
+            entry["vector"] = vector
+            banked = entry["questions"]
+            merged = dedupe_by_text(
+                banked + [{**{field: q[field] for field in QUESTION_FIELDS}, "created_at": now} for q in questions],
+                lambda q: q["question"],
+            )
+            added = len(merged) - len(banked)
+            entry["questions"] = merged[-self.max_per_topic:]
+            # Topics only exist while they hold fresh questions
+            if entry["questions"]:
+                self._topics[key] = entry
+
+        self.save()
+        print(f"---QUESTION BANK: ADDED {added} QUESTIONS FOR {topic}---")
+        return added
+
+    def popular_topics(self, limit: int = QUESTION_BANK_WARM_TOPICS) -> List[Tuple[str, Optional[str]]]:
+        """Most requested (topic, subject) pairs, most requested first"""
+        with self._lock:
+            return [self._requested[key] for key, _ in self._requests.most_common(limit)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._topics.clear()
+            self._requests.clear()
+            self._requested.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "topics": len(self._topics),
+                "questions": sum(len(entry["questions"]) for entry in self._topics.values()),
+            }
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        # Writes are serialized so an older snapshot never replaces a newer one
+        with self._write_lock:
+            with self._lock:
+                snapshot = self._snapshot()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+
+    def load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            self._topics = {
+                topic_key(entry["topic"], entry["subject"]): {
+                    **entry, "vector": np.asarray(entry["vector"], dtype=np.float32)
+                }
+                for entry in data.get("topics", [])
+            }
+            self._requests = Counter()
+            self._requested = {}
+            for request in data.get("requests", []):
+                key = topic_key(request["topic"], request["subject"])
+                self._requests[key] = request["count"]
+                self._requested[key] = (request["topic"], request["subject"])
+            self._drop_stale(time.time())
+
+    def _count_request(self, topic: str, subject: Optional[str]) -> None:
+        key = topic_key(topic, subject)
+        self._requests[key] += 1
+        self._requested.setdefault(key, (topic, subject))
+        if len(self._requests) > self.max_tracked_topics:
+            # Forget the least requested other topic, so a new topic can still build up a count
+            coldest = min((other for other in self._requests if other != key), key=self._requests.__getitem__)
+            del self._requests[coldest]
+            del self._requested[coldest]
+
+    def _drop_stale(self, now: float) -> None:
+        """Drop questions past max_age_seconds and topics left without any"""
+        oldest = now - self.max_age_seconds
+        for key in list(self._topics):
+            entry = self._topics[key]
+            entry["questions"] = [q for q in entry["questions"] if q["created_at"] >= oldest]
+            if not entry["questions"]:
+                del self._topics[key]
+
+    def _new_topic(self, topic: str, subject: Optional[str], vector: np.ndarray) -> Dict[str, Any]:
+        return {"topic": topic, "subject": subject, "vector": vector, "questions": []}
+
+    def _matches(self, subject: Optional[str], vector: np.ndarray) -> List[Tuple[float, str]]:
+        """(similarity, key) of same-subject topics at or above the threshold, best first"""
+        keys = [key for key, entry in self._topics.items() if entry["subject"] == subject]
+        if not keys:
+            return []
+        similarities = np.stack([self._topics[key]["vector"] for key in keys]) @ vector
+        matches = [(float(sim), key) for sim, key in zip(similarities, keys) if sim >= self.threshold]
+        return sorted(matches, reverse=True)
+
+    def _fresh_pool(self, matches: List[Tuple[float, str]]) -> List[Dict[str, Any]]:
+        oldest = time.time() - self.max_age_seconds
+        pool = [
+            q for _, key in matches for q in self._topics[key]["questions"] if q["created_at"] >= oldest
+        ]
+        return dedupe_by_text(pool, lambda q: q["question"])
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return {
+            "topics": [
+                {**entry, "vector": entry["vector"].tolist(), "questions": list(entry["questions"])}
+                for entry in self._topics.values()
+            ],
+            "requests": [
+                {"topic": topic, "subject": subject, "count": self._requests[key]}
+                for key, (topic, subject) in self._requested.items()
+            ],
+        }
+
+
+async def warm_topics(
+    bank: QuestionBank,
+    generate: Callable[[str, Optional[str], int], Awaitable[Any]],
+    limit: int = QUESTION_BANK_WARM_TOPICS,
+    target: int = QUESTION_BANK_WARM_QUESTIONS,
+) -> None:
+    """
+    One warm-up pass: top up popular topics that are short of fresh questions
+
+    Args:
+        bank: Bank to inspect
+        generate: Coroutine generating and banking questions for
+            (topic, subject, num_questions)
+        limit: Popular topics to consider
+        target: Fresh questions each of them should have
+    """
+    for topic, subject in bank.popular_topics(limit):
+        vector = await bank.aembed(topic)
+        missing = target - bank.coverage(topic, subject, vector)
+        if missing > 0:
+            print(f"---WARMING QUESTION BANK: {missing} QUESTIONS FOR {topic}---")
+            await generate(topic, subject, missing)
+
+
+async def keep_warm(
+    bank: QuestionBank,
+    generate: Callable[[str, Optional[str], int], Awaitable[Any]],
+    interval: float = QUESTION_BANK_WARM_INTERVAL_SECONDS,
+) -> None:
+    """Run warm_topics every interval seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await warm_topics(bank, generate)
+        except Exception as e:
+            print(f"---QUESTION BANK WARM-UP FAILED: {e}---")
+
+
+
+_question_bank: Optional[QuestionBank] = None
+_question_bank_lock = threading.Lock()
+
+
+def get_question_bank() -> QuestionBank:
+    """Process-wide question bank, loaded on first use"""
+    global _question_bank
+    with _question_bank_lock:
+        if _question_bank is None:
+            _question_bank = QuestionBank(get_embeddings())
+        return _question_bank
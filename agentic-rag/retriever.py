@@ -0,0 +1,330 @@
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain.schema import Document
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.retrievers import BaseRetriever
+from langchain_pinecone import PineconeVectorStore
+from pinecone import Pinecone
+
+from bm25_index import BM25_INDEX_PATH, BM25Index
+from embedding_cache import CachedEmbeddings, get_embeddings
+from graph.utils.context_packer import content_key
+
+load_dotenv()
+
+# Fuse BM25 results from the local index into vector retrieval when it exists
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+# Relative weight of the BM25 ranking in reciprocal rank fusion (vector is 1.0)
+HYBRID_BM25_WEIGHT = float(os.getenv("HYBRID_BM25_WEIGHT", "1.0"))
+# Reciprocal rank fusion constant; larger values flatten the rank curve
+RRF_K = 60
+# "filter": one namespace, subjects selected by metadata filter
+# "namespace": one Pinecone namespace per subject (re-ingest with --reset to switch)
+VECTOR_LAYOUT = os.getenv("VECTOR_LAYOUT", "filter").lower()
+# Seconds the namespace list is cached, so subjects ingested by another process appear
+NAMESPACE_REFRESH_SECONDS = float(os.getenv("NAMESPACE_REFRESH_SECONDS", "300"))
+
+# Runs the per-namespace queries of unscoped searches
+fan_out_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="namespace-fan-out")
+
+
+def subject_namespace(subject: Optional[str]) -> Optional[str]:
+    """Pinecone namespace holding a subject's vectors in the current layout"""
+    return subject if VECTOR_LAYOUT == "namespace" else None
+
+
+def reciprocal_rank_fusion(
+    rankings: List[Tuple[List[Document], float]], k: int
+) -> List[Document]:
+    """
+    Merge ranked lists, scoring each chunk by sum(weight / (RRF_K + rank))
+
+    Chunks are matched across lists by normalized content, so the same chunk
+    coming from Pinecone and from the BM25 index counts once.
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for documents, weight in rankings:
+        for rank, doc in enumerate(documents):
+            key = content_key(doc)
+            scores[key] = scores.get(key, 0.0) + weight / (RRF_K + rank + 1)
+            docs.setdefault(key, doc)
+    best = sorted(scores, key=lambda key: -scores[key])[:k]
+    return [docs[key] for key in best]
+
+
+class FanOutRetriever(BaseRetriever):
+    """
+    Unscoped search over a namespace-per-subject index
+
+    Queries every namespace in parallel with the same search type and search
+    kwargs a scoped retriever would use. Plain similarity search embeds the
+    query once and keeps the k best matches by score; other search types
+    (mmr, score thresholds) have no comparable score across namespaces, so
+    their per-namespace rankings are interleaved rank by rank.
+    The namespace list is read at query time, so subjects ingested while
+    the server runs are searched once the pool refreshes it.
+    """
+
+    vectorstore: Any
+    get_namespaces: Callable[[], List[str]]
+    search_type: str = "similarity"
+    search_kwargs: Dict[str, Any] = {}
+
+    @property
+    def k(self) -> int:
+        return self.search_kwargs.get("k", 4)
+
+    def _namespace_retriever(self, namespace: str):
+        return self.vectorstore.as_retriever(
+            search_type=self.search_type, search_kwargs={**self.search_kwargs, "namespace": namespace}
+        )
+
+    def _search_by_vector(self, vector: List[float], namespace: str) -> List[Tuple[Document, float]]:
+        kwargs = {key: value for key, value in self.search_kwargs.items() if key != "k"}
+        return self.vectorstore.similarity_search_by_vector_with_score(
+            vector, k=self.k, namespace=namespace, **kwargs
+        )
+
+    def _merge_scored(self, results: List[List[Tuple[Document, float]]]) -> List[Document]:
+        scored = [pair for pairs in results for pair in pairs]
+        scored.sort(key=lambda pair: -pair[1])
+        return [doc for doc, _ in scored[:self.k]]
+
+    def _merge_ranked(self, results: List[List[Document]]) -> List[Document]:
+        merged = []
+        seen = set()
+        for rank in range(max((len(docs) for docs in results), default=0)):
+            for docs in results:
+                if rank < len(docs) and content_key(docs[rank]) not in seen:
+                    seen.add(content_key(docs[rank]))
+                    merged.append(docs[rank])
+        return merged[:self.k]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        namespaces = self.get_namespaces()
+        if self.search_type == "similarity":
+            # Embed once; every namespace is searched with the same vector
+            vector = self.vectorstore.embeddings.embed_query(query)
+            futures = [fan_out_executor.submit(self._search_by_vector, vector, ns) for ns in namespaces]
+            return self._merge_scored([future.result() for future in futures])
+
+        futures = [
+            fan_out_executor.submit(self._namespace_retriever(ns).invoke, query) for ns in namespaces
+        ]
+        return self._merge_ranked([future.result() for future in futures])
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        namespaces = await asyncio.to_thread(self.get_namespaces)
+        if self.search_type == "similarity":
+            vector = await self.vectorstore.embeddings.aembed_query(query)
+            results = await asyncio.gather(*(
+                asyncio.to_thread(self._search_by_vector, vector, ns) for ns in namespaces
+            ))
+            return self._merge_scored(list(results))
+
+        results = await asyncio.gather(*(self._namespace_retriever(ns).ainvoke(query) for ns in namespaces))
+        return self._merge_ranked(list(results))
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense Pinecone retrieval fused with BM25 over the local inverted index"""
+
+    vector_retriever: Any
+    bm25_index: Any
+    subject: Optional[str] = None
+    k: int = 4
+    bm25_weight: float = HYBRID_BM25_WEIGHT
+
+    def _fuse(self, dense: List[Document], query: str) -> List[Document]:
+        sparse = self.bm25_index.search(query, k=self.k, subject=self.subject)
+        return reciprocal_rank_fusion([(dense, 1.0), (sparse, self.bm25_weight)], self.k)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense = self.vector_retriever.invoke(query)
+        return self._fuse(dense, query)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense = await self.vector_retriever.ainvoke(query)
+        return self._fuse(dense, query)
+
+
+class RetrieverPool:
+    """
+    Process-wide pool of Pinecone retrievers
+
+    The Pinecone client, index handle and embedding model are created once on
+    first use and shared, so their HTTP connections stay warm across requests.
+    One retriever is built per (subject filter, search config) and reused
+    until invalidate() is called. When the BM25 index written by ingestion.py
+    is present, retrievers fuse its results with the dense ones.
+
+    With VECTOR_LAYOUT=namespace a subject retriever queries only that
+    subject's namespace, and unscoped retrievers fan out over all of them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._embedding = None
+        self._index = None
+        self._vectorstore = None
+        self._bm25_index = None
+        self._bm25_loaded = False
+        self._namespaces: Optional[List[str]] = None
+        self._namespaces_read_at = 0.0
+        self._retrievers: Dict[Tuple[Optional[str], str, str], Any] = {}
+
+    @property
+    def embedding(self) -> CachedEmbeddings:
+        with self._lock:
+            if self._embedding is None:
+                self._embedding = get_embeddings()
+            return self._embedding
+
+    @property
+    def index(self):
+        with self._lock:
+            if self._index is None:
+                pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+                self._index = pc.Index(os.environ["INDEX_NAME"])
+            return self._index
+
+    @property
+    def vectorstore(self) -> PineconeVectorStore:
+        index = self.index
+        embedding = self.embedding
+        with self._lock:
+            if self._vectorstore is None:
+                self._vectorstore = PineconeVectorStore(index=index, embedding=embedding)
+            return self._vectorstore
+
+    @property
+    def bm25_index(self) -> Optional[BM25Index]:
+        """The local BM25 index, or None when hybrid retrieval is off or no index was built"""
+        with self._lock:
+            if not self._bm25_loaded:
+                self._bm25_loaded = True
+                if HYBRID_RETRIEVAL and os.path.exists(BM25_INDEX_PATH):
+                    try:
+                        self._bm25_index = BM25Index.load(BM25_INDEX_PATH)
+                        print(f"---LOADED BM25 INDEX: {len(self._bm25_index)} CHUNKS---")
+                    except Exception as e:
+                        print(f"---BM25 INDEX LOAD FAILED: {e}---")
+            return self._bm25_index
+
+    @property
+    def namespaces(self) -> List[str]:
+        """Non-empty namespaces in the index, re-read from the index stats every NAMESPACE_REFRESH_SECONDS"""
+        index = self.index
+        with self._lock:
+            if self._namespaces is None or monotonic() - self._namespaces_read_at > NAMESPACE_REFRESH_SECONDS:
+                stats = index.describe_index_stats()
+                namespaces = stats["namespaces"] if isinstance(stats, dict) else stats.namespaces
+                self._namespaces = sorted(name for name in namespaces if name)
+                self._namespaces_read_at = monotonic()
+            return self._namespaces
+
+    def get(self, subject: Optional[str] = None, search_type: str = "similarity", **search_kwargs):
+        """
+        Get the pooled retriever for a subject filter and search config
+
+        Args:
+            subject: Subject metadata filter, or None for the whole index
+            search_type: Vector store search type
+            **search_kwargs: Extra search kwargs such as k
+
+        Returns:
+            A HybridRetriever, or a plain VectorStoreRetriever when there is
+            no BM25 index, shared by every caller with the same config
+        """
+        key = (subject, search_type, json.dumps(search_kwargs, sort_keys=True, default=str))
+        with self._lock:
+            retriever = self._retrievers.get(key)
+        if retriever is not None:
+            return retriever
+
+        k = search_kwargs.get("k", 4)
+        if VECTOR_LAYOUT == "namespace" and not subject:
+            retriever = FanOutRetriever(
+                vectorstore=self.vectorstore,
+                get_namespaces=lambda: self.namespaces,
+                search_type=search_type,
+                search_kwargs=search_kwargs,
+            )
+        else:
+            if VECTOR_LAYOUT == "namespace":
+                search_kwargs = {**search_kwargs, "namespace": subject}
+            elif subject:
+                search_kwargs = {**search_kwargs, "filter": {"subject": subject}}
+            retriever = self.vectorstore.as_retriever(
+                search_type=search_type, search_kwargs=search_kwargs
+            )
+        bm25_index = self.bm25_index
+        if bm25_index is not None:
+            retriever = HybridRetriever(
+                vector_retriever=retriever, bm25_index=bm25_index, subject=subject, k=k
+            )
+
+        with self._lock:
+            return self._retrievers.setdefault(key, retriever)
+
+    def warm_up(self) -> None:
+        """Open the Pinecone connection ahead of the first request"""
+        try:
+            self.index.describe_index_stats()
+        except Exception as e:
+            print(f"---RETRIEVER WARM-UP FAILED: {e}---")
+
+    def invalidate(self, subject: Optional[str] = None, reset_clients: bool = False) -> None:
+        """
+        Drop pooled retrievers
+
+        Args:
+            subject: Only drop retrievers for this subject, or all when None
+            reset_clients: Also drop the Pinecone index, embedding clients and
+                BM25 index (reloaded from disk on next use)
+        """
+        with self._lock:
+            if subject is None:
+                self._retrievers.clear()
+                self._namespaces = None
+            else:
+                for key in [k for k in self._retrievers if k[0] == subject]:
+                    del self._retrievers[key]
+
+            if reset_clients:
+                self._retrievers.clear()
+                self._vectorstore = None
+                self._index = None
+                self._embedding = None
+                self._bm25_index = None
+                self._bm25_loaded = False
+
+
+retriever_pool = RetrieverPool()
+
+
+def get_retriever(subject=None, **search_kwargs):
+    return retriever_pool.get(subject=subject, **search_kwargs)
+
+
+def invalidate_retrievers(subject=None, reset_clients=False):
+    retriever_pool.invalidate(subject=subject, reset_clients=reset_clients)
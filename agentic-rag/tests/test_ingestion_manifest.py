@@ -0,0 +1,45 @@
+from langchain.schema import Document
+
+from ingestion_manifest import IngestionManifest, assign_chunk_ids
+
+
+def chunks(*texts, seen=None):
+    return assign_chunk_ids("Network", [Document(page_content=text) for text in texts], seen)
+
+
+def test_assign_chunk_ids_is_deterministic_and_dedupes() -> None:
+    first = chunks("alpha", "beta", "alpha")
+    second = chunks("alpha  ", "beta")
+    assert len(first) == 2
+    assert [doc.metadata["chunk_id"] for doc in first] == [doc.metadata["chunk_id"] for doc in second]
+
+
+def test_assign_chunk_ids_dedupes_across_batches() -> None:
+    seen = set()
+    assert len(chunks("alpha", "beta", seen=seen)) == 2
+    assert [doc.page_content for doc in chunks("beta", "gamma", seen=seen)] == ["gamma"]
+
+
+def test_incomplete_upload_is_not_current(tmp_path) -> None:
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    manifest.record("Network", None, ["a"])
+    assert not manifest.is_current("Network", "hash-1")
+    assert manifest.chunk_ids("Network") == {"a"}
+
+
+def test_save_reload_and_forget(tmp_path) -> None:
+    path = str(tmp_path / "manifest.json")
+    manifest = IngestionManifest(path)
+    assert not manifest.exists
+    manifest.record("Network", "hash-1", ["b", "a"])
+    manifest.save()
+
+    reloaded = IngestionManifest(path)
+    assert reloaded.exists
+    assert reloaded.keys() == ["Network"]
+    assert reloaded.is_current("Network", "hash-1")
+    assert not reloaded.is_current("Network", "hash-2")
+    assert reloaded.chunk_ids("Network") == {"a", "b"}
+
+    reloaded.forget("Network")
+    assert reloaded.keys() == []
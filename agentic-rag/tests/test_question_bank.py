@@ -0,0 +1,106 @@
+import time
+
+import question_bank
+from question_bank import QuestionBank
+
+VECTORS = {
+    "tcp handshake": [1.0, 0.0, 0.0],
+    "the tcp handshake": [0.99, 0.1, 0.0],
+    "routing tables": [0.0, 1.0, 0.0],
+}
+
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return VECTORS[text]
+
+
+def make_question(text):
+    return {
+        "question": text,
+        "options": ["A", "B", "C", "D"],
+        "correct_answer": "A",
+        "explanation": "Because.",
+        "difficulty": "easy",
+    }
+
+
+QUESTIONS = [
+    make_question("What starts a TCP connection?"),
+    make_question("Which flag acknowledges a SYN?"),
+    make_question("How many segments does the handshake use?"),
+    make_question("What does a RST segment do?"),
+]
+
+
+def make_bank(**kwargs):
+    return QuestionBank(FakeEmbeddings(), path=None, **kwargs)
+
+
+def test_lookup_miss_does_not_create_topic() -> None:
+    bank = make_bank()
+    assert bank.lookup("tcp handshake", "Network", 2) is None
+    assert bank.stats()["topics"] == 0
+    assert bank.popular_topics() == [("tcp handshake", "Network")]
+
+
+def test_lookup_serves_similar_topic_of_same_subject() -> None:
+    bank = make_bank()
+    bank.add("tcp handshake", "Network", QUESTIONS)
+    quiz = bank.lookup("the tcp handshake", "Network", 3)
+    assert len(quiz) == 3
+    assert {q["question"] for q in quiz} <= {q["question"] for q in QUESTIONS}
+    assert bank.lookup("tcp handshake", "Distributed", 3) is None
+    assert bank.lookup("routing tables", "Network", 3) is None
+
+
+def test_lookup_requires_coverage() -> None:
+    bank = make_bank(min_coverage=2.0)
+    bank.add("tcp handshake", "Network", QUESTIONS)
+    assert bank.lookup("tcp handshake", "Network", 2) is not None
+    assert bank.lookup("tcp handshake", "Network", 3) is None
+
+
+def test_stale_questions_are_not_served_and_topics_dropped(monkeypatch) -> None:
+    bank = make_bank(max_age_seconds=60)
+    bank.add("tcp handshake", "Network", QUESTIONS)
+    later = time.time() + 120
+    monkeypatch.setattr(question_bank.time, "time", lambda: later)
+    assert bank.coverage("tcp handshake", "Network") == 0
+    assert bank.lookup("tcp handshake", "Network", 1) is None
+
+    bank.add("routing tables", "Network", [make_question("What is a next hop?")])
+    assert bank.stats()["topics"] == 1
+
+
+def test_add_skips_near_duplicates() -> None:
+    bank = make_bank()
+    assert bank.add("tcp handshake", "Network", QUESTIONS[:2]) == 2
+    assert bank.add("tcp handshake", "Network", [make_question("what starts a tcp connection")]) == 0
+
+
+def test_request_tracking_is_bounded() -> None:
+    bank = make_bank(max_tracked_topics=2)
+    for _ in range(3):
+        bank.lookup("tcp handshake", "Network", 1)
+    bank.lookup("routing tables", "Network", 1)
+    bank.lookup("tcp handshake", None, 1)
+    assert bank.popular_topics() == [("tcp handshake", "Network"), ("tcp handshake", None)]
+
+
+def test_save_and_load_round_trip(tmp_path) -> None:
+    path = str(tmp_path / "bank.json")
+    bank = QuestionBank(FakeEmbeddings(), path=path)
+    bank.lookup("tcp handshake", "Network", 1)
+    bank.add("tcp handshake", "Network", QUESTIONS)
+
+    loaded = QuestionBank(FakeEmbeddings(), path=path)
+    assert loaded.stats()["questions"] == len(QUESTIONS)
+    assert loaded.popular_topics() == [("tcp handshake", "Network")]
+
+
+def test_corrupt_file_starts_empty(tmp_path) -> None:
+    path = tmp_path / "bank.json"
+    path.write_text("{not json")
+    bank = QuestionBank(FakeEmbeddings(), path=str(path))
+    assert bank.stats()["topics"] == 0
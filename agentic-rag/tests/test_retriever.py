@@ -0,0 +1,26 @@
+from langchain.schema import Document
+
+from retriever import reciprocal_rank_fusion
+
+
+def doc(text):
+    return Document(page_content=text)
+
+
+def test_rrf_rewards_agreement() -> None:
+    vector = [doc("alpha"), doc("beta"), doc("gamma")]
+    bm25 = [doc("gamma"), doc("delta")]
+    fused = reciprocal_rank_fusion([(vector, 1.0), (bm25, 1.0)], k=3)
+    assert [d.page_content for d in fused] == ["gamma", "alpha", "beta"]
+
+
+def test_rrf_matches_chunks_by_normalized_content() -> None:
+    fused = reciprocal_rank_fusion([([doc("Alpha  beta")], 1.0), ([doc("alpha beta")], 1.0)], k=5)
+    assert [d.page_content for d in fused] == ["Alpha  beta"]
+
+
+def test_rrf_weights_and_cap() -> None:
+    vector = [doc("alpha"), doc("beta")]
+    bm25 = [doc("beta"), doc("alpha")]
+    fused = reciprocal_rank_fusion([(vector, 1.0), (bm25, 2.0)], k=1)
+    assert [d.page_content for d in fused] == ["beta"]
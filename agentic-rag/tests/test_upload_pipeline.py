@@ -0,0 +1,92 @@
+import threading
+
+from langchain.schema import Document
+
+from ingestion_manifest import assign_chunk_ids
+from upload_pipeline import UploadPipeline
+
+
+class FakeVectorStore:
+    """Records upserts; the first failures calls raise"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.upserted = {}
+        self._lock = threading.Lock()
+
+    def add_documents(self, documents, ids, namespace=None):
+        with self._lock:
+            self.calls += 1
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("rate limited")
+            for doc_id in ids:
+                self.upserted[doc_id] = namespace
+
+
+def make_docs(count, subject="Network"):
+    docs = [Document(page_content=f"{subject} chunk {i}", metadata={"subject": subject}) for i in range(count)]
+    return assign_chunk_ids("notes.pdf", docs)
+
+
+def make_pipeline(vectorstore, **kwargs):
+    return UploadPipeline(vectorstore, batch_size=2, max_in_flight=2, backoff_seconds=0, **kwargs)
+
+
+def test_uploads_all_batches() -> None:
+    vectorstore = FakeVectorStore()
+    pipeline = make_pipeline(vectorstore)
+    docs = make_docs(5)
+    pipeline.submit(docs)
+    pipeline.close()
+    assert set(vectorstore.upserted) == {doc.metadata["chunk_id"] for doc in docs}
+    assert pipeline.uploaded == set(vectorstore.upserted)
+    assert vectorstore.calls == 3
+
+
+def test_retries_failed_batches() -> None:
+    vectorstore = FakeVectorStore(failures=2)
+    pipeline = make_pipeline(vectorstore, max_retries=3)
+    pipeline.submit(make_docs(2))
+    pipeline.close()
+    assert len(vectorstore.upserted) == 2
+    assert not pipeline.failed
+
+
+def test_gives_up_after_max_retries() -> None:
+    vectorstore = FakeVectorStore(failures=10)
+    pipeline = make_pipeline(vectorstore, max_retries=2)
+    docs = make_docs(2)
+    pipeline.submit(docs)
+    pipeline.close()
+    assert pipeline.failed == {doc.metadata["chunk_id"] for doc in docs}
+    assert vectorstore.calls == 2
+
+
+def test_resumes_from_checkpoint(tmp_path) -> None:
+    checkpoint_path = str(tmp_path / "checkpoint.jsonl")
+    docs = make_docs(6)
+
+    first = make_pipeline(FakeVectorStore(), checkpoint_path=checkpoint_path)
+    first.submit(docs[:4])
+    first.close()
+
+    # A line cut short by a crash is skipped
+    with open(checkpoint_path, "a", encoding="utf-8") as f:
+        f.write('["trunc')
+
+    vectorstore = FakeVectorStore()
+    second = make_pipeline(vectorstore, checkpoint_path=checkpoint_path)
+    assert second.uploaded == {doc.metadata["chunk_id"] for doc in docs[:4]}
+    second.submit(docs)
+    second.close()
+    assert set(vectorstore.upserted) == {doc.metadata["chunk_id"] for doc in docs[4:]}
+
+
+def test_batches_per_namespace() -> None:
+    vectorstore = FakeVectorStore()
+    pipeline = make_pipeline(vectorstore, namespace_of=lambda doc: doc.metadata["subject"])
+    pipeline.submit(make_docs(1, "Network") + make_docs(1, "DataMining"))
+    pipeline.close()
+    assert sorted(vectorstore.upserted.values()) == ["DataMining", "Network"]
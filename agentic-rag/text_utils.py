@@ -0,0 +1,14 @@
+import re
+from typing import List
+
+# Words ignored when matching questions against chunks
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "explain",
+    "for", "from", "how", "in", "is", "it", "me", "of", "on", "or", "the", "to",
+    "what", "when", "where", "which", "who", "why", "with", "you",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric terms of text, stopwords removed"""
+    return [term for term in re.findall(r"[a-z0-9]+", text.lower()) if term not in STOPWORDS]
@@ -0,0 +1,169 @@
+"""
+Concurrent, retrying, resumable upload of chunks to a vector store
+
+Batches are embedded and upserted by a small thread pool. A shared limiter
+spaces batch starts to stay under the embedding rate limit, a failed batch
+is retried with exponential backoff, and the ids of every uploaded batch
+are appended to a checkpoint file (one JSON list per line) so an interrupted
+run resumes where it stopped.
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set
+
+from langchain.schema import Document
+
+# Batches being embedded or upserted at the same time
+UPLOAD_MAX_IN_FLIGHT = int(os.getenv("UPLOAD_MAX_IN_FLIGHT", "4"))
+# Embedding requests allowed per minute (0 disables the limit)
+UPLOAD_REQUESTS_PER_MINUTE = float(os.getenv("UPLOAD_REQUESTS_PER_MINUTE", "0"))
+# Attempts per batch before it is given up
+UPLOAD_MAX_RETRIES = int(os.getenv("UPLOAD_MAX_RETRIES", "5"))
+# First backoff delay in seconds; doubles on every retry
+UPLOAD_BACKOFF_SECONDS = float(os.getenv("UPLOAD_BACKOFF_SECONDS", "1.0"))
+
+
+class RateLimiter:
+    """Spaces calls at least 60 / requests_per_minute seconds apart"""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class UploadPipeline:
+    """
+    Uploads chunks (with metadata["chunk_id"]) in concurrent batches
+
+    submit() queues chunks and blocks once max_in_flight batches are running,
+    so a producer such as the PDF parser is slowed down instead of queueing
+    the whole library in memory. flush() sends the last partial batch and
+    waits for everything in flight. With namespace_of, chunks are batched
+    per vector-store namespace and upserted into it.
+    """
+
+    def __init__(
+        self,
+        vectorstore,
+        batch_size: int = 50,
+        max_in_flight: int = UPLOAD_MAX_IN_FLIGHT,
+        requests_per_minute: float = UPLOAD_REQUESTS_PER_MINUTE,
+        max_retries: int = UPLOAD_MAX_RETRIES,
+        backoff_seconds: float = UPLOAD_BACKOFF_SECONDS,
+        checkpoint_path: Optional[str] = None,
+        namespace_of: Optional[Callable[[Document], Optional[str]]] = None,
+    ):
+        self.vectorstore = vectorstore
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.checkpoint_path = checkpoint_path
+        self.namespace_of = namespace_of
+        self.limiter = RateLimiter(requests_per_minute)
+        self.uploaded: Set[str] = set()
+        self.failed: Set[str] = set()
+
+        self._pending: Dict[Optional[str], List[Document]] = defaultdict(list)
+        self._futures: List[Future] = []
+        self._slots = threading.BoundedSemaphore(max(max_in_flight, 1))
+        self._lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(max_in_flight, 1), thread_name_prefix="upload"
+        )
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self.uploaded = self._load_checkpoint()
+            print(f"---RESUMING: {len(self.uploaded)} CHUNKS ALREADY UPLOADED---")
+
+    def submit(self, docs: List[Document]) -> None:
+        for doc in docs:
+            if doc.metadata["chunk_id"] not in self.uploaded:
+                namespace = self.namespace_of(doc) if self.namespace_of else None
+                self._pending[namespace].append(doc)
+        for namespace, pending in self._pending.items():
+            while len(pending) >= self.batch_size:
+                self._dispatch(pending[:self.batch_size], namespace)
+                del pending[:self.batch_size]
+
+    def flush(self) -> None:
+        for namespace, pending in self._pending.items():
+            if pending:
+                self._dispatch(pending, namespace)
+        self._pending.clear()
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        self.flush()
+        self._executor.shutdown()
+
+    def clear_checkpoint(self) -> None:
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _dispatch(self, batch: List[Document], namespace: Optional[str]) -> None:
+        self._slots.acquire()
+        future = self._executor.submit(self._upload, batch, namespace)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _upload(self, batch: List[Document], namespace: Optional[str]) -> None:
+        ids = [doc.metadata["chunk_id"] for doc in batch]
+        kwargs = {"namespace": namespace} if namespace else {}
+        for attempt in range(1, self.max_retries + 1):
+            self.limiter.wait()
+            try:
+                self.vectorstore.add_documents(batch, ids=ids, **kwargs)
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"❌ Gave up on batch of {len(batch)} after {attempt} attempts: {e}")
+                    with self._lock:
+                        self.failed.update(ids)
+                    return
+                delay = self.backoff_seconds * 2 ** (attempt - 1) * (1 + random.random())
+                print(f"⚠️ Batch of {len(batch)} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+        with self._lock:
+            self.uploaded.update(ids)
+            self.failed.difference_update(ids)
+        self._append_checkpoint(ids)
+        print(f"✅ Uploaded batch of {len(batch)}")
+
+    def _load_checkpoint(self) -> Set[str]:
+        uploaded: Set[str] = set()
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    uploaded.update(json.loads(line))
+                except ValueError:
+                    # A line cut short by a crash; its batch is simply uploaded again
+                    continue
+        return uploaded
+
+    def _append_checkpoint(self, ids: List[str]) -> None:
+        if not self.checkpoint_path:
+            return
+        # Appending only the new batch keeps checkpoint I/O linear in the run
+        with self._checkpoint_lock:
+            with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(ids) + "\n")
@@ -1,9 +1,10 @@
 from dotenv import load_dotenv
-from langchain import hub
 from langchain_openai import ChatOpenAI
 from langchain.agents import create_react_agent, AgentExecutor
 from langchain_experimental.tools import PythonREPLTool
 
+from prompt_registry import load_prompt
+
 load_dotenv()
 
 
@@ -17,7 +18,7 @@ def main():
     You might know the answer without running any code, but you should still run the code to get the answer.
     If it does not seem like you can write code to answer the question, just return "I don't know" as the answer.
     """
-    base_prompt = hub.pull("langchain-ai/react-agent-template")
+    base_prompt = load_prompt("langchain-ai/react-agent-template")
     prompt = base_prompt.partial(instructions=instructions)
 
     tools = [PythonREPLTool()]
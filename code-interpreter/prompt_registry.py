@@ -0,0 +1,61 @@
+"""
+Pinned LangChain Hub prompts for code-interpreter
+
+The agent's langchain-ai/react-agent-template is stored as JSON in prompts/
+and loaded from disk once per process, so running the agent never calls the
+hub. Refresh it explicitly when a newer hub version is wanted:
+
+    python prompt_registry.py sync
+
+Only plain string prompts are supported, which is all this project uses.
+"""
+import argparse
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional
+
+from langchain_core.prompts import PromptTemplate
+
+PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
+
+
+def prompt_path(name: str) -> Path:
+    return PROMPTS_DIR / f"{name.replace('/', '__')}.json"
+
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str) -> PromptTemplate:
+    """Load a pinned prompt from prompts/; repeated calls return the same object"""
+    path = prompt_path(name)
+    if not path.exists():
+        raise FileNotFoundError(f"Prompt {name} is not pinned; run: python prompt_registry.py sync {name}")
+    return PromptTemplate.from_template(json.loads(path.read_text(encoding="utf-8"))["template"])
+
+
+def sync_prompts(names: Optional[List[str]] = None) -> None:
+    """Pull prompts from LangChain Hub and rewrite their pinned files"""
+    from langchain import hub
+
+    PROMPTS_DIR.mkdir(exist_ok=True)
+    pinned = [json.loads(path.read_text(encoding="utf-8"))["name"] for path in PROMPTS_DIR.glob("*.json")]
+    for name in names or sorted(pinned):
+        prompt = hub.pull(name)
+        if not isinstance(prompt, PromptTemplate):
+            raise ValueError(f"Prompt {name}: unsupported prompt type {type(prompt).__name__}")
+        commit = (prompt.metadata or {}).get("lc_hub_commit_hash")
+        spec = {"name": name, "commit": commit, "type": "string", "template": prompt.template}
+        prompt_path(name).write_text(json.dumps(spec, indent=2) + "\n", encoding="utf-8")
+        print(f"Synced {name} @ {commit or 'latest'}")
+    load_prompt.cache_clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage pinned LangChain Hub prompts")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sync_parser = subparsers.add_parser("sync", help="Refresh pinned prompts from the hub")
+    sync_parser.add_argument("names", nargs="*", help="Prompt handles; all pinned prompts when omitted")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        sync_prompts(args.names)
@@ -3,13 +3,14 @@ load_dotenv()
 
 from typing import Any, Dict, List
 
-from langchain import hub
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains.history_aware_retriever import create_history_aware_retriever
 from langchain.chains.retrieval import create_retrieval_chain
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
 
+from backend.prompt_registry import load_prompt
+
 
 INDEX_NAME = "docs-assistant-index"
 
@@ -19,8 +20,8 @@ def run_llm(query: str, chat_history: List[Dict[str, Any]] = []):
     docsearch = PineconeVectorStore(index_name=INDEX_NAME, embedding=embeddings)
     chat = ChatOpenAI(model="gpt-4o", verbose=True, temperature=0)
 
-    rephrase_prompt = hub.pull("langchain-ai/chat-langchain-rephrase")
-    retrieval_qa_chat_prompt = hub.pull("langchain-ai/retrieval-qa-chat")
+    rephrase_prompt = load_prompt("langchain-ai/chat-langchain-rephrase")
+    retrieval_qa_chat_prompt = load_prompt("langchain-ai/retrieval-qa-chat")
     stuff_documents_chain = create_stuff_documents_chain(chat, retrieval_qa_chat_prompt)
     
     history_aware_retriever = create_history_aware_retriever(
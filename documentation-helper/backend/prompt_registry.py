@@ -0,0 +1,118 @@
+"""
+Pinned LangChain Hub prompts for documentation-helper
+
+run_llm's rephrase and retrieval-QA prompts are stored as JSON in
+backend/prompts/ and loaded from disk once per process, so answering a chat
+message never calls the hub. Refresh them explicitly when a newer hub
+version is wanted:
+
+    python backend/prompt_registry.py sync                                 # every pinned prompt
+    python backend/prompt_registry.py sync langchain-ai/retrieval-qa-chat  # one prompt
+"""
+import argparse
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.prompts import (
+    AIMessagePromptTemplate,
+    BasePromptTemplate,
+    ChatPromptTemplate,
+    HumanMessagePromptTemplate,
+    MessagesPlaceholder,
+    PromptTemplate,
+    SystemMessagePromptTemplate,
+)
+
+PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
+
+MESSAGE_ROLES = {
+    SystemMessagePromptTemplate: "system",
+    HumanMessagePromptTemplate: "human",
+    AIMessagePromptTemplate: "ai",
+}
+
+
+def prompt_path(name: str) -> Path:
+    return PROMPTS_DIR / f"{name.replace('/', '__')}.json"
+
+
+def registered_prompts() -> List[str]:
+    return sorted(json.loads(path.read_text(encoding="utf-8"))["name"] for path in PROMPTS_DIR.glob("*.json"))
+
+
+def from_spec(spec: Dict[str, Any]) -> BasePromptTemplate:
+    if spec["type"] == "string":
+        return PromptTemplate.from_template(spec["template"])
+
+    messages = []
+    for message in spec["messages"]:
+        if message["role"] == "placeholder":
+            messages.append(MessagesPlaceholder(message["variable"], optional=message.get("optional", False)))
+        else:
+            messages.append((message["role"], message["template"]))
+    return ChatPromptTemplate.from_messages(messages)
+
+
+def to_spec(name: str, prompt: BasePromptTemplate, commit: Optional[str]) -> Dict[str, Any]:
+    """Serializable form of a hub prompt; raises ValueError for parts the registry cannot pin"""
+    spec: Dict[str, Any] = {"name": name, "commit": commit}
+    if isinstance(prompt, PromptTemplate):
+        spec.update(type="string", template=prompt.template)
+        return spec
+    if not isinstance(prompt, ChatPromptTemplate):
+        raise ValueError(f"Prompt {name}: unsupported prompt type {type(prompt).__name__}")
+
+    messages = []
+    for message in prompt.messages:
+        if isinstance(message, MessagesPlaceholder):
+            messages.append({"role": "placeholder", "variable": message.variable_name, "optional": message.optional})
+        elif type(message) in MESSAGE_ROLES and isinstance(message.prompt, PromptTemplate):
+            messages.append({"role": MESSAGE_ROLES[type(message)], "template": message.prompt.template})
+        else:
+            raise ValueError(f"Prompt {name}: unsupported message type {type(message).__name__}")
+    spec.update(type="chat", messages=messages)
+    return spec
+
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str) -> BasePromptTemplate:
+    """
+    Load a pinned prompt from prompts/
+
+    Args:
+        name: Hub handle, e.g. "rlm/rag-prompt"
+
+    Returns:
+        The prompt template; repeated calls return the same object
+    """
+    path = prompt_path(name)
+    if not path.exists():
+        raise FileNotFoundError(f"Prompt {name} is not pinned; run: python prompt_registry.py sync {name}")
+    return from_spec(json.loads(path.read_text(encoding="utf-8")))
+
+
+def sync_prompts(names: Optional[List[str]] = None) -> None:
+    """Pull prompts from LangChain Hub and rewrite their pinned files"""
+    from langchain import hub
+
+    PROMPTS_DIR.mkdir(exist_ok=True)
+    for name in names or registered_prompts():
+        prompt = hub.pull(name)
+        commit = (prompt.metadata or {}).get("lc_hub_commit_hash")
+        spec = to_spec(name, prompt, commit)
+        prompt_path(name).write_text(json.dumps(spec, indent=2) + "\n", encoding="utf-8")
+        print(f"Synced {name} @ {commit or 'latest'}")
+    load_prompt.cache_clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage pinned LangChain Hub prompts")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sync_parser = subparsers.add_parser("sync", help="Refresh pinned prompts from the hub")
+    sync_parser.add_argument("names", nargs="*", help="Prompt handles; all registered prompts when omitted")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        sync_prompts(args.names)
@@ -2,42 +2,121 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import argparse
+import os
+from collections import defaultdict
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import ReadTheDocsLoader
 from langchain_openai import OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
+from pinecone import Pinecone
+
+from ingestion_manifest import IngestionManifest, assign_chunk_ids, hash_bytes
+from upload_pipeline import UploadPipeline
 
 embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
 
-def ingest_docs():
+INDEX_NAME = "docs-assistant-index"
+
+# Records the page hashes and chunk ids already in the index so reruns only
+# embed what changed
+MANIFEST_PATH = "ingestion_manifest.json"
+# Chunk ids uploaded by an interrupted run, so a rerun skips them
+CHECKPOINT_PATH = "ingestion_checkpoint.json"
+
+
+def index_vector_count() -> int:
+    stats = Pinecone(api_key=os.environ["PINECONE_API_KEY"]).Index(INDEX_NAME).describe_index_stats()
+    return stats["total_vector_count"] if isinstance(stats, dict) else stats.total_vector_count
+
+
+def reset_index(vectorstore, manifest: IngestionManifest) -> None:
+    """Delete every vector and forget what earlier runs uploaded"""
+    try:
+        vectorstore.delete(delete_all=True)
+    except Exception as e:
+        # Pinecone rejects deleting from an empty namespace
+        print(f"index not cleared: {e}")
+    manifest.clear()
+    manifest.save()
+    if os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    print("index reset")
+
+
+def ingest_docs(reset: bool = False):
+    manifest = IngestionManifest(MANIFEST_PATH)
+    vectorstore = PineconeVectorStore(
+    embedding=embeddings,
+    index_name=INDEX_NAME
+)
+    if reset:
+        reset_index(vectorstore, manifest)
+    elif not manifest.exists and index_vector_count():
+        # Vectors from before incremental ingestion have random ids; upserting
+        # under chunk ids would store every chunk twice
+        print("index has vectors but there is no ingestion manifest; rerun with --reset")
+        return
+
     loader = ReadTheDocsLoader("langchain-docs/api.python.langchain.com/en/latest", encoding="utf-8")
 
     raw_documents = loader.load()
     print(f"loaded {len(raw_documents)} documents")
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=600, chunk_overlap=50)
-    documents = text_splitter.split_documents(raw_documents)
-    for doc in documents:
+    # Pages are keyed by their public URL and hashed on their parsed text
+    pages = defaultdict(list)
+    for doc in raw_documents:
         new_url = doc.metadata["source"]
         new_url = new_url.replace("langchain-docs", "https:/")
         doc.metadata.update({"source": new_url})
+        pages[new_url].append(doc)
 
-    print(f"Going to add {len(documents)} to Pinecone")
-    vectorstore = PineconeVectorStore(
-    embedding=embeddings,
-    index_name="docs-assistant-index"
-)
-    # Define batch size
-    batch_size = 100
-    
-    # Loop through documents in batches
-    for i in range(0, len(documents), batch_size):
-        batch = documents[i:i + batch_size]
-        vectorstore.add_documents(batch)
-        print(f"Uploaded batch {i // batch_size + 1} with {len(batch)} documents")
-    
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=600, chunk_overlap=50)
+    # Batches of 100 chunks, uploaded concurrently with retries
+    pipeline = UploadPipeline(vectorstore, batch_size=100, checkpoint_path=CHECKPOINT_PATH)
+    unchanged = 0
+    changed = []
+
+    for url, page_docs in pages.items():
+        page_hash = hash_bytes("\0".join(doc.page_content for doc in page_docs).encode("utf-8"))
+        if manifest.is_current(url, page_hash):
+            unchanged += 1
+            continue
+
+        documents = assign_chunk_ids(url, text_splitter.split_documents(page_docs))
+        new_documents, stale_ids = manifest.diff(url, documents)
+        pipeline.submit(new_documents)
+        changed.append((url, page_hash, documents, new_documents, stale_ids))
+
+    pipeline.close()
+
+    # Only pages whose new chunks all made it in are recorded as done
+    for url, page_hash, documents, new_documents, stale_ids in changed:
+        if any(doc.metadata["chunk_id"] not in pipeline.uploaded for doc in new_documents):
+            print(f"{url}: upload incomplete, will retry on the next run")
+            continue
+        if stale_ids:
+            vectorstore.delete(ids=stale_ids)
+        manifest.record(url, page_hash, [doc.metadata["chunk_id"] for doc in documents])
+        print(f"{url}: added {len(new_documents)}, deleted {len(stale_ids)} chunks")
+    manifest.save()
+
+    for url in [url for url in manifest.keys() if url not in pages]:
+        vectorstore.delete(ids=sorted(manifest.chunk_ids(url)))
+        manifest.forget(url)
+        manifest.save()
+        print(f"{url}: removed")
+
+    print(f"{unchanged} pages unchanged")
+    if not pipeline.failed:
+        pipeline.clear_checkpoint()
     print("****Loading to vectorstore done ****")
 
 
 if __name__ == "__main__":
-    ingest_docs()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ingest the LangChain docs into Pinecone")
+    parser.add_argument("--reset", action="store_true",
+                        help="Delete every vector and ingest from scratch")
+    args = parser.parse_args()
+    ingest_docs(reset=args.reset)
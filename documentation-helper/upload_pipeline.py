@@ -0,0 +1,155 @@
+"""
+Concurrent, retrying, resumable upload of chunks to a vector store
+
+Batches are embedded and upserted by a small thread pool. A shared limiter
+spaces batch starts to stay under the embedding rate limit, a failed batch
+is retried with exponential backoff, and the ids of every uploaded batch
+are appended to a checkpoint file (one JSON list per line) so an interrupted
+run resumes where it stopped.
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Set
+
+from langchain.schema import Document
+
+# Batches being embedded or upserted at the same time
+UPLOAD_MAX_IN_FLIGHT = int(os.getenv("UPLOAD_MAX_IN_FLIGHT", "4"))
+# Embedding requests allowed per minute (0 disables the limit)
+UPLOAD_REQUESTS_PER_MINUTE = float(os.getenv("UPLOAD_REQUESTS_PER_MINUTE", "0"))
+# Attempts per batch before it is given up
+UPLOAD_MAX_RETRIES = int(os.getenv("UPLOAD_MAX_RETRIES", "5"))
+# First backoff delay in seconds; doubles on every retry
+UPLOAD_BACKOFF_SECONDS = float(os.getenv("UPLOAD_BACKOFF_SECONDS", "1.0"))
+
+
+class RateLimiter:
+    """Spaces calls at least 60 / requests_per_minute seconds apart"""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class UploadPipeline:
+    """
+    Uploads chunks (with metadata["chunk_id"]) in concurrent batches
+
+    submit() queues chunks and blocks once max_in_flight batches are running,
+    so the page loop in ingestion.py is slowed down instead of queueing every
+    changed page of the docs site in memory. close() sends the last partial
+    batch and waits for everything in flight.
+    """
+
+    def __init__(
+        self,
+        vectorstore,
+        checkpoint_path: str,
+        batch_size: int = 50,
+        max_in_flight: int = UPLOAD_MAX_IN_FLIGHT,
+        requests_per_minute: float = UPLOAD_REQUESTS_PER_MINUTE,
+        max_retries: int = UPLOAD_MAX_RETRIES,
+        backoff_seconds: float = UPLOAD_BACKOFF_SECONDS,
+    ):
+        self.vectorstore = vectorstore
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.checkpoint_path = checkpoint_path
+        self.limiter = RateLimiter(requests_per_minute)
+        self.uploaded: Set[str] = set()
+        self.failed: Set[str] = set()
+
+        self._pending: List[Document] = []
+        self._futures: List[Future] = []
+        self._slots = threading.BoundedSemaphore(max(max_in_flight, 1))
+        self._lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(max_in_flight, 1), thread_name_prefix="upload"
+        )
+
+        if os.path.exists(checkpoint_path):
+            self.uploaded = self._load_checkpoint()
+            print(f"---RESUMING: {len(self.uploaded)} CHUNKS ALREADY UPLOADED---")
+
+    def submit(self, docs: List[Document]) -> None:
+        for doc in docs:
+            if doc.metadata["chunk_id"] not in self.uploaded:
+                self._pending.append(doc)
+        while len(self._pending) >= self.batch_size:
+            self._dispatch(self._pending[:self.batch_size])
+            self._pending = self._pending[self.batch_size:]
+
+    def close(self) -> None:
+        if self._pending:
+            self._dispatch(self._pending)
+            self._pending = []
+        for future in self._futures:
+            future.result()
+        self._executor.shutdown()
+
+    def clear_checkpoint(self) -> None:
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _dispatch(self, batch: List[Document]) -> None:
+        self._slots.acquire()
+        future = self._executor.submit(self._upload, batch)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _upload(self, batch: List[Document]) -> None:
+        ids = [doc.metadata["chunk_id"] for doc in batch]
+        for attempt in range(1, self.max_retries + 1):
+            self.limiter.wait()
+            try:
+                self.vectorstore.add_documents(batch, ids=ids)
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"❌ Gave up on batch of {len(batch)} after {attempt} attempts: {e}")
+                    with self._lock:
+                        self.failed.update(ids)
+                    return
+                delay = self.backoff_seconds * 2 ** (attempt - 1) * (1 + random.random())
+                print(f"⚠️ Batch of {len(batch)} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+        with self._lock:
+            self.uploaded.update(ids)
+            self.failed.difference_update(ids)
+        self._append_checkpoint(ids)
+        print(f"✅ Uploaded batch of {len(batch)}")
+
+    def _load_checkpoint(self) -> Set[str]:
+        uploaded: Set[str] = set()
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    uploaded.update(json.loads(line))
+                except ValueError:
+                    # A line cut short by a crash; its batch is simply uploaded again
+                    continue
+        return uploaded
+
+    def _append_checkpoint(self, ids: List[str]) -> None:
+        # Appending only the new batch keeps checkpoint I/O linear in the run
+        with self._checkpoint_lock:
+            with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(ids) + "\n")
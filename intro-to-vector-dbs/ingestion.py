@@ -1,23 +1,70 @@
+import argparse
 import os
 from dotenv import load_dotenv
 from langchain_pinecone import PineconeVectorStore
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import CharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
+from pinecone import Pinecone
+
+from ingestion_manifest import IngestionManifest, assign_chunk_ids, hash_file
 
 load_dotenv()
 
+SOURCE_PATH = "mediumblog1.txt"
+# Records the file hash and chunk ids already in the index so reruns only
+# embed what changed
+MANIFEST_PATH = "ingestion_manifest.json"
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ingest the blog post into Pinecone")
+    parser.add_argument("--reset", action="store_true",
+                        help="Delete every vector and ingest from scratch")
+    args = parser.parse_args()
+
     print("Ingesting...")
-    
-    loader = TextLoader("mediumblog1.txt", encoding='utf-8')
+
+    embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
+    vectorstore = PineconeVectorStore(index_name=os.environ['INDEX_NAME'], embedding=embeddings)
+    manifest = IngestionManifest(MANIFEST_PATH)
+    if args.reset:
+        try:
+            vectorstore.delete(delete_all=True)
+        except Exception as e:
+            # Pinecone rejects deleting from an empty namespace
+            print(f"index not cleared: {e}")
+        manifest.clear()
+        manifest.save()
+        print("index reset")
+    elif not manifest.exists:
+        stats = Pinecone(api_key=os.environ["PINECONE_API_KEY"]).Index(os.environ['INDEX_NAME']).describe_index_stats()
+        if stats["total_vector_count"] if isinstance(stats, dict) else stats.total_vector_count:
+            # Vectors from before incremental ingestion have random ids;
+            # upserting under chunk ids would store every chunk twice
+            print("index has vectors but there is no ingestion manifest; rerun with --reset")
+            raise SystemExit(1)
+
+    source_hash = hash_file(SOURCE_PATH)
+    if manifest.is_current(SOURCE_PATH, source_hash):
+        print("source unchanged, nothing to ingest")
+        raise SystemExit(0)
+
+    loader = TextLoader(SOURCE_PATH, encoding='utf-8')
     document = loader.load()
     print("splitting...")    
     text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-    texts = text_splitter.split_documents(document)
+    texts = assign_chunk_ids(SOURCE_PATH, text_splitter.split_documents(document))
     print(f"created {len(texts)} chunks from the document")
-    
-    embeddings = OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"))
-    print("creating vector store...")
-    PineconeVectorStore.from_documents(texts, embeddings, index_name=os.environ['INDEX_NAME'])
-    print("finish")
\ No newline at end of file
+
+    new_texts, stale_ids = manifest.diff(SOURCE_PATH, texts)
+    print(f"{len(new_texts)} new chunks, {len(stale_ids)} stale chunks")
+
+    print("updating vector store...")
+    if new_texts:
+        vectorstore.add_documents(new_texts, ids=[doc.metadata["chunk_id"] for doc in new_texts])
+    if stale_ids:
+        vectorstore.delete(ids=stale_ids)
+
+    manifest.record(SOURCE_PATH, source_hash, [doc.metadata["chunk_id"] for doc in texts])
+    manifest.save()
+    print("finish")
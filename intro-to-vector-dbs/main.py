@@ -5,10 +5,11 @@ from langchain_core.prompts import PromptTemplate
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_pinecone import PineconeVectorStore
 
-from langchain import hub
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains.retrieval import create_retrieval_chain
 
+from prompt_registry import load_prompt
+
 
 load_dotenv()
 
@@ -28,7 +29,7 @@ if __name__ == "__main__":
         index_name=os.environ["INDEX_NAME"], embedding=embeddings
     )
 
-    retrieval_qa_chat_prompt = hub.pull("langchain-ai/retrieval-qa-chat")
+    retrieval_qa_chat_prompt = load_prompt("langchain-ai/retrieval-qa-chat")
     combine_docs_chain = create_stuff_documents_chain(llm, retrieval_qa_chat_prompt)
     retrival_chain = create_retrieval_chain(
         retriever=vectorstore.as_retriever(), combine_docs_chain=combine_docs_chain
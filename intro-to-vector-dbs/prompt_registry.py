@@ -0,0 +1,95 @@
+"""
+Pinned LangChain Hub prompts for intro-to-vector-dbs
+
+langchain-ai/retrieval-qa-chat is stored as JSON in prompts/ and loaded from
+disk once per process, so answering never calls the hub. Refresh it
+explicitly when a newer hub version is wanted:
+
+    python prompt_registry.py sync
+
+Only chat prompts made of role messages and message placeholders are
+supported, which is all this project uses.
+"""
+import argparse
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.prompts import (
+    AIMessagePromptTemplate,
+    BasePromptTemplate,
+    ChatPromptTemplate,
+    HumanMessagePromptTemplate,
+    MessagesPlaceholder,
+    PromptTemplate,
+    SystemMessagePromptTemplate,
+)
+
+PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
+
+MESSAGE_ROLES = {
+    SystemMessagePromptTemplate: "system",
+    HumanMessagePromptTemplate: "human",
+    AIMessagePromptTemplate: "ai",
+}
+
+
+def prompt_path(name: str) -> Path:
+    return PROMPTS_DIR / f"{name.replace('/', '__')}.json"
+
+
+def to_spec(name: str, prompt: BasePromptTemplate, commit: Optional[str]) -> Dict[str, Any]:
+    """Serializable form of a hub chat prompt; raises ValueError for anything else"""
+    if not isinstance(prompt, ChatPromptTemplate):
+        raise ValueError(f"Prompt {name}: unsupported prompt type {type(prompt).__name__}")
+    messages = []
+    for message in prompt.messages:
+        if isinstance(message, MessagesPlaceholder):
+            messages.append({"role": "placeholder", "variable": message.variable_name, "optional": message.optional})
+        elif type(message) in MESSAGE_ROLES and isinstance(message.prompt, PromptTemplate):
+            messages.append({"role": MESSAGE_ROLES[type(message)], "template": message.prompt.template})
+        else:
+            raise ValueError(f"Prompt {name}: unsupported message type {type(message).__name__}")
+    return {"name": name, "commit": commit, "type": "chat", "messages": messages}
+
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str) -> BasePromptTemplate:
+    """Load a pinned prompt from prompts/; repeated calls return the same object"""
+    path = prompt_path(name)
+    if not path.exists():
+        raise FileNotFoundError(f"Prompt {name} is not pinned; run: python prompt_registry.py sync {name}")
+    messages = []
+    for message in json.loads(path.read_text(encoding="utf-8"))["messages"]:
+        if message["role"] == "placeholder":
+            messages.append(MessagesPlaceholder(message["variable"], optional=message.get("optional", False)))
+        else:
+            messages.append((message["role"], message["template"]))
+    return ChatPromptTemplate.from_messages(messages)
+
+
+def sync_prompts(names: Optional[List[str]] = None) -> None:
+    """Pull prompts from LangChain Hub and rewrite their pinned files"""
+    from langchain import hub
+
+    PROMPTS_DIR.mkdir(exist_ok=True)
+    pinned = [json.loads(path.read_text(encoding="utf-8"))["name"] for path in PROMPTS_DIR.glob("*.json")]
+    for name in names or sorted(pinned):
+        prompt = hub.pull(name)
+        commit = (prompt.metadata or {}).get("lc_hub_commit_hash")
+        spec = to_spec(name, prompt, commit)
+        prompt_path(name).write_text(json.dumps(spec, indent=2) + "\n", encoding="utf-8")
+        print(f"Synced {name} @ {commit or 'latest'}")
+    load_prompt.cache_clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage pinned LangChain Hub prompts")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sync_parser = subparsers.add_parser("sync", help="Refresh pinned prompts from the hub")
+    sync_parser.add_argument("names", nargs="*", help="Prompt handles; all pinned prompts when omitted")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        sync_prompts(args.names)
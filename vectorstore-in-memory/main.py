@@ -5,7 +5,6 @@ from langchain_openai import OpenAIEmbeddings, OpenAI, ChatOpenAI
 from langchain_community.vectorstores import FAISS
 from langchain.chains.retrieval import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain import hub
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 
@@ -41,7 +40,6 @@ if __name__ == "__main__":
     {input}
     """)
 
-    # retrieval_qa_chat_prompt = hub.pull("langchain-ai/retrieval-qa-chat")
     combine_docs_chain = create_stuff_documents_chain(
         OpenAI(), strict_prompt
     )